@@ -8,24 +8,44 @@ DEPENDPATH += . src src/view/res l10n
 INCLUDEPATH += .
 
 # Input
-RESOURCES += src/view/res/resources.qrc
+RESOURCES += src/view/res/resources.qrc \
+             src/view/res/flags.qrc
 
 TRANSLATIONS += l10n/it_IT.ts
 
-SOURCES += src/main.py \
+SOURCES += src/cli.py \
+           src/main.py \
            src/controller/abstract.py \
            src/controller/entry.py \
            src/controller/export.py \
            src/controller/main.py \
            src/controller/newtermbase.py \
            src/model/constants.py \
+           src/model/export.py \
+           src/model/snapshots.py \
            src/model/main.py \
+           src/model/dataaccess/aio.py \
+           src/model/dataaccess/backup.py \
+           src/model/dataaccess/catalog.py \
+           src/model/dataaccess/collation.py \
+           src/model/dataaccess/duplicates.py \
            src/model/dataaccess/entry.py \
+           src/model/dataaccess/federation.py \
+           src/model/dataaccess/instrumentation.py \
+           src/model/dataaccess/journal.py \
+           src/model/dataaccess/lookup.py \
+           src/model/dataaccess/maintenance.py \
+           src/model/dataaccess/merge.py \
+           src/model/dataaccess/prefetch.py \
+           src/model/dataaccess/recognition.py \
            src/model/dataaccess/schema.py \
+           src/model/dataaccess/sharding.py \
+           src/model/dataaccess/statistics.py \
            src/model/dataaccess/term.py \
            src/model/dataaccess/termbase.py \
            src/model/dataaccess/orm/mapping.py \
            src/model/dataaccess/orm/sql.py \
+           src/model/itemmodels/catalog.py \
            src/model/itemmodels/entry.py \
            src/model/itemmodels/termbasedefinition.py \
            src/view/dialogs.py \
@@ -33,6 +53,7 @@ SOURCES += src/main.py \
            src/view/main.py \
            src/view/entry/fields.py \
            src/view/entry/forms.py \
+           src/view/entry/thumbnails.py \
            src/view/entry/widgets.py \
            src/view/wizards/export.py \
            src/view/wizards/newtermbase.py
\ No newline at end of file
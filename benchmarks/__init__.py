@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: benchmarks
+
+This package contains the benchmark harness of the application, i.e. a
+generator of synthetic termbases and a runner which times the most relevant
+operations on them and reports the results as JSON. It is meant to be run from
+the project root directory::
+
+    python -m benchmarks.run --entries 2000 --output results.json
+"""
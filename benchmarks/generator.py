@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: benchmarks.generator
+
+This module contains the generator of synthetic termbases, which are built
+through the ``Termbase`` and ``Schema`` API exactly as the application would
+do, with a configurable number of entries, languages and properties for each
+level. Properties are evenly distributed among textual, picklist and image
+properties. Generation is deterministic for a given random seed.
+"""
+
+import random
+import struct
+import zlib
+
+from src.model import constants
+from src.model.dataaccess import Termbase
+
+LANGUAGES = ['en_US', 'en_GB', 'es_ES', 'fr_FR', 'it_IT', 'ro_RO', 'gr_GR']
+"""Locales available to synthetic termbases (the application defaults).
+"""
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzàèéìòùäöüßñç'
+"""Alphabet used to generate random words.
+"""
+
+_PICKLIST_SIZE = 5
+"""Number of possible values of each picklist property.
+"""
+
+
+def _make_png(width, height, seed):
+    """Returns the bytes of a small valid PNG image (a plain gray square
+    whose shade depends on the seed), used as the value of image properties.
+    """
+    def chunk(kind, data):
+        body = kind + data
+        return (struct.pack('>I', len(data)) + body +
+                struct.pack('>I', zlib.crc32(body) & 0xffffffff))
+    shade = seed % 256
+    raw = b''.join(b'\x00' + bytes([shade]) * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0,
+                                       0)) +
+            chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+class TermbaseGenerator(object):
+    """Generator of synthetic termbases.
+    """
+
+    def __init__(self, entries=1000, languages=3, properties=(2, 2, 2),
+                 terms_per_language=2, seed=0):
+        """Constructor method.
+
+        :param entries: number of entries to be generated
+        :type entries: int
+        :param languages: number of languages of the termbase
+        :type languages: int
+        :param properties: number of properties at the entry, language and
+        term level (in this order)
+        :type properties: tuple
+        :param terms_per_language: number of terms for each language of an
+        entry (the first one being the vedette)
+        :type terms_per_language: int
+        :param seed: seed of the random number generator
+        :type seed: int
+        :rtype: TermbaseGenerator
+        """
+        assert 0 < languages <= len(LANGUAGES)
+        self.entries = entries
+        self.locales = LANGUAGES[:languages]
+        self.properties = dict(zip(constants.PROP_LEVELS, properties))
+        self.terms_per_language = terms_per_language
+        self.seed = seed
+        self._random = random.Random(seed)
+
+    @property
+    def configuration(self):
+        """Returns the parameters of the generator, to be reported alongside
+        benchmark results.
+
+        :rtype: dict
+        """
+        return {'entries': self.entries, 'languages': self.locales,
+                'properties': self.properties,
+                'terms_per_language': self.terms_per_language,
+                'seed': self.seed}
+
+    def _word(self):
+        return ''.join(self._random.choice(_LETTERS) for _ in
+                       range(self._random.randint(3, 12)))
+
+    def _lemma(self):
+        return ' '.join(self._word() for _ in
+                        range(self._random.choice([1, 1, 1, 2, 3])))
+
+    def _value(self, prop_type, values):
+        """Returns a random value for a property of the given type.
+        """
+        if prop_type == 'P':
+            return self._random.choice(values)
+        if prop_type == 'I':
+            return _make_png(16, 16, self._random.randint(0, 255))
+        return ' '.join(self._word() for _ in
+                        range(self._random.randint(1, 20)))
+
+    def create_schema(self, termbase):
+        """Adds languages and properties to the given (empty) termbase.
+
+        :param termbase: termbase to be initialized
+        :type termbase: Termbase
+        :rtype: None
+        """
+        for locale in self.locales:
+            termbase.add_language(locale)
+        for level in constants.PROP_LEVELS:
+            for index in range(self.properties[level]):
+                prop_type = constants.PROP_TYPES[index % 3]
+                values = ()
+                if prop_type == 'P':
+                    values = tuple('value {0}'.format(i) for i in
+                                   range(_PICKLIST_SIZE))
+                termbase.schema.add_property(
+                    '{0} property {1}'.format(level, index), level, prop_type,
+                    values)
+
+    def fill_entry(self, termbase, entry, properties):
+        """Fills an entry with random terms and property values.
+
+        :param termbase: termbase containing the entry
+        :type termbase: Termbase
+        :param entry: entry to be filled
+        :type entry: Entry
+        :param properties: dictionary mapping each level to a list of
+        (property, type, picklist values) 3-tuples
+        :type properties: dict
+        :rtype: None
+        """
+        for (prop, prop_type, values) in properties['E']:
+            entry.set_property(prop.prop_id, self._value(prop_type, values))
+        for locale in self.locales:
+            for (prop, prop_type, values) in properties['L']:
+                entry.set_language_property(locale, prop.prop_id,
+                                            self._value(prop_type, values))
+            lemmata = set()
+            while len(lemmata) < self.terms_per_language:
+                lemmata.add(self._lemma())
+            for (index, lemma) in enumerate(sorted(lemmata)):
+                entry.add_term(lemma, locale, index == 0)
+                term = entry.get_term(locale, lemma)
+                for (prop, prop_type, values) in properties['T']:
+                    term.set_property(prop.prop_id,
+                                      self._value(prop_type, values))
+
+    def get_properties(self, termbase):
+        """Returns the properties of the termbase grouped by level, along with
+        their type and legal values.
+
+        :param termbase: termbase to be queried
+        :type termbase: Termbase
+        :rtype: dict
+        """
+        return {level: [(p, p.property_type, p.values) for p in
+                        termbase.schema.get_properties(level)]
+                for level in constants.PROP_LEVELS}
+
+    def generate(self, name):
+        """Creates a new synthetic termbase with the given name.
+
+        :param name: name of the termbase
+        :type name: str
+        :returns: the generated termbase
+        :rtype: Termbase
+        """
+        termbase = Termbase(name)
+        self.create_schema(termbase)
+        properties = self.get_properties(termbase)
+        for _ in range(self.entries):
+            self.fill_entry(termbase, termbase.create_entry(), properties)
+        return termbase
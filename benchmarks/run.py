@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: benchmarks.run
+
+This module is the entry point of the benchmark harness. It generates a
+synthetic termbase in a temporary folder (so that the user termbases are never
+touched), times the key operations of the application on it and writes the
+results as JSON, either to the standard output or to a file, in order to track
+performance regressions between releases.
+
+All timings are expressed in seconds.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from PyQt4 import QtCore, QtGui
+import sqlalchemy
+
+from benchmarks.generator import TermbaseGenerator
+from src.model import export
+from src.model.dataaccess import (orm, Termbase, EntryChanges,
+                                  get_query_statistics)
+from src.model.itemmodels import EntryModel
+
+_TERMBASE_NAME = 'benchmark'
+"""Name of the synthetic termbase.
+"""
+
+
+def use_directory(directory):
+    """Has termbases stored in (and read from) the given directory instead of
+    the user termbase folder.
+
+    :param directory: path of the directory
+    :type directory: str
+    :rtype: None
+    """
+    orm.DB_DIR = directory
+    orm.sql.DB_DIR = directory
+
+
+def measure(function, repeat):
+    """Calls a function the given number of times and summarizes how long the
+    calls took.
+
+    :param function: callable taking no arguments
+    :type function: callable
+    :param repeat: number of calls
+    :type repeat: int
+    :returns: a dictionary with summary statistics of the timings and the
+    number of SQL statements issued by each call
+    :rtype: dict
+    """
+    timings = []
+    statements_before = get_query_statistics().total[0]
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    statements = get_query_statistics().total[0] - statements_before
+    return {'repeat': repeat, 'min': min(timings), 'max': max(timings),
+            'mean': statistics.mean(timings),
+            'median': statistics.median(timings),
+            'statements': statements // repeat}
+
+
+def hydrate_entry(termbase, entry):
+    """Reads all the information of an entry through the data access layer,
+    the same way the entry screen does when an entry is displayed.
+
+    :param termbase: termbase containing the entry
+    :type termbase: Termbase
+    :param entry: entry to be read
+    :type entry: Entry
+    :returns: a list of (property type, value) 2-tuples
+    :rtype: list
+    """
+    schema = termbase.schema
+    values = []
+    for prop in schema.get_properties('E'):
+        values.append((prop.property_type, entry.get_property(prop.prop_id)))
+    for locale in termbase.languages:
+        for prop in schema.get_properties('L'):
+            values.append((prop.property_type,
+                           entry.get_language_property(locale, prop.prop_id)))
+        for term in entry.get_terms(locale):
+            for prop in schema.get_properties('T'):
+                values.append((prop.property_type,
+                               term.get_property(prop.prop_id)))
+    return values
+
+
+def save_entry(termbase, entry):
+    """Saves an (unmodified) existing entry the same way as the entry
+    controller does when an edited entry is saved, i.e. comparing the values
+    of the form with the snapshot it was loaded from and writing the changes
+    only.
+
+    :param termbase: termbase containing the entry
+    :type termbase: Termbase
+    :param entry: entry to be saved
+    :type entry: Entry
+    :returns: the changes that have been written (none)
+    :rtype: EntryChanges
+    """
+    schema = termbase.schema
+    snapshot = entry.get_snapshot()
+    changes = EntryChanges()
+    for prop in schema.get_properties('E'):
+        value = snapshot.get_property(prop.prop_id)
+        changes.set_property(prop.prop_id, value, value)
+    for locale in termbase.languages:
+        for prop in schema.get_properties('L'):
+            value = snapshot.get_language_property(locale, prop.prop_id)
+            changes.set_language_property(locale, prop.prop_id, value, value)
+        for term in snapshot.get_terms(locale):
+            for prop in schema.get_properties('T'):
+                value = term.get_property(prop.prop_id)
+                changes.set_term_property(term.term_id, locale, prop.prop_id,
+                                          value, value)
+    entry.apply_changes(changes)
+    return changes
+
+
+def run(generator, repeat, sample, directory):
+    """Generates the synthetic termbase and times all the operations.
+
+    :param generator: generator of the synthetic termbase
+    :type generator: TermbaseGenerator
+    :param repeat: number of repetitions of each (non destructive) operation
+    :type repeat: int
+    :param sample: number of entries used for per-entry operations
+    :type sample: int
+    :param directory: directory where the termbase is created
+    :type directory: str
+    :returns: a dictionary keyed by operation names
+    :rtype: dict
+    """
+    results = {}
+    start = time.perf_counter()
+    termbase = generator.generate(_TERMBASE_NAME)
+    results['generate'] = {'repeat': 1,
+                           'total': time.perf_counter() - start}
+    results['open'] = measure(lambda: Termbase(_TERMBASE_NAME), repeat)
+    termbase = Termbase(_TERMBASE_NAME)
+    results['entry_model'] = measure(lambda: EntryModel(termbase), repeat)
+    entry_model = EntryModel(termbase)
+    proxy = QtGui.QSortFilterProxyModel()
+    proxy.setSourceModel(entry_model)
+    proxy.setSortRole(EntryModel.SORT_KEY_ROLE)
+
+    def sort_entries():
+        entry_model.language = generator.locales[0]
+        proxy.sort(0)
+    results['vedette_sort'] = measure(sort_entries, repeat)
+    entries = termbase.entries
+    chosen = random.Random(generator.seed).sample(entries,
+                                                  min(sample, len(entries)))
+    results['hydrate_entry'] = measure(
+        lambda: [hydrate_entry(termbase, e) for e in chosen], repeat)
+    results['hydrate_entry']['entries'] = len(chosen)
+    results['save_entry'] = measure(
+        lambda: [save_entry(termbase, e) for e in chosen], repeat)
+    results['save_entry']['entries'] = len(chosen)
+    if len(generator.locales) > 1:
+        third_field = (termbase.schema.get_properties('E') or [None])[0]
+        for (name, delimiter) in [('csv', ','), ('tsv', '\t')]:
+            path = os.path.join(directory, 'export.{0}'.format(name))
+            results['export_{0}'.format(name)] = measure(
+                lambda: export.write_delimited(
+                    path, export.get_delimited_values(
+                        termbase, generator.locales[:2], third_field,
+                        'entry' if third_field else None),
+                    delimiter), repeat)
+    # deletion is destructive, hence it goes last and is timed once
+    results['delete_entry'] = measure(
+        lambda: [termbase.delete_entry(e) for e in chosen], 1)
+    results['delete_entry']['entries'] = len(chosen)
+    results['size'] = os.path.getsize(termbase.get_termbase_file_name())
+    return results
+
+
+def main(args=None):
+    """Parses the command line, runs the benchmarks and writes the report.
+
+    :param args: command line arguments (defaults to ``sys.argv``)
+    :type args: list
+    :rtype: None
+    """
+    parser = argparse.ArgumentParser(
+        description='Times the key operations of MetaTerm on a synthetic '
+                    'termbase and reports the results as JSON.')
+    parser.add_argument('--entries', type=int, default=500)
+    parser.add_argument('--languages', type=int, default=3)
+    parser.add_argument('--properties', type=int, nargs=3, default=[3, 3, 3],
+                        metavar=('E', 'L', 'T'),
+                        help='number of properties at each level')
+    parser.add_argument('--terms', type=int, default=2,
+                        help='number of terms for each language of an entry')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sample', type=int, default=50,
+                        help='number of entries for per-entry operations')
+    parser.add_argument('--directory',
+                        help='directory where the termbase is generated '
+                             '(a temporary one by default)')
+    parser.add_argument('--output', help='JSON file to write results to')
+    options = parser.parse_args(args)
+    generator = TermbaseGenerator(options.entries, options.languages,
+                                  tuple(options.properties), options.terms,
+                                  options.seed)
+    directory = options.directory or tempfile.mkdtemp(prefix='metaterm-')
+    use_directory(directory)
+    # statement counts are part of the results
+    get_query_statistics().enabled = True
+    application = QtCore.QCoreApplication([])
+    try:
+        results = run(generator, options.repeat, options.sample, directory)
+    finally:
+        if not options.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    report = {'timestamp': datetime.datetime.utcnow().isoformat(),
+              'python': platform.python_version(),
+              'sqlalchemy': sqlalchemy.__version__,
+              'qt': QtCore.QT_VERSION_STR,
+              'platform': platform.platform(),
+              'configuration': generator.configuration,
+              'results': results}
+    if options.output:
+        with open(options.output, 'w') as file_handle:
+            json.dump(report, file_handle, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    del application
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.cli
+
+This module is the entry point of the command line interface of the program,
+which allows to perform some operations on the termbases stored on the local
+system without starting the graphical user interface. It is meant to be run
+from the project root directory, e.g.::
+
+    python -m src.cli stats my_termbase
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from src import model
+from src.model import export
+
+
+def _open_termbase(name, read_only=False, sharded=False):
+    """Opens an existing termbase, exiting with an error if it does not exist
+    (since opening a termbase would otherwise create it).
+
+    :param name: name of the termbase
+    :type name: str
+    :param read_only: whether the termbase is only read
+    :type read_only: bool
+    :param sharded: whether the termbase may be a sharded one
+    :type sharded: bool
+    :returns: the termbase
+    :rtype: Termbase
+    """
+    model.initialize_tb_folder()
+    if sharded and model.ShardedTermbase.exists(name):
+        try:
+            return model.ShardedTermbase(name, read_only=read_only)
+        except ValueError as exc:
+            sys.exit(str(exc))
+    if '{0}.sqlite'.format(name) not in model.get_termbase_names():
+        sys.exit('termbase {0} does not exist'.format(name))
+    return model.Termbase(name, read_only=read_only)
+
+
+def print_statistics(options, output=sys.stdout):
+    """Prints the statistics of a termbase.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    termbase = _open_termbase(options.name, sharded=True)
+    if options.rebuild:
+        termbase.rebuild_statistics()
+    stats = termbase.statistics
+    output.write('Termbase: {0}\n'.format(termbase.name))
+    output.write('Entries: {0}\n'.format(stats.entry_number))
+    output.write('Size: {0}\n\n'.format(termbase.size))
+    output.write('{0:<10}{1:>10}{2:>18}\n'.format('Language', 'Terms',
+                                                  'Missing entries'))
+    for locale in stats.languages:
+        output.write('{0:<10}{1:>10}{2:>18}\n'.format(
+            locale, stats.get_term_number(locale),
+            stats.get_missing_entries(locale)))
+    output.write('\n{0:<40}{1:>8}{2:>10}\n'.format('Property', 'Level',
+                                                   'Filled'))
+    for level in ['E', 'L', 'T']:
+        for prop in termbase.schema.get_properties(level):
+            output.write('{0:<40}{1:>8}{2:>10.1%}\n'.format(
+                prop.name[:39], level,
+                stats.get_fill_rate(prop.prop_id, level)))
+
+
+def check_integrity(options, output=sys.stdout):
+    """Checks the integrity of a termbase file, exiting with a non-zero status
+    if any problem is found.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    errors = model.maintenance.check_integrity(_open_termbase(options.name),
+                                               options.quick)
+    for error in errors:
+        output.write('{0}\n'.format(error))
+    if errors:
+        sys.exit(1)
+    output.write('ok\n')
+
+
+def compact(options, output=sys.stdout):
+    """Compacts a termbase file, returning unused space to the file system.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    termbase = _open_termbase(options.name)
+    old_size, new_size = model.maintenance.compact(termbase)
+    output.write('{0} -> {1}\n'.format(termbase.format_size(old_size),
+                                       termbase.format_size(new_size)))
+
+
+def analyze(options, output=sys.stdout):
+    """Updates the statistics used by the SQLite query planner.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    model.maintenance.analyze(_open_termbase(options.name))
+
+
+def take_snapshot(options, output=sys.stdout):
+    """Takes a snapshot of a termbase, deleting the oldest snapshots if a
+    retention limit is given.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    snapshot = model.backup.create_snapshot(_open_termbase(options.name))
+    output.write('{0}\n'.format(snapshot.file_name))
+    if options.keep is not None:
+        model.backup.prune_snapshots(options.name, options.keep)
+
+
+def list_snapshots(options, output=sys.stdout):
+    """Lists the snapshots of a termbase (or of all termbases).
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    for snapshot in model.backup.get_snapshots(options.name):
+        output.write('{0:<20}{1:<22}{2:>12}  {3}\n'.format(
+            snapshot.termbase_name,
+            snapshot.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            model.Termbase.format_size(snapshot.size), snapshot.file_name))
+
+
+def restore_snapshot(options, output=sys.stdout):
+    """Restores a snapshot as a new termbase.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    try:
+        output.write('{0}\n'.format(model.backup.restore_snapshot(
+            options.snapshot, options.name)))
+    except ValueError as exc:
+        sys.exit(str(exc))
+
+
+def print_changes(options, output=sys.stdout):
+    """Prints the changes recorded in the journal of a termbase as JSON
+    objects, one per line.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    for change in _open_termbase(options.name, read_only=True).get_changes(
+            options.since):
+        record = change._asdict()
+        record['timestamp'] = change.timestamp.isoformat()
+        output.write('{0}\n'.format(json.dumps(record, sort_keys=True)))
+
+
+def export_termbase(options, output=sys.stdout):
+    """Exports the source and target terms of a termbase (or only the ones of
+    the entries changed after a given change) in a delimited format. The
+    sequence number of the last change is written to the standard error, so
+    that it can be used for the next incremental export.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    termbase = _open_termbase(options.name, read_only=True, sharded=True)
+    for locale in [options.source, options.target]:
+        if locale not in termbase.languages:
+            sys.exit('termbase {0} has no language {1}'.format(
+                termbase.name, locale))
+    locales = [options.source, options.target]
+    delimiter = '\t' if options.format == 'tsv' else ','
+    if isinstance(termbase, model.ShardedTermbase):
+        if options.since is not None:
+            sys.exit('sharded termbases cannot be exported incrementally')
+        export.write_delimited(options.output,
+                               export.get_sharded_delimited_values(
+                                   termbase, locales, None, None),
+                               delimiter)
+        return
+    last_change = termbase.last_change
+    if options.workers:
+        export.write_delimited_parallel(termbase, options.output, locales,
+                                        None, None, delimiter, options.since,
+                                        options.workers)
+    else:
+        values = export.get_delimited_values(termbase, locales, None, None,
+                                             options.since)
+        export.write_delimited(options.output, values, delimiter)
+    sys.stderr.write('{0}\n'.format(last_change))
+
+
+def merge_termbase(options, output=sys.stdout):
+    """Merges a termbase (or a termbase file) into another termbase and
+    prints a summary of the merge, optionally writing the conflicts to a CSV
+    file.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    termbase = _open_termbase(options.name)
+    if os.path.isfile(options.other):
+        file_name = options.other
+    else:
+        file_name = _open_termbase(options.other).get_termbase_file_name()
+    try:
+        report = model.merge.merge(termbase, file_name)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    output.write('Merged entries: {0}\n'.format(report.merged_entries))
+    output.write('Added entries: {0}\n'.format(report.added_entries))
+    output.write('Added terms: {0}\n'.format(report.added_terms))
+    output.write('Added values: {0}\n'.format(report.added_values))
+    output.write('Conflicts: {0}\n'.format(len(report.conflicts)))
+    if options.report:
+        model.merge.write_report(report, options.report)
+
+
+def find_duplicates(options, output=sys.stdout):
+    """Writes the report of the duplicate terms of a termbase to a CSV file
+    and prints the number of duplicates of each kind.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    duplicates = model.duplicates.find_duplicates(
+        _open_termbase(options.name, read_only=True), options.threshold,
+        options.workers)
+    model.duplicates.write_report(duplicates, options.output)
+    for kind in [model.duplicates.EXACT, model.duplicates.NEAR]:
+        output.write('{0} duplicates: {1}\n'.format(
+            kind.capitalize(), sum(1 for d in duplicates if d.kind == kind)))
+
+
+def shard_termbase(options, output=sys.stdout):
+    """Copies the content of a termbase into a new sharded termbase and prints
+    the number of entries of each shard.
+
+    :param options: parsed command line options
+    :type options: argparse.Namespace
+    :param output: file where the report is written
+    :type output: file
+    :rtype: None
+    """
+    _open_termbase(options.name, read_only=True).dispose()
+    try:
+        termbase = model.ShardedTermbase.create_from_termbase(
+            options.sharded_name, options.name, options.shards)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    for (index, shard) in enumerate(termbase.shards):
+        output.write('Shard {0}: {1} entries\n'.format(
+            index, shard.entry_number))
+
+
+def get_parser():
+    """Returns the parser of the command line, with a sub-command for each
+    supported operation.
+
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog='metaterm', description='Command line interface of MetaTerm.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    stats_parser = commands.add_parser(
+        'stats', help='prints the statistics of a termbase')
+    stats_parser.add_argument('name', help='name of the termbase')
+    stats_parser.add_argument('--rebuild', action='store_true',
+                              help='compute the statistics from scratch')
+    stats_parser.set_defaults(function=print_statistics)
+    check_parser = commands.add_parser(
+        'check', help='checks the integrity of a termbase file')
+    check_parser.add_argument('name', help='name of the termbase')
+    check_parser.add_argument('--quick', action='store_true',
+                              help='skip the verification of indexes')
+    check_parser.set_defaults(function=check_integrity)
+    compact_parser = commands.add_parser(
+        'compact', help='returns the unused space of a termbase file')
+    compact_parser.add_argument('name', help='name of the termbase')
+    compact_parser.set_defaults(function=compact)
+    analyze_parser = commands.add_parser(
+        'analyze', help='updates the statistics of the query planner')
+    analyze_parser.add_argument('name', help='name of the termbase')
+    analyze_parser.set_defaults(function=analyze)
+    snapshot_parser = commands.add_parser(
+        'snapshot', help='takes a hot backup of a termbase')
+    snapshot_parser.add_argument('name', help='name of the termbase')
+    snapshot_parser.add_argument('--keep', type=int,
+                                 help='number of snapshots to be kept')
+    snapshot_parser.set_defaults(function=take_snapshot)
+    snapshots_parser = commands.add_parser(
+        'snapshots', help='lists the available snapshots')
+    snapshots_parser.add_argument('name', nargs='?',
+                                  help='name of the termbase')
+    snapshots_parser.set_defaults(function=list_snapshots)
+    restore_parser = commands.add_parser(
+        'restore', help='restores a snapshot as a new termbase')
+    restore_parser.add_argument('snapshot', help='path of the snapshot')
+    restore_parser.add_argument('name', help='name of the new termbase')
+    restore_parser.set_defaults(function=restore_snapshot)
+    journal_parser = commands.add_parser(
+        'journal', help='prints the changes made to a termbase')
+    journal_parser.add_argument('name', help='name of the termbase')
+    journal_parser.add_argument('--since', type=int, default=0,
+                                help='sequence number of the last known '
+                                     'change')
+    journal_parser.set_defaults(function=print_changes)
+    export_parser = commands.add_parser(
+        'export', help='exports a termbase in a delimited format')
+    export_parser.add_argument('name', help='name of the termbase')
+    export_parser.add_argument('output', help='path of the output file')
+    export_parser.add_argument('--source', required=True,
+                               help='locale of the source language')
+    export_parser.add_argument('--target', required=True,
+                               help='locale of the target language')
+    export_parser.add_argument('--format', choices=['csv', 'tsv'],
+                               default='csv')
+    export_parser.add_argument('--since', type=int,
+                               help='export only the entries changed after '
+                                    'the change with this sequence number')
+    export_parser.add_argument('--workers', type=int,
+                               help='number of processes exporting ranges '
+                                    'of entries in parallel')
+    export_parser.set_defaults(function=export_termbase)
+    merge_parser = commands.add_parser(
+        'merge', help='merges a termbase into another one')
+    merge_parser.add_argument('name', help='name of the target termbase')
+    merge_parser.add_argument('other', help='name (or file path) of the '
+                                            'termbase to be merged')
+    merge_parser.add_argument('--report',
+                              help='CSV file where conflicts are written')
+    merge_parser.set_defaults(function=merge_termbase)
+    duplicates_parser = commands.add_parser(
+        'duplicates', help='finds duplicate terms in different entries')
+    duplicates_parser.add_argument('name', help='name of the termbase')
+    duplicates_parser.add_argument('output',
+                                   help='CSV file where duplicates are '
+                                        'written')
+    duplicates_parser.add_argument(
+        '--threshold', type=float,
+        default=model.duplicates.DEFAULT_THRESHOLD,
+        help='minimum similarity of near duplicates')
+    duplicates_parser.add_argument('--workers', type=int,
+                                   help='number of processes')
+    duplicates_parser.set_defaults(function=find_duplicates)
+    shard_parser = commands.add_parser(
+        'shard', help='copies a termbase into a new sharded termbase')
+    shard_parser.add_argument('name', help='name of the termbase')
+    shard_parser.add_argument('sharded_name',
+                              help='name of the new sharded termbase')
+    shard_parser.add_argument('--shards', type=int, required=True,
+                              help='number of shards')
+    shard_parser.set_defaults(function=shard_termbase)
+    return parser
+
+
+def main(args=None):
+    """Parses the command line and runs the requested operation.
+
+    :param args: command line arguments (defaults to ``sys.argv``)
+    :type args: list
+    :rtype: None
+    """
+    logging.basicConfig(level=logging.WARNING)
+    options = get_parser().parse_args(args)
+    options.function(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,9 @@ class EntryController(AbstractController):
         super(EntryController, self).__init__()
         self._model = entry_model
         self._view = entry_view
+        # neighbours of the displayed entry are read in advance
+        self._prefetcher = mdl.EntryPrefetcher(
+            mdl.get_main_model().open_termbase)
         # sets the language of the entry model
         self._model.language = self._view.entry_list.current_language
 
@@ -80,7 +83,8 @@ class EntryController(AbstractController):
         update. The controller must then determine whether to insert a new entry
         or update an existing one, extract the information provided in the
         form, make it persistent in the local termbase and put the UI in a
-        consistent state (displaying the updated entry).
+        consistent state (displaying the updated entry). Only the values which
+        differ from the ones the form was loaded with are written.
 
         :rtype: None
         """
@@ -99,50 +103,28 @@ class EntryController(AbstractController):
         if form.is_new:
             # creates the new entry
             entry = mdl.get_main_model().open_termbase.create_entry()
-            # inserts all terms
-            for (locale, lemmata) in form.get_terms().items():
-                assert len(lemmata) == 1
-                lemma = lemmata.pop()
-                entry.add_term(lemma, locale, True)
         else:  # manipulating an existing entry
             entry = form.entry
-        for (property_id,
-             value) in form.get_entry_level_property_values().items():
-            # inserts entry-level properties
-            entry.set_property(property_id, value)
-        for ((language_id, property_id),
-             value) in form.get_language_level_property_values().items():
-            # insert language-level properties
-            entry.set_language_property(language_id, property_id, value)
-        for ((locale, lemma, property_id),
-             value) in form.get_term_level_property_values().items():
-            # inserts term properties
-            term = entry.get_term(locale, lemma)
-            if not term:  # term has been added during entry edit
-                entry.add_term(lemma, locale, False)
-                term = entry.get_term(locale, lemma)  # now it is there!
-            term.set_property(property_id, value)
-            # updates the entry model
+            self._prefetcher.invalidate(entry.entry_id)
+        # only the values that have been changed in the form are written
+        if not entry.apply_changes(form.get_changes()):
+            if form.is_new:  # the empty entry must not be left behind
+                mdl.get_main_model().open_termbase.delete_entry(entry)
+            message = QtGui.QMessageBox()
+            message.setIcon(QtGui.QMessageBox.Critical)
+            message.setText('Entry not saved')
+            message.setInformativeText('The changes could not be written to '
+                                       'the termbase, see the log for '
+                                       'details.')
+            message.exec()
+            return
+        # updates the entry model
         if form.is_new:  # insertion
             self._model.add_entry(entry)
         else:  # an existing entry is being edited
-            # checks for deleted terms
-            terms_to_delete = [
-                term for term in [t for locale in
-                                  mdl.get_main_model().open_termbase.languages
-                                  for t in entry.get_terms(locale)]  # all terms
-                if (term.locale, term.lemma) not in [(locale, lemma) for
-                                                     locale, lemmata_list
-                                                     in form.get_terms().items()
-                                                     for lemma in lemmata_list]]
-            # assuring no vedette term is **ever** deleted
-            assert all(not term.vedette for term in terms_to_delete)
-            # actually deletes the term
-            for term in terms_to_delete:
-                entry.delete_term(term)
-                # the dataChanged() signal must be emitted
+            # the dataChanged() signal must be emitted
             self._model.update_entry(entry)
-            # updates the UI
+        # updates the UI
         self._view.entry_display.display_entry(entry)
         self._view.entry_list.sort_entries()
 
@@ -150,13 +132,20 @@ class EntryController(AbstractController):
         """This handler is activated when the user selects a new entry in the
         GUI list. In this case the controller must update the content of the
         entry display in order to show the information about the selected entry.
+        The entries around the selected one in the list are then prefetched, so
+        that they can be displayed immediately when the user moves to them.
 
         :param index: index pointing to the new selected entry
         :type index: QtCore.QModelIndex
         :rtype: None
         """
         selected_entry = self._model.get_entry(index)
-        self._view.entry_display.display_entry(selected_entry)
+        snapshot = self._prefetcher.get(selected_entry.entry_id)
+        self._view.entry_display.display_entry(selected_entry, snapshot)
+        self._prefetcher.prefetch(
+            [self._model.get_entry(i).entry_id for i in
+             self._view.entry_list.get_neighbours(
+                 index, self._prefetcher.DISTANCE)])
 
     def _handle_edit_entry(self):
         """This handler is activated when the user requests to edit the entry
@@ -167,7 +156,8 @@ class EntryController(AbstractController):
         :rtype: None
         """
         entry = self._view.entry_display.current_entry
-        self._view.entry_display.display_update_entry_form(entry)
+        self._view.entry_display.display_update_entry_form(
+            entry, self._prefetcher.get(entry.entry_id))
 
     def _handle_delete_entry(self):
         """This handler is activated when the user asks to delete the entry that
@@ -178,6 +168,7 @@ class EntryController(AbstractController):
         :rtype: None
         """
         entry = self._view.entry_display.current_entry
+        self._prefetcher.invalidate(entry.entry_id)
         mdl.get_main_model().open_termbase.delete_entry(entry)
         self._model.delete_entry(entry)
         self._view.entry_list.sort_entries()
@@ -192,7 +183,8 @@ class EntryController(AbstractController):
         """
         entry = self._view.entry_display.current_entry
         if entry:
-            self._view.entry_display.display_entry(entry)
+            self._view.entry_display.display_entry(
+                entry, self._prefetcher.get(entry.entry_id))
         else:
             self._view.entry_display.display_welcome_screen()
 
@@ -204,4 +196,5 @@ class EntryController(AbstractController):
 
         :rtype: None
         """
+        self._prefetcher.close()
         self.finished.emit()
\ No newline at end of file
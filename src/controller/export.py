@@ -25,12 +25,12 @@ This module contains the controller that governs entry creation, update and
 deletion and manages entry visualization in the graphical user interface.
 """
 
-import csv
-
 from PyQt4 import QtCore
 from src.controller.abstract import AbstractController
 from src.view import ExportWizard
+from src.view.dialogs import run_task
 from src import model as mdl
+from src.model import export
 
 
 class ExportController(AbstractController):
@@ -60,29 +60,11 @@ class ExportController(AbstractController):
         and 'third' keys that will correspond to export fields
         :rtype: list
         """
-        third_field = self._view.third_field
-        third_field_details = self._view.third_field_details
-        locales = self._view.selected_locales
-        result = []
-        for entry in self._model.open_termbase.entries:
-            source_terms = entry.get_terms(locales[0])
-            target_terms = entry.get_terms(locales[1])
-            if third_field_details == 'entry':
-                third_value = entry.get_property(third_field.prop_id)
-                result.extend([
-                    {'source': s.lemma, 'target': t.lemma, 'third': third_value}
-                    for s in source_terms for t in target_terms
-                ])
-            elif third_field_details == 'source':
-                result.extend(
-                    [{'source': s.lemma, 'target': t.lemma,
-                      'third': s.get_property(third_field.prop_id)}
-                     for s in source_terms for t in target_terms])
-            elif third_field_details == 'target':
-                result.extend([{'source': s.lemma, 'target': t.lemma,
-                                'third': t.get_property(third_field.prop_id)}
-                               for s in source_terms for t in target_terms])
-        return result
+        return export.get_delimited_values(self._model.open_termbase,
+                                           self._view.selected_locales,
+                                           self._view.third_field,
+                                           self._view.third_field_details,
+                                           self._view.changes_since)
 
     def _write_to_csv(self):
         """Writes the data in comma-separated format, basing on the
@@ -91,13 +73,7 @@ class ExportController(AbstractController):
 
         :rtype: None
         """
-        output_path = self._view.output_file_path
-        values = self._get_values()
-        with open(output_path, 'w') as file_handle:
-            writer = csv.DictWriter(file_handle,
-                                    ['source', 'target', 'third'],
-                                    quoting=csv.QUOTE_MINIMAL)
-            writer.writerows(values)
+        export.write_delimited(self._view.output_file_path, self._get_values())
 
     def _write_to_tsv(self):
         """Writes the data in tab-separated format, basing on the
@@ -106,15 +82,27 @@ class ExportController(AbstractController):
 
         :rtype: None
         """
-        output_path = self._view.output_file_path
-        values = self._get_values()
-        with open(output_path, 'w') as file_handle:
-            writer = csv.DictWriter(file_handle,
-                                    ['source', 'target', 'third'],
-                                    delimiter='\t',
-                                    quoting=csv.QUOTE_MINIMAL)
-            writer.writerows(values)
+        export.write_delimited(self._view.output_file_path, self._get_values(),
+                               delimiter='\t')
+
+    def _write_in_parallel(self, delimiter):
+        """Writes the data in delimited format with a pool of processes,
+        showing the progress of the export in a dialog from which it can be
+        cancelled.
 
+        :param delimiter: field delimiter
+        :type delimiter: str
+        :rtype: None
+        """
+        view = self._view
+        # widgets must not be accessed by the background thread
+        arguments = (view.output_file_path, view.selected_locales,
+                     view.third_field, view.third_field_details, delimiter,
+                     view.changes_since)
+        run_task(view.parentWidget(), view.tr('Export termbase data'),
+                 view.tr('Exporting termbase...'),
+                 lambda termbase, progress: export.write_delimited_parallel(
+                     termbase, *arguments, progress=progress))
 
     @QtCore.pyqtSlot()
     def _handle_wizard_accepted(self):
@@ -125,7 +113,10 @@ class ExportController(AbstractController):
         :rtype: None
         """
         export_type = self._view.export_type
-        if export_type == ExportWizard.TYPE_CSV:
+        if self._view.parallel_export:
+            self._write_in_parallel(
+                ',' if export_type == ExportWizard.TYPE_CSV else '\t')
+        elif export_type == ExportWizard.TYPE_CSV:
             self._write_to_csv()
         elif export_type == ExportWizard.TYPE_TSV:
             self._write_to_tsv()
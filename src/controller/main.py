@@ -27,13 +27,15 @@ processing all those events that are generated there.
 """
 
 import os
+import sqlite3
+
+from PyQt4 import QtCore
 
 from src import model as mdl
 from src import view as gui
 from src.controller.abstract import AbstractController
-from src.controller.newtermbase import NewTermbaseController
-from src.controller.export import ExportController
 from src.controller.entry import EntryController
+from src.view.dialogs import run_task
 
 
 class MainController(AbstractController):
@@ -54,6 +56,12 @@ class MainController(AbstractController):
         self._view.fire_event.connect(self.handle_event)
         # child controllers
         self._children = {}
+        # takes snapshots of the open termbase in the background
+        self._snapshot_scheduler = mdl.SnapshotScheduler(self)
+        self._snapshot_scheduler.snapshot_finished.connect(
+            self._report_snapshot)
+        QtCore.QCoreApplication.instance().aboutToQuit.connect(
+            self._snapshot_scheduler.wait)
 
     def _add_child(self, child_name, child_ref):
         """Registers the controller with the given name in the internal data
@@ -81,12 +89,51 @@ class MainController(AbstractController):
         """
         del self._children[child_name]
 
+    def _handle_add_reference_termbase(self, name):
+        """Opens a termbase read-only for reference, so that it is searched
+        by lookups along with the open termbase.
+
+        :param name: the name of the termbase to open
+        :type name: str
+        :rtype: None
+        """
+        main_model = mdl.get_main_model()
+        open_names = [t.name for t in main_model.reference_termbases]
+        if main_model.open_termbase:
+            open_names.append(main_model.open_termbase.name)
+        if name in open_names:
+            self._view.display_message(
+                self.tr('Termbase {0} is already open.').format(name))
+            return
+        try:
+            termbase = mdl.Termbase(name, read_only=True)
+        except ValueError as exc:
+            self._view.display_message(str(exc))
+            return
+        main_model.add_reference_termbase(termbase)
+        self._view.display_message(
+            self.tr('Termbase {0} opened for reference.').format(name))
+
+    def _handle_close_reference_termbases(self):
+        """Closes all the reference termbases.
+
+        :rtype: None
+        """
+        mdl.get_main_model().close_reference_termbases()
+        self._view.display_message(self.tr('Reference termbases closed.'))
+
     def _handle_close_termbase(self):
         """Closes the currently open termbase.
 
         :rtype: None
         """
+        termbase = mdl.get_main_model().open_termbase
         mdl.get_main_model().open_termbase = None
+        if termbase:
+            if not termbase.read_only:
+                # gives the space freed by deletions back to the file system
+                mdl.maintenance.reclaim_free_pages(termbase)
+            termbase.dispose()
         self._view.display_message(self.tr('Current termbase closed.'))
 
     def _handle_delete_termbase(self, name):
@@ -102,6 +149,8 @@ class MainController(AbstractController):
         file_name = mdl.Termbase(name).get_termbase_file_name()
         if os.path.exists(file_name):
             os.remove(file_name)
+            mdl.delete_recognition_caches(name)
+            mdl.get_termbase_catalog().invalidate(name)
             self._view.display_message(
                 self.tr('Termbase {0} has been deleted.'.format(name)))
 
@@ -117,12 +166,13 @@ class MainController(AbstractController):
     def _handle_entry_displayed(self):
         """When an entry is displayed in the entry view, that entry can be
         edited or deleted, so this event handler activates the corresponding
-        actions in the main view.
+        actions in the main view, unless the termbase is read-only.
 
         :rtype: None
         """
-        self._view.edit_entry_action.setEnabled(True)
-        self._view.delete_entry_action.setEnabled(True)
+        writable = not mdl.get_main_model().open_termbase.read_only
+        self._view.edit_entry_action.setEnabled(writable)
+        self._view.delete_entry_action.setEnabled(writable)
         self._view.cancel_edit_action.setEnabled(False)
 
     def _handle_export(self):
@@ -131,21 +181,88 @@ class MainController(AbstractController):
 
         :rtype: None
         """
+        # imported here since it is not needed until the first export
+        from src.controller.export import ExportController
         wizard = gui.ExportWizard(self._view)
         self._add_child('export', ExportController(wizard))
 
-    def _handle_open_termbase(self, name):
+    def _handle_find_duplicates(self, path):
+        """Finds the duplicate terms of the open termbase in the background
+        and writes their report.
+
+        :param path: path of the file where the report must be saved
+        :type path: str
+        :rtype: None
+        """
+        duplicates = run_task(self._view, self.tr('Find duplicates'),
+                              self.tr('Finding duplicates...'),
+                              lambda termbase, progress:
+                              mdl.duplicates.find_duplicates(
+                                  termbase, progress=progress))
+        if duplicates is None:
+            return
+        mdl.duplicates.write_report(duplicates, path)
+        self._view.display_message(
+            self.tr('{0} duplicates found.').format(len(duplicates)))
+
+    def _handle_merge_termbase(self, name):
+        """Merges another termbase into the currently open termbase in the
+        background, then opens the latter again so that the new entries are
+        displayed and shows the outcome of the merge.
+
+        :param name: name of the termbase to be merged
+        :type name: str
+        :rtype: None
+        """
+        report = run_task(self._view, self.tr('Merge termbase'),
+                          self.tr('Merging {0}...').format(name),
+                          lambda termbase, progress:
+                          termbase.merge(name, progress))
+        if not report:
+            return
+        termbase = mdl.get_main_model().open_termbase
+        # the entry controller and its prefetcher belong to the old session
+        entry_controller = self._children.get('entry')
+        if entry_controller:
+            self._view.fire_event.disconnect(entry_controller.handle_event)
+            entry_controller.handle_event('close_termbase', {})
+        mdl.get_main_model().open_termbase = None
+        termbase.dispose()
+        self._handle_open_termbase(termbase.name)
+        path = self._view.display_merge_report(report)
+        if path:
+            mdl.merge.write_report(report, path)
+
+    def _handle_open_termbase(self, name, read_only=False):
         """Opens an existing termbase.
 
         :param name: the name of the termbase to open
         :type name: str
+        :param read_only: whether the termbase is opened read-only, only to
+        look up its entries
+        :type read_only: bool
         :rtype: None
         """
+        reference_names = [
+            t.name for t in mdl.get_main_model().reference_termbases]
+        if name in reference_names:
+            self._view.display_message(
+                self.tr('Termbase {0} is already open for reference.').format(
+                    name))
+            return
         # creates a termbase and saves it in the main application model
-        termbase = mdl.Termbase(name)
+        try:
+            termbase = mdl.Termbase(name, read_only=read_only)
+        except ValueError as exc:
+            self._view.display_message(str(exc))
+            return
         mdl.get_main_model().open_termbase = termbase
         # prints a message in the view
-        self._view.display_message('Currently working on {0}'.format(name))
+        if read_only:
+            self._view.display_message(
+                'Currently looking up {0} (read-only)'.format(name))
+        else:
+            self._view.display_message('Currently working on {0}'.format(name))
         # creates an entry model
         entry_model = mdl.EntryModel(termbase)
         # initializes the entry-specific part of the view with the entry model
@@ -162,6 +279,8 @@ class MainController(AbstractController):
 
         :rtype: None
         """
+        # imported here since it is not needed until the first creation
+        from src.controller.newtermbase import NewTermbaseController
         # instantiates the model
         termbase_definition_model = mdl.TermbaseDefinitionModel()
         # creates the view
@@ -174,6 +293,52 @@ class MainController(AbstractController):
         wizard.accepted.connect(
             lambda: self._handle_open_termbase(wizard.field('termbase_name')))
 
+    def _handle_take_snapshot(self):
+        """Starts taking a snapshot of the currently open termbase.
+
+        :rtype: None
+        """
+        if self._snapshot_scheduler.take_snapshot():
+            self._view.display_message(self.tr('Taking snapshot...'))
+        else:
+            self._view.display_message(
+                self.tr('A snapshot is already being taken.'))
+
+    @QtCore.pyqtSlot(object, str)
+    def _report_snapshot(self, snapshot, error):
+        """Informs the user that a snapshot has been taken (or has failed).
+
+        :param snapshot: the snapshot that has been taken
+        :type snapshot: Snapshot
+        :param error: error message in case of failure
+        :type error: str
+        :rtype: None
+        """
+        if snapshot:
+            self._view.display_message(
+                self.tr('Snapshot of {0} taken.').format(
+                    snapshot.termbase_name))
+        else:
+            self._view.display_message(
+                self.tr('Snapshot failed: {0}').format(error))
+
+    def _handle_restore_snapshot(self, file_name, name):
+        """Restores a snapshot as a new termbase and opens it.
+
+        :param file_name: path of the snapshot
+        :type file_name: str
+        :param name: name of the new termbase
+        :type name: str
+        :rtype: None
+        """
+        try:
+            mdl.backup.restore_snapshot(file_name, name)
+        except (ValueError, sqlite3.Error, OSError) as exc:
+            self._view.display_message(
+                self.tr('Snapshot not restored: {0}').format(exc))
+            return
+        self._handle_open_termbase(name)
+
     def _handle_ui_reset(self):
         """When the UI is reset no entry can be manipulated, so this event
         handler prevents the entry manipulation actions from being triggered.
@@ -63,36 +63,17 @@ class NewTermbaseController(AbstractController):
         wizard fields or in the associated model and save the information on
         disk.
         """
-        termbase_name = self._view.get_termbase_name()
-        new_tb = mdl.Termbase(termbase_name)
-        self._populate_languages(new_tb)
-        self._populate_properties(new_tb)
+        template_name = self._view.get_template_name()
+        if template_name:
+            mdl.Termbase.create_from_template(self._view.get_termbase_name(),
+                                              template_name,
+                                              self._view.get_copy_entries())
+        else:
+            mdl.Termbase.create(self._view.get_termbase_name(),
+                                self._view.get_termbase_locales(),
+                                self._model.get_properties())
         self.finished.emit()
 
-    def _populate_languages(self, termbase):
-        """Adds the languages that have been chosen in the UI to the newly
-        created termbase.
-
-        :param termbase: termbase to be populated
-        :type termbase: mdl.Termbase
-        :rtype: None
-        """
-        locales = self._view.get_termbase_locales()
-        for locale in locales:
-            termbase.add_language(locale)
-
-    def _populate_properties(self, termbase):
-        """Queries the termbase definition model for the propeties that have
-        been added during configuration and adds them to the actual termbase
-        structure on disk.
-
-        :param termbase: reference to the termbase to be populated
-        :type termbase: mdl.Termbase
-        :rtype: None
-        """
-        for prop_dictionary in self._model.get_properties():
-            termbase.schema.add_property(**prop_dictionary)
-
     def _handle_new_property(self, name, prop_type, level, values=()):
         """This event handler is activated whenever the user asks to add a new
         property to the termbase definition model.
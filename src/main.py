@@ -23,8 +23,21 @@
 
 This module is the main entry point of the program, containing its main function
 as well as the definition of the ``QApplication`` where the event loop is run.
+
+When the program is started with the ``--profile-startup`` option, the time
+spent in each startup phase is measured and reported on the standard error
+once the main window has been drawn for the first time. The
+``--profile-queries`` option enables the collection of the SQL statement
+statistics from the start.
+"""
+
+import time
+
+_START_TIME = time.perf_counter()
+"""Time when the program was started, before any other module is imported.
 """
 
+import argparse
 import logging.config
 import sys
 
@@ -48,35 +61,123 @@ def initialize_logging():
     logging.config.fileConfig('logging.conf')
 
 
+class StartupProfiler(object):
+    """Simple profiler recording the duration of the startup phases of the
+    application, which are measured one after the other.
+    """
+
+    def __init__(self, enabled):
+        """Constructor method.
+
+        :param enabled: whether the phases must be measured at all
+        :type enabled: bool
+        :rtype: StartupProfiler
+        """
+        self.enabled = enabled
+        self._phases = []
+        self._last_time = _START_TIME
+        self.end_phase('imports')
+
+    def end_phase(self, name):
+        """Marks the end of a startup phase, which started when the previous
+        phase ended.
+
+        :param name: name of the phase
+        :type name: str
+        :rtype: None
+        """
+        now = time.perf_counter()
+        self._phases.append((name, now - self._last_time))
+        self._last_time = now
+
+    def report(self):
+        """Writes the duration of each phase on the standard error.
+
+        :rtype: None
+        """
+        if not self.enabled:
+            return
+        lines = ['{0:<20}{1:>10.1f} ms'.format(name, duration * 1000)
+                 for (name, duration) in self._phases]
+        lines.append('{0:<20}{1:>10.1f} ms'.format(
+            'total', (self._last_time - _START_TIME) * 1000))
+        sys.stderr.write('\n'.join(['Startup profile:'] + lines) + '\n')
+
+
+def parse_arguments(args):
+    """Extracts the application-specific options from the command line, the
+    remaining arguments are left to Qt.
+
+    :param args: list of arguments from the command line
+    :type args: list
+    :returns: the parsed options and the remaining arguments
+    :rtype: tuple
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--profile-startup', action='store_true')
+    parser.add_argument('--profile-queries', action='store_true')
+    options, remaining = parser.parse_known_args(args[1:])
+    return options, args[:1] + remaining
+
+
 class MetaTermApplication(QtGui.QApplication):
     """This is the application hosting the main event loop, directly inherited
     by the superclass and started when the exec() method is called.
     """
 
-    def __init__(self, args):
+    def __init__(self, args, profile_startup=False, profile_queries=False):
         """Constructor method for the application.
 
         :param args: list of arguments from the command line
         :type args: list
+        :param profile_startup: whether to report the startup phase timings
+        :type profile_startup: bool
+        :param profile_queries: whether to collect SQL statement statistics
+        :type profile_queries: bool
         :rtype: MetaTermApplication
         """
         super(MetaTermApplication, self).__init__(args)
+        self._profiler = StartupProfiler(profile_startup)
+        self._profiler.end_phase('application')
         # initializes logging
         initialize_logging()
+        if profile_queries or logging.getLogger(
+                'src.model.dataaccess.sql').isEnabledFor(logging.DEBUG):
+            model.get_query_statistics().enabled = True
+        self._profiler.end_phase('logging')
         # initializes the termbase folder
         model.initialize_tb_folder()
+        self._profiler.end_phase('termbase folder')
         # styles the application
         self._apply_style()
+        self._profiler.end_phase('style')
         # translates the application UI
         translator = QtCore.QTranslator()
         translator.load(':/l10n/{0}'.format(QtCore.QLocale.system().name()))
         self.installTranslator(translator)
+        self._profiler.end_phase('translator')
         # creates the view
         self._view = view.MainWindow()
+        self._profiler.end_phase('main window')
         # creates the controller
         self._controller = controller.MainController(self._view)
+        self._profiler.end_phase('controller')
         # has the view drawn on the screen (finally)
         self._view.show()
+        self._profiler.end_phase('show')
+        if profile_startup:
+            # run as soon as the event loop has drawn the window
+            QtCore.QTimer.singleShot(0, self._handle_first_paint)
+
+    @QtCore.pyqtSlot()
+    def _handle_first_paint(self):
+        """Completes the startup profile when the main window has been drawn
+        for the first time.
+
+        :rtype: None
+        """
+        self._profiler.end_phase('first paint')
+        self._profiler.report()
 
     def _apply_style(self):
         """Applies the stylesheet to the whole application.
@@ -93,5 +194,7 @@ class MetaTermApplication(QtGui.QApplication):
 
 # what to to when this module is executed as the main module (which it is)
 if __name__ == '__main__':
-    app = MetaTermApplication(sys.argv)
+    options, qt_args = parse_arguments(sys.argv)
+    app = MetaTermApplication(qt_args, options.profile_startup,
+                              options.profile_queries)
     sys.exit(app.exec())
@@ -27,8 +27,15 @@ These include the ``sql`` module where the basic configuration of SQLAlchemy is
 which contains the object-oriented data access layer of the application.
 """
 
-from src.model.dataaccess import Termbase
+from src.model.dataaccess import (Termbase, EntryChanges, AsyncTermbase,
+                                  EntryPrefetcher, FederatedLookup,
+                                  ShardedTermbase,
+                                  TermRecognizer, delete_recognition_caches,
+                                  get_query_statistics, get_termbase_catalog,
+                                  maintenance, backup, merge, duplicates)
 from src.model.dataaccess.orm import initialize_tb_folder, get_termbase_names
 from src.model.itemmodels import (TermbaseDefinitionModel,
-                                  PropertyNode, EntryModel)
+                                  PropertyNode, EntryModel,
+                                  TermbaseCatalogModel)
 from src.model.main import get_main_model
+from src.model.snapshots import SnapshotScheduler
@@ -29,3 +29,10 @@ PROP_LEVELS = ['E', 'L', 'T']
 
 PROP_TYPES = ['P', 'T', 'I']
 "Property types: P = picklist, T = text or I = image."
+
+CHANGE_OPERATIONS = ['I', 'U', 'D']
+"Operations of the change journal: I = insert, U = update or D = delete."
+
+CHANGE_KINDS = ['entry', 'term', 'entry_property', 'language_property',
+                'term_property']
+"Kinds of items whose changes are recorded in the change journal."
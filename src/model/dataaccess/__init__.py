@@ -27,3 +27,15 @@ deal with mapping and (detached) transfer objects all the time.
 """
 
 from src.model.dataaccess.termbase import Termbase
+from src.model.dataaccess.entry import EntryChanges
+from src.model.dataaccess import maintenance, backup, merge, duplicates
+from src.model.dataaccess.aio import AsyncTermbase
+from src.model.dataaccess.prefetch import EntryPrefetcher
+from src.model.dataaccess.collation import get_sort_key, MAX_SORT_KEY
+from src.model.dataaccess.federation import FederatedLookup, FederatedMatch
+from src.model.dataaccess.sharding import ShardedTermbase
+from src.model.dataaccess.recognition import (
+    TermRecognizer, Match, delete_recognition_caches)
+from src.model.dataaccess.instrumentation import get_query_statistics
+from src.model.dataaccess.catalog import (
+    get_termbase_catalog, CatalogEntry)
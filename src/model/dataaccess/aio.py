@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: src.model.dataaccess.aio
+
+This module contains an asynchronous facade over a termbase which is meant to
+be used from ``asyncio`` event loops. Queries are run on a bounded pool of
+worker threads, each of them owning its own read connection to the termbase
+file, and results are returned as awaitables. Cancelling an awaitable either
+prevents the query from starting or interrupts it if it is already running.
+
+Since data access objects such as ``Entry`` or ``Term`` perform blocking
+queries whenever they are accessed, all results are returned as plain values.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import sqlite3
+import threading
+
+import sqlalchemy
+import sqlalchemy.orm
+import sqlalchemy.pool
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.model.dataaccess import orm, lookup, instrumentation
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+
+class AsyncTermbase(object):
+    """Asynchronous read-only facade of a ``Termbase``. Every method returns
+    an awaitable which is resolved on the event loop when the corresponding
+    query has been executed by one of the worker threads.
+    """
+
+    _MAX_WORKERS = 4
+    """Default number of worker threads (and read connections).
+    """
+
+    def __init__(self, termbase, max_workers=_MAX_WORKERS):
+        """Constructor method.
+
+        :param termbase: termbase to be queried
+        :type termbase: Termbase
+        :param max_workers: maximum number of concurrent queries
+        :type max_workers: int
+        :rtype: AsyncTermbase
+        """
+        self._tb = termbase
+        file_name = termbase.get_termbase_file_name()
+
+        def connect():
+            return sqlite3.connect('file:{0}?mode=ro'.format(file_name),
+                                   uri=True, check_same_thread=False)
+        # one read-only connection for each worker thread, reused across
+        # queries
+        self._engine = sqlalchemy.create_engine(
+            'sqlite://', creator=connect,
+            poolclass=sqlalchemy.pool.SingletonThreadPool,
+            pool_size=max_workers)
+        instrumentation.install(self._engine)
+        session = sqlalchemy.orm.sessionmaker(self._engine)
+        self._session = sqlalchemy.orm.scoped_session(session)
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    @contextmanager
+    def _get_read_session(self):
+        """Returns a session bound to the read connection of the calling
+        worker thread, nothing is ever committed through it.
+
+        :returns: session to be used in with blocks
+        :rtype: object
+        """
+        session = self._session()
+        try:
+            yield session
+        finally:
+            session.rollback()
+            session.close()
+
+    def _execute(self, job):
+        """Runs a job inside a worker thread, this is where the actual (and
+        blocking) query takes place.
+
+        :param job: the job to be executed
+        :type job: _Job
+        :returns: the result of the query function of the job
+        :rtype: object
+        """
+        with self._get_read_session() as session:
+            job.started(session.connection().connection)
+            try:
+                return job.function(session, *job.args)
+            except SQLAlchemyError as exc:
+                # interrupted queries of cancelled jobs are expected
+                if job.cancelled:
+                    _LOG.debug('query interrupted: %s', exc)
+                else:
+                    _LOG.exception(exc)
+                raise
+            finally:
+                job.finished()
+
+    def _submit(self, function, *args):
+        """Schedules a query function to be executed in the worker pool.
+
+        :param function: callable accepting a session and the given arguments
+        :type function: callable
+        :returns: an awaitable resolved with the result of the function
+        :rtype: asyncio.Future
+        """
+        job = _Job(function, args)
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self._executor, self._execute, job)
+        future.add_done_callback(job.handle_done)
+        return future
+
+    def entry_ids(self):
+        """Retrieves the IDs of all the entries of the termbase.
+
+        :returns: an awaitable resolved with a list of entry IDs
+        :rtype: asyncio.Future
+        """
+        return self._submit(_query_entry_ids)
+
+    def languages(self):
+        """Retrieves the locales of the languages of the termbase.
+
+        :returns: an awaitable resolved with a list of locales
+        :rtype: asyncio.Future
+        """
+        return self._submit(_query_languages)
+
+    def get_vedette(self, entry_id, locale):
+        """Retrieves the lemma of the vedette term of an entry.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :param locale: locale of the language of the vedette
+        :type locale: str
+        :returns: an awaitable resolved with the lemma (or None)
+        :rtype: asyncio.Future
+        """
+        return self._submit(_query_vedette, entry_id, locale)
+
+    def get_terms(self, entry_id, locale):
+        """Retrieves the terms of an entry for the given language.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :param locale: locale of the language of the terms
+        :type locale: str
+        :returns: an awaitable resolved with a list of (term ID, lemma,
+        vedette) 3-tuples
+        :rtype: asyncio.Future
+        """
+        return self._submit(_query_terms, entry_id, locale)
+
+    def lookup(self, locale, lemma, target_locales=()):
+        """Looks up a lemma in the termbase and retrieves the terms of the
+        entries it appears in for the given target languages.
+
+        :param locale: locale of the language of the lemma
+        :type locale: str
+        :param lemma: lemma to be looked up
+        :type lemma: str
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: tuple
+        :returns: an awaitable resolved with a dictionary keyed by entry IDs
+        whose values are dictionaries mapping target locales to lists of lemmas
+        :rtype: asyncio.Future
+        """
+        return self._submit(_query_lookup, locale, lemma, tuple(target_locales))
+
+    def lookup_many(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata at once, see ``Termbase.lookup_many``.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: an awaitable resolved with a dictionary mapping each lemma
+        to a dictionary keyed by entry IDs, whose values map target locales
+        to lists of lemmata
+        :rtype: asyncio.Future
+        """
+        return self._submit(lookup.lookup_many, locale, list(lemmas),
+                            list(target_locales))
+
+    def close(self):
+        """Releases the worker threads and their connections, queries that
+        have not been started yet are discarded.
+
+        :rtype: None
+        """
+        self._executor.shutdown(wait=False)
+        self._session.remove()
+        self._engine.dispose()
+
+
+class _Job(object):
+    """Bookkeeping of a single query submitted to the worker pool, needed to
+    interrupt the query on the underlying connection when it is cancelled.
+    """
+
+    def __init__(self, function, args):
+        """Constructor method.
+
+        :param function: query function to be run
+        :type function: callable
+        :param args: positional arguments of the query function
+        :type args: tuple
+        :rtype: _Job
+        """
+        self.function = function
+        self.args = args
+        self.cancelled = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def started(self, connection):
+        """Records the connection the job is running on.
+
+        :param connection: DB-API connection of the worker thread
+        :rtype: None
+        """
+        with self._lock:
+            self._connection = connection
+
+    def finished(self):
+        """Forgets the connection once the job is over.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._connection = None
+
+    def handle_done(self, future):
+        """Interrupts the running query (if any) when the awaitable of the job
+        is cancelled.
+
+        :param future: the awaitable of the job
+        :type future: asyncio.Future
+        :rtype: None
+        """
+        if future.cancelled():
+            self.cancelled = True
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.interrupt()
+
+
+def _query_entry_ids(session):
+    return [e[0] for e in session.query(orm.Entry.entry_id)]
+
+
+def _query_languages(session):
+    return [l[0] for l in session.query(orm.Language.locale)]
+
+
+def _query_vedette(session, entry_id, locale):
+    return session.query(orm.Term.lemma).filter(
+        orm.Term.entry_id == entry_id,
+        orm.Term.lang_id == locale,
+        orm.Term.vedette).scalar()
+
+
+def _query_terms(session, entry_id, locale):
+    return [(t.term_id, t.lemma, t.vedette) for t in
+            session.query(orm.Term).filter(orm.Term.entry_id == entry_id,
+                                           orm.Term.lang_id == locale)]
+
+
+def _query_lookup(session, locale, lemma, target_locales):
+    return lookup.lookup_many(session, locale, [lemma], target_locales)[lemma]
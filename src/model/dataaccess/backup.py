@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.backup
+
+This module contains the hot backup of termbases, which relies on the SQLite
+online backup API so that a consistent copy of a termbase can be made while
+the termbase is being used. Pages are copied in small batches, releasing the
+lock on the termbase between batches, so that writers are never blocked for
+long.
+
+Backups are stored as snapshots in a folder of their termbase inside the
+``snapshots`` folder of the termbase folder, one file per snapshot named after
+the (UTC) time when the snapshot was taken. A snapshot can be restored as a new
+termbase.
+"""
+
+import collections
+import datetime
+import os
+import sqlite3
+
+from src.model.dataaccess import orm
+
+SNAPSHOT_DIR = 'snapshots'
+"""Name of the folder (inside the termbase folder) where snapshots are stored.
+"""
+
+_PAGES_PER_STEP = 1024
+"""Number of pages copied in each step of the backup.
+"""
+
+_SLEEP = 0.005
+"""Time (in seconds) to wait between two steps of the backup.
+"""
+
+_TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S%fZ'
+"""Format of the timestamps used as snapshot file names.
+"""
+
+Snapshot = collections.namedtuple('Snapshot', ['termbase_name', 'file_name',
+                                               'timestamp', 'size'])
+"""A snapshot of a termbase, with the time when it was taken and its size.
+"""
+
+
+def backup_file(source_file_name, target_file_name, progress=None):
+    """Copies a database file by means of the online backup API. The copy is
+    written to a temporary file first, which replaces the target file only
+    once the backup is complete.
+
+    :param source_file_name: path of the database to be copied
+    :type source_file_name: str
+    :param target_file_name: path of the copy
+    :type target_file_name: str
+    :param progress: callable receiving the number of pages copied so far and
+    the total number of pages
+    :type progress: callable
+    :rtype: None
+    """
+    temp_file_name = '{0}.{1}.tmp'.format(target_file_name, os.getpid())
+    source = sqlite3.connect(source_file_name)
+    try:
+        target = sqlite3.connect(temp_file_name)
+        try:
+            source.backup(target, pages=_PAGES_PER_STEP, sleep=_SLEEP,
+                          progress=(lambda status, remaining, total:
+                                    progress(total - remaining, total))
+                          if progress else None)
+        finally:
+            target.close()
+    except sqlite3.Error:
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+        raise
+    finally:
+        source.close()
+    os.replace(temp_file_name, target_file_name)
+
+
+def get_snapshot_dir(name):
+    """Returns the folder where the snapshots of a termbase are stored.
+
+    :param name: name of the termbase
+    :type name: str
+    :rtype: str
+    """
+    return os.path.join(orm.DB_DIR, SNAPSHOT_DIR, name)
+
+
+def create_snapshot(termbase, progress=None):
+    """Takes a snapshot of a termbase, which can be in use meanwhile.
+
+    :param termbase: termbase to be copied
+    :type termbase: Termbase
+    :param progress: callable receiving the number of pages copied so far and
+    the total number of pages
+    :type progress: callable
+    :returns: the new snapshot
+    :rtype: Snapshot
+    """
+    snapshot_dir = get_snapshot_dir(termbase.name)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    timestamp = datetime.datetime.utcnow()
+    file_name = os.path.join(snapshot_dir, '{0}.sqlite'.format(
+        timestamp.strftime(_TIMESTAMP_FORMAT)))
+    backup_file(termbase.get_termbase_file_name(), file_name, progress)
+    return Snapshot(termbase.name, file_name, timestamp,
+                    os.path.getsize(file_name))
+
+
+def get_snapshots(name=None):
+    """Returns the snapshots of a termbase or, if no name is given, of all the
+    termbases.
+
+    :param name: name of the termbase
+    :type name: str
+    :returns: a list of snapshots, from the most recent to the oldest one
+    :rtype: list
+    """
+    root = os.path.join(orm.DB_DIR, SNAPSHOT_DIR)
+    if name is not None:
+        names = [name]
+    elif os.path.isdir(root):
+        names = os.listdir(root)
+    else:
+        names = []
+    snapshots = []
+    for termbase_name in names:
+        snapshot_dir = get_snapshot_dir(termbase_name)
+        if not os.path.isdir(snapshot_dir):
+            continue
+        for file_name in os.listdir(snapshot_dir):
+            try:
+                timestamp = datetime.datetime.strptime(
+                    os.path.splitext(file_name)[0], _TIMESTAMP_FORMAT)
+            except ValueError:  # not a snapshot (e.g. a temporary file)
+                continue
+            path = os.path.join(snapshot_dir, file_name)
+            snapshots.append(Snapshot(termbase_name, path, timestamp,
+                                      os.path.getsize(path)))
+    snapshots.sort(key=lambda s: s.timestamp, reverse=True)
+    return snapshots
+
+
+def prune_snapshots(name, keep):
+    """Deletes the oldest snapshots of a termbase, keeping only the given
+    number of most recent ones.
+
+    :param name: name of the termbase
+    :type name: str
+    :param keep: number of snapshots to be kept
+    :type keep: int
+    :returns: the deleted snapshots
+    :rtype: list
+    """
+    deleted = get_snapshots(name)[keep:]
+    for snapshot in deleted:
+        os.remove(snapshot.file_name)
+    return deleted
+
+
+def restore_snapshot(snapshot_file_name, name):
+    """Restores a snapshot as a new termbase.
+
+    :param snapshot_file_name: path of the snapshot
+    :type snapshot_file_name: str
+    :param name: name of the new termbase
+    :type name: str
+    :returns: the path of the new termbase file
+    :rtype: str
+    :raises ValueError: if a termbase with the given name already exists
+    """
+    file_name = os.path.join(orm.DB_DIR, '{0}.sqlite'.format(name))
+    if os.path.exists(file_name):
+        raise ValueError('termbase {0} already exists'.format(name))
+    backup_file(snapshot_file_name, file_name)
+    return file_name
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.catalog
+
+This module contains the catalog of the termbases available on the system,
+which keeps the metadata of each termbase file (languages, number of entries,
+size and modification time) in a cache file stored in the termbase folder.
+Metadata are read again only for the termbases whose file has been modified
+since the last refresh, directly through a read-only SQLite connection rather
+than by opening the termbase, so that the termbase list can be displayed
+without scanning every database.
+
+Refreshing the catalog stats every termbase file, hence it should be done in a
+background thread if the termbase folder is on a slow file system.
+"""
+
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from src.model.dataaccess import orm
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+_CACHE_FILE_NAME = 'catalog.json'
+"""Name of the cache file in the termbase folder.
+"""
+
+_CACHE_VERSION = 1
+"""Version of the cache format, to be increased whenever it changes.
+"""
+
+_EXTENSION = '.sqlite'
+"""Extension of termbase files.
+"""
+
+_TERMBASE_CATALOG = None
+"""Reference to the single instance of the termbase catalog.
+"""
+
+
+def get_termbase_catalog():
+    """Returns a reference to the catalog of the termbases available on the
+    system, creating it if accessed for the first time (lazy initialization).
+
+    :returns: reference to the termbase catalog
+    :rtype: TermbaseCatalog
+    """
+    global _TERMBASE_CATALOG
+    if not _TERMBASE_CATALOG:
+        _TERMBASE_CATALOG = TermbaseCatalog()
+    return _TERMBASE_CATALOG
+
+
+CatalogEntry = collections.namedtuple(
+    'CatalogEntry', ['name', 'languages', 'entry_number', 'size', 'mtime'])
+"""Metadata of a termbase: its name, list of locales, number of entries, size
+in bytes and modification time (in nanoseconds since the epoch).
+"""
+
+
+def read_metadata(file_name):
+    """Reads the languages and the number of entries of a termbase directly
+    from its file, without creating the file if it does not exist.
+
+    :param file_name: path of the termbase file
+    :type file_name: str
+    :returns: a (locales, number of entries) 2-tuple
+    :rtype: tuple
+    """
+    connection = sqlite3.connect('file:{0}?mode=ro'.format(file_name),
+                                 uri=True)
+    try:
+        locales = [row[0] for row in connection.execute(
+            'SELECT locale FROM {0} ORDER BY locale'.format(
+                orm.Language.__tablename__))]
+        entry_number = connection.execute('SELECT COUNT(*) FROM {0}'.format(
+            orm.Entry.__tablename__)).fetchone()[0]
+    finally:
+        connection.close()
+    return locales, entry_number
+
+
+class TermbaseCatalog(object):
+    """Cached collection of the metadata of the termbases available on the
+    system, safe to be used from more than one thread.
+    """
+
+    def __init__(self):
+        """Constructor method. This should *never* be called from outside this
+        module, use the ``get_termbase_catalog()`` top-level function instead.
+
+        :rtype: TermbaseCatalog
+        """
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @staticmethod
+    def get_cache_file_name():
+        """Returns the name of the file where the catalog is cached.
+
+        :returns: path of the cache file
+        :rtype: str
+        """
+        return os.path.join(orm.DB_DIR, _CACHE_FILE_NAME)
+
+    def _load_cache(self):
+        """Loads the catalog from the cache file, discarding it if it cannot
+        be read or has been written in a different format.
+
+        :returns: a dictionary mapping names to catalog entries
+        :rtype: dict
+        """
+        try:
+            with open(self.get_cache_file_name(), 'r') as file_handle:
+                content = json.load(file_handle)
+            if content.get('version') != _CACHE_VERSION:
+                return {}
+            return {item[0]: CatalogEntry(*item)
+                    for item in content['termbases']}
+        except (IOError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save_cache(self, entries):
+        """Writes the catalog to the cache file, errors are not fatal since
+        the catalog can be built again.
+
+        :param entries: dictionary mapping names to catalog entries
+        :type entries: dict
+        :rtype: None
+        """
+        file_name = self.get_cache_file_name()
+        try:
+            with open(file_name + '.tmp', 'w') as file_handle:
+                json.dump({'version': _CACHE_VERSION,
+                           'termbases': [list(e) for e in entries.values()]},
+                          file_handle)
+            os.replace(file_name + '.tmp', file_name)
+        except IOError as exc:
+            _LOG.exception(exc)
+
+    @property
+    def entries(self):
+        """Returns the termbases known to the catalog without accessing any
+        termbase file, i.e. the ones found in the last refresh (or stored in
+        the cache file if the catalog has never been refreshed).
+
+        :returns: a list of catalog entries sorted by termbase name
+        :rtype: list
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load_cache()
+            return sorted(self._entries.values(), key=lambda e: e.name)
+
+    def refresh(self):
+        """Scans the termbase folder and updates the metadata of the termbases
+        whose file has been modified (or created) since the last refresh.
+
+        :returns: a list of catalog entries sorted by termbase name
+        :rtype: list
+        """
+        known = {e.name: e for e in self.entries}
+        current = {}
+        try:
+            with os.scandir(orm.DB_DIR) as iterator:
+                files = [f for f in iterator if f.name.endswith(_EXTENSION)]
+            for file_entry in files:
+                name = file_entry.name[:-len(_EXTENSION)]
+                stat = file_entry.stat()
+                entry = known.get(name)
+                if (entry is None or entry.mtime != stat.st_mtime_ns or
+                        entry.size != stat.st_size):
+                    try:
+                        locales, entry_number = read_metadata(file_entry.path)
+                    except sqlite3.Error as exc:
+                        _LOG.warning('cannot read termbase %s: %s', name, exc)
+                        locales, entry_number = [], 0
+                    entry = CatalogEntry(name, locales, entry_number,
+                                         stat.st_size, stat.st_mtime_ns)
+                current[name] = entry
+        except OSError as exc:
+            _LOG.exception(exc)
+            return self.entries
+        with self._lock:
+            self._entries = current
+        if current != known:
+            self._save_cache(current)
+        return sorted(current.values(), key=lambda e: e.name)
+
+    def invalidate(self, name):
+        """Forgets the metadata of the given termbase, which will be read
+        again at the next refresh.
+
+        :param name: name of the termbase
+        :type name: str
+        :rtype: None
+        """
+        with self._lock:
+            if self._entries is not None:
+                self._entries.pop(name, None)
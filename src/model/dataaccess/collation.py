@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.collation
+
+This module contains the locale-aware collation of lemmata, which is used to
+compute the sort key stored along with each term when it is written, so that
+terms (and the entries they are the vedettes of) can be sorted and searched by
+ranges through an index rather than by comparing strings in Python.
+
+Sort keys are plain strings whose binary order corresponds to the collation
+order. As in the Unicode collation algorithm, they are made up of three levels
+which are compared in turn: base letters, accents and case. Letters that are
+regarded as separate letters of the alphabet by a language (e.g. ``ñ`` in
+Spanish) are sorted after their base letter instead of being compared as
+accented variants.
+"""
+
+import functools
+import unicodedata
+
+from sqlalchemy import bindparam
+
+from src.model.dataaccess import orm
+
+COLLATION_VERSION = 1
+"""Version of the sort keys, to be increased whenever the way they are computed
+changes, so that they are computed again for existing termbases. The version of
+the sort keys of a termbase is stored as the user version of its database.
+"""
+
+_LEVEL_SEPARATOR = '\x01'
+"""Separator between the levels of a sort key, lower than every weight.
+"""
+
+_LETTER_END = '\x02'
+"""End of the accents of a letter at the second level, or lowercase letter at
+the third level.
+"""
+
+_UPPERCASE = '\x03'
+"""Uppercase letter at the third level.
+"""
+
+_TAILORED_LETTER = 0xE000
+"""Base of the (private use) code points following the base letter of a
+tailored letter, which are greater than any letter in common use.
+"""
+
+_TAILORED_LETTER_COUNT = 0x100
+"""Number of code points reserved to tailored letters.
+"""
+
+_LAST_CHARACTER = chr(0x10FFFF)
+"""Greatest code point, which never appears in sort keys.
+"""
+
+MAX_SORT_KEY = _LAST_CHARACTER
+"""Sort key greater than the one of any lemma, so that the entries with no
+vedette in a language come last.
+"""
+
+_TAILORINGS = {
+    'es': {'ñ': ('n', 1)},
+    'ro': {'ă': ('a', 1), 'â': ('a', 2), 'î': ('i', 1), 'ș': ('s', 1),
+           'ş': ('s', 1), 'ț': ('t', 1), 'ţ': ('t', 1)},
+}
+"""Letters that are sorted as separate letters after their base letter, keyed
+by language code. Each of them is mapped to a (base letter, rank) 2-tuple.
+"""
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_weights(char, language):
+    """Returns the weights of a character at the three levels.
+
+    :param char: character
+    :type char: str
+    :param language: language code of the collation
+    :type language: str
+    :returns: a (primary, secondary, tertiary) 3-tuple of strings
+    :rtype: tuple
+    """
+    if unicodedata.category(char) == 'Cc':
+        # control characters are ignored altogether
+        return '', '', ''
+    tertiary = _UPPERCASE if char.isupper() else _LETTER_END
+    tailored = _TAILORINGS.get(language, {}).get(char.lower())
+    if tailored:
+        (base, rank) = tailored
+        return base + chr(_TAILORED_LETTER + rank), _LETTER_END, tertiary
+    decomposed = unicodedata.normalize('NFD', char.casefold())
+    primary = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    accents = ''.join(c for c in decomposed if unicodedata.combining(c))
+    return primary, accents + _LETTER_END, tertiary
+
+
+def get_sort_key(lemma, locale):
+    """Returns the sort key of a lemma in the given language.
+
+    :param lemma: lemma of a term
+    :type lemma: str
+    :param locale: locale of the language of the term
+    :type locale: str
+    :rtype: str
+    """
+    language = locale.split('_')[0] if locale else ''
+    levels = ([], [], [])
+    for char in unicodedata.normalize('NFC', lemma or ''):
+        for (level, weight) in zip(levels, _get_weights(char, language)):
+            level.append(weight)
+    return _LEVEL_SEPARATOR.join(''.join(level) for level in levels)
+
+
+def get_prefix_ranges(prefix, locale):
+    """Returns the ranges of the sort keys of the lemmata starting with the
+    given prefix, regardless of accents and case.
+
+    :param prefix: beginning of a lemma
+    :type prefix: str
+    :param locale: locale of the language of the lemma
+    :type locale: str
+    :returns: a list of (lowest, highest) 2-tuples of sort keys, the lowest
+    one being included and the highest one excluded
+    :rtype: list
+    """
+    primary = get_sort_key(prefix, locale).split(_LEVEL_SEPARATOR)[0]
+    if (locale or '').split('_')[0] not in _TAILORINGS:
+        return [(primary, primary + _LAST_CHARACTER)]
+    # lemmata going on with a tailored letter whose base letter ends the
+    # prefix (e.g. "ñu" for "n" in Spanish) do not start with the prefix
+    return [(primary, primary + chr(_TAILORED_LETTER)),
+            (primary + chr(_TAILORED_LETTER + _TAILORED_LETTER_COUNT),
+             primary + _LAST_CHARACTER)]
+
+
+def get_variant_range(lemma, locale):
+    """Returns the range of the sort keys of the lemmata which only differ
+    from the given one in accents and case.
+
+    :param lemma: lemma of a term
+    :type lemma: str
+    :param locale: locale of the language of the lemma
+    :type locale: str
+    :returns: a (lowest, highest) 2-tuple of sort keys, the lowest one being
+    included and the highest one excluded
+    :rtype: tuple
+    """
+    primary = get_sort_key(lemma, locale).split(_LEVEL_SEPARATOR)[0]
+    return (primary + _LEVEL_SEPARATOR,
+            primary + chr(ord(_LEVEL_SEPARATOR) + 1))
+
+
+def is_up_to_date(session):
+    """Returns whether the sort keys of the terms of a termbase have been
+    computed by the current version of the collation.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :rtype: bool
+    """
+    version = session.execute('PRAGMA user_version').scalar()
+    return version == COLLATION_VERSION
+
+
+def rebuild(session):
+    """Computes the sort keys of all the terms from scratch.
+
+    :param session: session used to query and update the termbase
+    :type session: object
+    :rtype: None
+    """
+    rows = [{'b_term_id': term_id, 'b_sort_key': get_sort_key(lemma, locale)}
+            for (term_id, lemma, locale) in session.query(
+                orm.Term.term_id, orm.Term.lemma, orm.Term.lang_id)]
+    if rows:
+        table = orm.Term.__table__
+        session.execute(
+            table.update().where(table.c.term_id == bindparam('b_term_id'))
+            .values(sort_key=bindparam('b_sort_key')), rows)
+    session.execute('PRAGMA user_version = {0}'.format(COLLATION_VERSION))
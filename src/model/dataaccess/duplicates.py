@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.duplicates
+
+This module contains the quality assurance report about duplicate terms, i.e.
+lemmata appearing in more than one entry of a termbase. Two kinds of
+duplicates are detected within each language:
+
+* exact duplicates, whose normalized lemmata (see ``merge.normalize_lemma``)
+  are the same, found by grouping the terms by normalized lemma;
+* near duplicates, whose normalized lemmata are similar but not equal. In
+  order to avoid comparing all the pairs of lemmata, candidate pairs are
+  found by locality-sensitive hashing: the MinHash signature of the character
+  trigrams of each lemma is split into bands, and only lemmata sharing the
+  hash of a band are compared.
+
+Languages are processed in parallel by a pool of processes, each of them
+reading the termbase file through its own read-only SQLite connection.
+"""
+
+import collections
+import concurrent.futures
+import csv
+import difflib
+import multiprocessing
+import random
+import sqlite3
+import zlib
+
+from src.model.dataaccess.merge import normalize_lemma
+
+EXACT, NEAR = 'exact', 'near'
+"""Kinds of duplicates.
+"""
+
+Duplicate = collections.namedtuple('Duplicate', [
+    'kind', 'locale', 'lemma', 'entry_id', 'other_lemma', 'other_entry_id',
+    'similarity'])
+"""A pair of terms of different entries with equal or similar lemmata.
+"""
+
+DEFAULT_THRESHOLD = 0.85
+"""Minimum similarity (as computed by ``difflib``) of near duplicates.
+"""
+
+_BANDS, _ROWS = 8, 2
+"""Number of bands of MinHash signatures and number of hashes in each band.
+"""
+
+_MAX_BUCKET_SIZE = 100
+"""Number of lemmata above which a bucket is regarded as noise (e.g. a very
+common trigram) and ignored, keeping the number of comparisons linear.
+"""
+
+_PRIME = (1 << 61) - 1
+"""Modulus of the hash functions used to compute MinHash signatures.
+"""
+
+_COEFFICIENTS = [(_random.randrange(1, _PRIME), _random.randrange(_PRIME))
+                 for _random in [random.Random(0)]
+                 for _ in range(_BANDS * _ROWS)]
+"""Coefficients of the hash functions, the same for every process.
+"""
+
+
+def get_trigrams(lemma):
+    """Returns the set of character trigrams of a normalized lemma, padded
+    with spaces so that even short lemmata have some.
+
+    :param lemma: normalized lemma
+    :type lemma: str
+    :rtype: set
+    """
+    padded = ' {0} '.format(lemma)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def get_signature(trigrams, cache):
+    """Returns the MinHash signature of a set of trigrams, i.e. the minimum
+    value of each hash function over the trigrams.
+
+    :param trigrams: trigrams of a lemma
+    :type trigrams: set
+    :param cache: dictionary mapping trigrams to the values of all the hash
+    functions, which is filled as new trigrams are met (the number of
+    distinct trigrams being much lower than the number of lemmata)
+    :type cache: dict
+    :rtype: tuple
+    """
+    hashes = []
+    for trigram in trigrams:
+        values = cache.get(trigram)
+        if values is None:
+            value = zlib.crc32(trigram.encode('utf-8'))
+            values = cache[trigram] = tuple((a * value + b) % _PRIME
+                                            for (a, b) in _COEFFICIENTS)
+        hashes.append(values)
+    return tuple(map(min, *hashes)) if len(hashes) > 1 else hashes[0]
+
+
+def _get_candidates(signatures):
+    """Returns the indexes of the signatures that share at least a band with
+    each signature (with a greater index).
+
+    :param signatures: list of MinHash signatures
+    :type signatures: list
+    :rtype: dict
+    """
+    candidates = collections.defaultdict(set)
+    for band in range(_BANDS):
+        buckets = collections.defaultdict(list)
+        start = band * _ROWS
+        for (index, signature) in enumerate(signatures):
+            buckets[signature[start:start + _ROWS]].append(index)
+        for bucket in buckets.values():
+            if 1 < len(bucket) <= _MAX_BUCKET_SIZE:
+                for (position, first) in enumerate(bucket):
+                    candidates[first].update(bucket[position + 1:])
+    return candidates
+
+
+def find_language_duplicates(file_name, locale, threshold=DEFAULT_THRESHOLD):
+    """Finds the duplicate terms of a language of a termbase. This is the
+    unit of work of the process pool, hence it only takes picklable arguments.
+
+    :param file_name: path of the termbase file
+    :type file_name: str
+    :param locale: locale of the language
+    :type locale: str
+    :param threshold: minimum similarity of near duplicates
+    :type threshold: float
+    :returns: a list of duplicates
+    :rtype: list
+    """
+    connection = sqlite3.connect('file:{0}?mode=ro'.format(file_name),
+                                 uri=True)
+    try:
+        connection.create_function('normalize_lemma', 1, normalize_lemma)
+        connection.execute(
+            'CREATE TEMP TABLE lemmas AS SELECT entry_id, lemma, '
+            'normalize_lemma(lemma) AS norm FROM Terms WHERE lang_id = ?',
+            (locale,))
+        exact = connection.execute(
+            'SELECT norm, entry_id, lemma FROM lemmas WHERE norm IN '
+            '(SELECT norm FROM lemmas GROUP BY norm '
+            'HAVING count(DISTINCT entry_id) > 1) '
+            'ORDER BY norm, entry_id').fetchall()
+        # a representative term for each distinct normalized lemma
+        terms = connection.execute(
+            'SELECT norm, min(entry_id), lemma FROM lemmas '
+            'WHERE norm != \'\' GROUP BY norm').fetchall()
+    finally:
+        connection.close()
+    duplicates = []
+    first = None
+    for (norm, entry_id, lemma) in exact:
+        if first is None or first[0] != norm:
+            first = (norm, entry_id, lemma)
+        elif entry_id != first[1]:
+            duplicates.append(Duplicate(EXACT, locale, first[2], first[1],
+                                        lemma, entry_id, 1.0))
+    cache = {}
+    signatures = [get_signature(get_trigrams(norm), cache)
+                  for (norm, _, _) in terms]
+    candidates = _get_candidates(signatures)
+    # the matcher caches the analysis of its second sequence
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    for first in sorted(candidates):
+        (norm, entry_id, lemma) = terms[first]
+        matcher.set_seq2(norm)
+        for second in sorted(candidates[first]):
+            (other_norm, other_entry_id, other_lemma) = terms[second]
+            # the similarity cannot exceed the one of the lengths
+            lengths = len(norm) + len(other_norm)
+            if entry_id == other_entry_id or \
+                    2 * min(len(norm), len(other_norm)) < threshold * lengths:
+                continue
+            matcher.set_seq1(other_norm)
+            if matcher.quick_ratio() < threshold:
+                continue
+            similarity = matcher.ratio()
+            if similarity >= threshold:
+                duplicates.append(Duplicate(NEAR, locale, lemma, entry_id,
+                                            other_lemma, other_entry_id,
+                                            round(similarity, 3)))
+    return duplicates
+
+
+def find_duplicates(termbase, threshold=DEFAULT_THRESHOLD, workers=None,
+                    progress=None):
+    """Finds the duplicate terms of a termbase, processing each language in a
+    separate process.
+
+    :param termbase: termbase to be checked
+    :type termbase: Termbase
+    :param threshold: minimum similarity of near duplicates
+    :type threshold: float
+    :param workers: maximum number of processes (by default, the number of
+    processors); if 1, languages are processed in the current process
+    :type workers: int
+    :param progress: callable receiving the number of languages processed
+    so far and returning a true value if the operation must be aborted
+    :type progress: callable
+    :returns: a list of duplicates, sorted by language
+    :rtype: list
+    :raises RuntimeError: if the operation is aborted
+    """
+    file_name = termbase.get_termbase_file_name()
+    locales = termbase.languages
+    results = {}
+    if workers == 1:
+        for locale in locales:
+            results[locale] = find_language_duplicates(file_name, locale,
+                                                       threshold)
+            if progress and progress(len(results)):
+                raise RuntimeError('search for duplicates aborted')
+    else:
+        # forking a process with running (Qt) threads is not safe
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context(
+                    'spawn')) as executor:
+            futures = {executor.submit(find_language_duplicates, file_name,
+                                       locale, threshold): locale
+                       for locale in locales}
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+                if progress and progress(len(results)):
+                    for pending in futures:
+                        pending.cancel()
+                    raise RuntimeError('search for duplicates aborted')
+    return [duplicate for locale in locales for duplicate in results[locale]]
+
+
+def write_report(duplicates, file_name):
+    """Writes a list of duplicates to a CSV file, with a header row.
+
+    :param duplicates: duplicates to be written
+    :type duplicates: list
+    :param file_name: path of the output file
+    :type file_name: str
+    :rtype: None
+    """
+    with open(file_name, 'w', newline='') as file_handle:
+        writer = csv.writer(file_handle)
+        writer.writerow(Duplicate._fields)
+        writer.writerows(duplicates)
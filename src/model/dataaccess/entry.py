@@ -26,15 +26,194 @@ terminological database and allow to set/get entry level properties and add
 terms to an entry reflecting those changes in the data persistence level.
 """
 
+import collections
 import uuid
 
 import sqlalchemy
 import sqlalchemy.orm
+from sqlalchemy import and_, bindparam
 
-from src.model.dataaccess import orm
+from src.model.dataaccess import (orm, statistics, journal, prefetch,
+                                  collation)
 from src.model.dataaccess.term import Term
 
 
+class EntryChanges(object):
+    """Set of changes to be applied to an entry, which is built by the entry
+    forms comparing their fields with the snapshot of the entry they were
+    loaded from, so that only the values that have actually been changed are
+    written to the termbase. Empty values are regarded as not set.
+    """
+
+    def __init__(self):
+        """Constructor method.
+
+        :rtype: EntryChanges
+        """
+        # (old value, new value) 2-tuples keyed by property ID
+        self.properties = {}
+        # (old value, new value) 2-tuples keyed by (locale, property ID)
+        self.language_properties = {}
+        # (locale, old value, new value) 3-tuples keyed by (term ID,
+        # property ID)
+        self.term_properties = {}
+        # (term ID, locale, lemma, vedette) 4-tuples
+        self.added_terms = []
+        # (term ID, locale, new lemma) 3-tuples
+        self.renamed_terms = []
+        # (term ID, locale) 2-tuples
+        self.deleted_terms = []
+
+    def set_property(self, prop_id, old_value, new_value):
+        """Records the change of an entry-level property value, unless the
+        two values are the same.
+
+        :param prop_id: ID of the property
+        :type prop_id: str
+        :param old_value: value the entry was loaded with
+        :type old_value: str
+        :param new_value: value to be written
+        :type new_value: str
+        :rtype: None
+        """
+        if (old_value or None) != (new_value or None):
+            self.properties[prop_id] = (old_value or None, new_value or None)
+
+    def set_language_property(self, locale, prop_id, old_value, new_value):
+        """Records the change of a language-level property value, unless the
+        two values are the same.
+
+        :param locale: locale of the language
+        :type locale: str
+        :param prop_id: ID of the property
+        :type prop_id: str
+        :param old_value: value the entry was loaded with
+        :type old_value: str
+        :param new_value: value to be written
+        :type new_value: str
+        :rtype: None
+        """
+        if (old_value or None) != (new_value or None):
+            self.language_properties[(locale, prop_id)] = (old_value or None,
+                                                           new_value or None)
+
+    def set_term_property(self, term_id, locale, prop_id, old_value,
+                          new_value):
+        """Records the change of a term-level property value, unless the two
+        values are the same.
+
+        :param term_id: ID of the term (possibly returned by ``add_term``)
+        :type term_id: str
+        :param locale: locale of the language of the term
+        :type locale: str
+        :param prop_id: ID of the property
+        :type prop_id: str
+        :param old_value: value the term was loaded with
+        :type old_value: str
+        :param new_value: value to be written
+        :type new_value: str
+        :rtype: None
+        """
+        if (old_value or None) != (new_value or None):
+            self.term_properties[(term_id, prop_id)] = (
+                locale, old_value or None, new_value or None)
+
+    def add_term(self, locale, lemma, vedette):
+        """Records the addition of a term.
+
+        :param locale: locale of the language of the term
+        :type locale: str
+        :param lemma: lemma of the term
+        :type lemma: str
+        :param vedette: flag indicating whether the term is a vedette or not
+        :type vedette: bool
+        :returns: the ID of the new term
+        :rtype: str
+        """
+        term_id = str(uuid.uuid4())
+        self.added_terms.append((term_id, locale, lemma, vedette))
+        return term_id
+
+    def rename_term(self, term_id, locale, lemma):
+        """Records the change of the lemma of an existing term.
+
+        :param term_id: ID of the term
+        :type term_id: str
+        :param locale: locale of the language of the term
+        :type locale: str
+        :param lemma: new lemma of the term
+        :type lemma: str
+        :rtype: None
+        """
+        self.renamed_terms.append((term_id, locale, lemma))
+
+    def delete_term(self, term_id, locale):
+        """Records the deletion of an existing term.
+
+        :param term_id: ID of the term
+        :type term_id: str
+        :param locale: locale of the language of the term
+        :type locale: str
+        :rtype: None
+        """
+        self.deleted_terms.append((term_id, locale))
+
+    def __bool__(self):
+        return any([self.properties, self.language_properties,
+                    self.term_properties, self.added_terms,
+                    self.renamed_terms, self.deleted_terms])
+
+
+def _write_values(session, table, rows):
+    """Writes the changed values of a property association table with at most
+    one (batched) statement for insertions, updates and deletions each.
+
+    :param session: session used to change the termbase content
+    :type session: object
+    :param table: property association table
+    :type table: sqlalchemy.Table
+    :param rows: list of (key columns, old value, new value) 3-tuples, where
+    the key columns are a dictionary identifying the row of the table
+    :type rows: list
+    :returns: the increments of the number of values keyed by property ID
+    :rtype: collections.Counter
+    """
+    increments = collections.Counter()
+    inserted, updated, deleted = [], [], []
+    for (keys, old_value, new_value) in rows:
+        if old_value is None:
+            inserted.append(dict(keys, value=new_value))
+            increments[keys['prop_id']] += 1
+        elif new_value is None:
+            deleted.append({'b_' + k: v for (k, v) in keys.items()})
+            increments[keys['prop_id']] -= 1
+        else:
+            updated.append(dict({'b_' + k: v for (k, v) in keys.items()},
+                                b_value=new_value))
+    if not rows:
+        return increments
+    condition = and_(*[table.c[k] == bindparam('b_' + k) for k in
+                       rows[0][0]])
+    if inserted:
+        session.execute(table.insert(), inserted)
+    if updated:
+        session.execute(table.update().where(condition).values(
+            value=bindparam('b_value')), updated)
+    if deleted:
+        session.execute(table.delete().where(condition), deleted)
+    return increments
+
+
+def _get_operation(old_value, new_value):
+    """Returns the journal operation corresponding to a change of value.
+    """
+    if old_value is None:
+        return journal.INSERT
+    if new_value is None:
+        return journal.DELETE
+    return journal.UPDATE
+
+
 class Entry(object):
     """High level representation of a terminological entry of the termbase,
     which is characterized by its ID only.
@@ -52,6 +231,170 @@ class Entry(object):
         self._tb = termbase
         self.entry_id = entry_id
 
+    def get_snapshot(self):
+        """Reads the whole content of the entry at once.
+
+        :returns: a read-only copy of the entry
+        :rtype: EntrySnapshot
+        """
+        with self._tb.get_session() as session:
+            return prefetch.load_entry(session, self.entry_id)
+
+    def apply_changes(self, changes):
+        """Writes a set of changes to the entry within a single transaction,
+        issuing batched statements for each kind of change instead of
+        reading and writing values one by one.
+
+        :param changes: changes to be applied
+        :type changes: EntryChanges
+        :returns: True if the changes have been written, None if the
+        transaction failed and has been rolled back
+        :rtype: bool
+        """
+        if not changes:
+            return True
+        with self._tb.get_session() as session:
+            records = self._apply_term_changes(session, changes)
+            records.extend(self._apply_value_changes(session, changes))
+            journal.record_many(session, records)
+            return True
+
+    def _get_languages_with_terms(self, session, locales):
+        """Returns the subset of the given locales where the entry has at
+        least a term.
+        """
+        return {row[0] for row in session.query(
+            orm.Term.lang_id.distinct()).filter(
+            orm.Term.entry_id == self.entry_id,
+            orm.Term.lang_id.in_(locales))}
+
+    def _apply_term_changes(self, session, changes):
+        """Adds, renames and deletes terms, updating the statistics.
+
+        :returns: the records of the change journal
+        :rtype: list
+        """
+        records = []
+        increments = collections.Counter()
+        locales = {locale for (_, locale) in changes.deleted_terms}
+        locales.update(t[1] for t in changes.added_terms)
+        covered = self._get_languages_with_terms(session, locales)
+        if changes.deleted_terms:
+            term_ids = [term_id for (term_id, _) in changes.deleted_terms]
+            for (prop_id, count) in session.query(
+                    orm.TermPropertyAssociation.prop_id,
+                    sqlalchemy.func.count()).filter(
+                    orm.TermPropertyAssociation.term_id.in_(term_ids)
+            ).group_by(orm.TermPropertyAssociation.prop_id):
+                statistics.increment(
+                    session, statistics.get_property_key(prop_id), -count)
+            session.query(orm.TermPropertyAssociation).filter(
+                orm.TermPropertyAssociation.term_id.in_(term_ids)).delete(
+                synchronize_session=False)
+            session.query(orm.Term).filter(
+                orm.Term.term_id.in_(term_ids)).delete(
+                synchronize_session=False)
+            for (term_id, locale) in changes.deleted_terms:
+                increments[locale] -= 1
+                records.append((journal.DELETE, 'term', self.entry_id,
+                                term_id, None, locale))
+        if changes.renamed_terms:
+            table = orm.Term.__table__
+            if len(changes.renamed_terms) > 1:
+                # terms may swap lemmata or take the lemma another term is
+                # leaving, so that they are first given temporary lemmata
+                # which cannot violate the uniqueness constraint
+                session.execute(table.update().where(
+                    table.c.term_id == bindparam('b_term_id')).values(
+                    lemma=bindparam('b_lemma')),
+                    [{'b_term_id': term_id, 'b_lemma': '\0' + term_id}
+                     for (term_id, _, _) in changes.renamed_terms])
+            session.execute(table.update().where(
+                table.c.term_id == bindparam('b_term_id')).values(
+                lemma=bindparam('b_lemma'),
+                sort_key=bindparam('b_sort_key')),
+                [{'b_term_id': term_id, 'b_lemma': lemma,
+                  'b_sort_key': collation.get_sort_key(lemma, locale)}
+                 for (term_id, locale, lemma) in changes.renamed_terms])
+            records.extend((journal.UPDATE, 'term', self.entry_id, term_id,
+                            None, locale) for (term_id, locale, _) in
+                           changes.renamed_terms)
+        if changes.added_terms:
+            session.execute(orm.Term.__table__.insert(), [
+                {'term_id': term_id, 'lemma': lemma, 'lang_id': locale,
+                 'vedette': vedette, 'entry_id': self.entry_id,
+                 'sort_key': collation.get_sort_key(lemma, locale)}
+                for (term_id, locale, lemma, vedette) in changes.added_terms])
+            for (term_id, locale, _, _) in changes.added_terms:
+                increments[locale] += 1
+                records.append((journal.INSERT, 'term', self.entry_id,
+                                term_id, None, locale))
+        for (locale, amount) in increments.items():
+            statistics.increment(session, statistics.get_terms_key(locale),
+                                 amount)
+        if locales:
+            now_covered = self._get_languages_with_terms(session, locales)
+            for locale in now_covered - covered:
+                statistics.increment(session,
+                                     statistics.get_coverage_key(locale))
+            for locale in covered - now_covered:
+                statistics.increment(session,
+                                     statistics.get_coverage_key(locale), -1)
+        return records
+
+    def _apply_value_changes(self, session, changes):
+        """Inserts, updates and deletes property values at all levels,
+        updating the statistics.
+
+        :returns: the records of the change journal
+        :rtype: list
+        """
+        records = []
+        increments = _write_values(
+            session, orm.EntryPropertyAssociation.__table__,
+            [({'entry_id': self.entry_id, 'prop_id': prop_id}, old, new)
+             for (prop_id, (old, new)) in changes.properties.items()])
+        records.extend((_get_operation(old, new), 'entry_property',
+                        self.entry_id, None, prop_id, None) for
+                       (prop_id, (old, new)) in changes.properties.items())
+        if changes.language_properties:
+            ela_ids = dict(session.query(
+                orm.EntryLanguageAssociation.lang_id,
+                orm.EntryLanguageAssociation.ela_id).filter(
+                orm.EntryLanguageAssociation.entry_id == self.entry_id))
+            missing = {locale for (locale, _) in changes.language_properties
+                       if locale not in ela_ids}
+            if missing:
+                # the associations had not been created previously
+                for locale in missing:
+                    ela_ids[locale] = str(uuid.uuid4())
+                table = orm.EntryLanguageAssociation.__table__
+                session.execute(table.insert(), [
+                    {'ela_id': ela_ids[locale], 'entry_id': self.entry_id,
+                     'lang_id': locale} for locale in missing])
+            increments.update(_write_values(
+                session, orm.EntryLanguagePropertyAssociation.__table__,
+                [({'ela_id': ela_ids[locale], 'prop_id': prop_id}, old, new)
+                 for ((locale, prop_id), (old, new)) in
+                 changes.language_properties.items()]))
+            records.extend((_get_operation(old, new), 'language_property',
+                            self.entry_id, None, prop_id, locale) for
+                           ((locale, prop_id), (old, new)) in
+                           changes.language_properties.items())
+        increments.update(_write_values(
+            session, orm.TermPropertyAssociation.__table__,
+            [({'term_id': term_id, 'prop_id': prop_id}, old, new)
+             for ((term_id, prop_id), (_, old, new)) in
+             changes.term_properties.items()]))
+        records.extend((_get_operation(old, new), 'term_property', None,
+                        term_id, prop_id, locale) for
+                       ((term_id, prop_id), (locale, old, new)) in
+                       changes.term_properties.items())
+        for (prop_id, amount) in increments.items():
+            statistics.increment(session, statistics.get_property_key(prop_id),
+                                 amount)
+        return records
+
     def get_vedette(self, locale):
         """Retrieves the lemma of the vedette term for the language with the ID
         equal to the given locale that is contained in the terminological entry.
@@ -86,7 +429,11 @@ class Entry(object):
         with self._tb.get_session() as session:
             term = orm.Term(term_id=term_id, lemma=lemma,
                             lang_id=locale, vedette=vedette,
-                            entry_id=self.entry_id)
+                            entry_id=self.entry_id,
+                            sort_key=collation.get_sort_key(lemma, locale))
+            statistics.record_term_addition(session, self.entry_id, locale)
+            journal.record(session, journal.INSERT, 'term', self.entry_id,
+                           term_id, locale=locale)
             session.add(term)
 
     def delete_term(self, term):
@@ -97,6 +444,9 @@ class Entry(object):
         :return:
         """
         with self._tb.get_session() as session:
+            statistics.record_term_deletion(session, term.term_id)
+            journal.record(session, journal.DELETE, 'term', self.entry_id,
+                           term.term_id, locale=term.locale)
             # deletes term properties
             session.query(orm.TermPropertyAssociation).filter(
                 orm.TermPropertyAssociation.term_id == term.term_id).delete()
@@ -134,12 +484,24 @@ class Entry(object):
                     orm.EntryPropertyAssociation.entry_id == self.entry_id
                 ).one()
                 if value:
+                    if prop.value != value:
+                        journal.record(session, journal.UPDATE,
+                                       'entry_property', self.entry_id,
+                                       prop_id=prop_id)
                     prop.value = value
                 else:
                     session.delete(prop)
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id), -1)
+                    journal.record(session, journal.DELETE, 'entry_property',
+                                   self.entry_id, prop_id=prop_id)
             except sqlalchemy.orm.exc.NoResultFound:
                 # the property had not been set previously
                 if value:
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id))
+                    journal.record(session, journal.INSERT, 'entry_property',
+                                   self.entry_id, prop_id=prop_id)
                     prop = orm.EntryPropertyAssociation(entry_id=self.entry_id,
                                                         prop_id=prop_id,
                                                         value=value)
@@ -197,12 +559,26 @@ class Entry(object):
                     orm.EntryLanguagePropertyAssociation.prop_id == prop_id
                 ).one()
                 if value:
+                    if prop.value != value:
+                        journal.record(session, journal.UPDATE,
+                                       'language_property', self.entry_id,
+                                       prop_id=prop_id, locale=lang_id)
                     prop.value = value
                 else:
                     session.delete(prop)
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id), -1)
+                    journal.record(session, journal.DELETE,
+                                   'language_property', self.entry_id,
+                                   prop_id=prop_id, locale=lang_id)
             except sqlalchemy.orm.exc.NoResultFound:
                 # the property had not been set previously
                 if value:
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id))
+                    journal.record(session, journal.INSERT,
+                                   'language_property', self.entry_id,
+                                   prop_id=prop_id, locale=lang_id)
                     prop = orm.EntryLanguagePropertyAssociation(ela_id=ela_id,
                                                                 prop_id=prop_id,
                                                                 value=value)
@@ -237,14 +613,16 @@ class Entry(object):
 
         :param locale: ID of the language whose terms must be retrieved
         :type locale: str
-        :returns: list of Term objects corresponding to the entry terms
+        :returns: list of Term objects corresponding to the entry terms,
+        sorted by lemma
         :rtype: list
         """
         with self._tb.get_session() as session:
             return [Term(t.term_id, t.lemma, t.lang_id, t.vedette, self._tb) for
                     t in session.query(orm.Term).filter(
                     orm.Term.entry_id == self.entry_id,
-                    orm.Term.lang_id == locale)]
+                    orm.Term.lang_id == locale).order_by(
+                    orm.Term.lemma, orm.Term.term_id)]
 
     def __eq__(self, other):
         if hasattr(other, 'entry_id'):
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.federation
+
+This module contains the federated lookup, which looks lemmata up in several
+termbases at once (e.g. the termbases of a client, of a domain and a general
+one) so that translators need not switch between them. Each termbase is
+queried on a thread of a pool, through its own engine and sessions, and the
+matches are merged and ranked:
+
+* matches of termbases with a higher priority come first;
+* within a termbase, exact matches come before the terms which only differ
+  from the lemma in accents and case;
+* then matches with more terms in the target languages come first.
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+FederatedMatch = collections.namedtuple('FederatedMatch', [
+    'termbase', 'priority', 'lemma', 'exact', 'entry_id', 'terms'])
+"""A term matching a lemma in one of the federated termbases, along with the
+name and the priority (0 being the highest) of the termbase, whether the lemma
+of the term is equal to the one looked up, the ID of the entry and a
+dictionary mapping each target locale to the lemmata of the entry in that
+language.
+"""
+
+
+def _get_rank(match):
+    """Returns the key which federated matches are sorted by.
+
+    :param match: a federated match
+    :type match: FederatedMatch
+    :rtype: tuple
+    """
+    return (match.priority, not match.exact,
+            -sum(len(lemmas) for lemmas in match.terms.values()),
+            match.lemma, match.entry_id)
+
+
+class FederatedLookup(object):
+    """Lookup of lemmata in a list of termbases, sorted by decreasing
+    priority, which are queried concurrently.
+    """
+
+    def __init__(self, termbases, max_workers=None):
+        """Constructor method.
+
+        :param termbases: termbases to be queried, the first one having the
+        highest priority
+        :type termbases: list
+        :param max_workers: maximum number of termbases queried at the same
+        time (by default, all of them)
+        :type max_workers: int
+        :rtype: FederatedLookup
+        """
+        self._termbases = list(termbases)
+        self._executor = ThreadPoolExecutor(
+            max_workers or max(len(self._termbases), 1))
+
+    @property
+    def termbases(self):
+        """Returns the termbases which are queried, sorted by priority.
+
+        :rtype: list
+        """
+        return list(self._termbases)
+
+    @property
+    def languages(self):
+        """Returns the locales of the languages of at least one termbase.
+
+        :rtype: list
+        """
+        locales = []
+        for termbase in self._termbases:
+            locales.extend(l for l in termbase.languages if l not in locales)
+        return locales
+
+    def lookup_many(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata in all the termbases which have the given
+        language, regardless of accents and case.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: a dictionary mapping each lemma to the list of its matches,
+        sorted by rank
+        :rtype: dict
+        """
+        lemmas = list(set(lemmas))
+        target_locales = list(target_locales)
+        futures = [(priority, termbase, self._executor.submit(
+            termbase.lookup_variants, locale, lemmas, target_locales))
+            for (priority, termbase) in enumerate(self._termbases)
+            if locale in termbase.languages]
+        result = {lemma: [] for lemma in lemmas}
+        for (priority, termbase, future) in futures:
+            variants = future.result()
+            if variants is None:
+                # the error has already been logged by the termbase
+                _LOG.warning('lookup in termbase %s failed', termbase.name)
+                continue
+            for (lemma, matches) in variants.items():
+                result[lemma].extend(
+                    FederatedMatch(termbase.name, priority, variant,
+                                   variant == lemma, entry_id, terms)
+                    for (variant, entry_id, terms) in matches)
+        for matches in result.values():
+            matches.sort(key=_get_rank)
+        return result
+
+    def lookup(self, locale, lemma, target_locales=()):
+        """Looks up a single lemma, see ``lookup_many``.
+
+        :param locale: locale of the language of the lemma
+        :type locale: str
+        :param lemma: lemma to be looked up
+        :type lemma: str
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: the list of the matches of the lemma, sorted by rank
+        :rtype: list
+        """
+        return self.lookup_many(locale, [lemma], target_locales)[lemma]
+
+    def close(self):
+        """Releases the threads of the pool, the termbases are left open.
+
+        :rtype: None
+        """
+        self._executor.shutdown(wait=False)
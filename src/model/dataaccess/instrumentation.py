@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: src.model.dataaccess.instrumentation
+
+This module contains the instrumentation of the data access layer, which hooks
+into the SQLAlchemy engines of termbases in order to count and time every SQL
+statement that is executed. Statements are grouped by the data access method
+that issued them (e.g. ``Entry.get_property``) and by the caller of the data
+access layer (e.g. ``EntryScreen.__init__``), so that N+1 query patterns can be
+traced back to the part of the application responsible for them.
+
+Every statement is also logged on the ``src.model.dataaccess.sql`` channel as a
+JSON object: statements slower than ``SLOW_STATEMENT_THRESHOLD`` are logged at
+the INFO level, all the others at the DEBUG level.
+
+Statistics are not collected by default, they are enabled by the
+``--profile-queries`` option of the application, when the SQL channel is
+logged at the DEBUG level or from the query statistics dialog.
+"""
+
+import collections
+import heapq
+import json
+import logging
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+# a logger for SQL statements
+_LOG = logging.getLogger('src.model.dataaccess.sql')
+
+SLOW_STATEMENT_THRESHOLD = 0.05
+"""Duration (in seconds) above which a statement is considered slow.
+"""
+
+_DATA_ACCESS_PACKAGE = 'src.model.dataaccess'
+"""Name of the package whose methods are regarded as query origins.
+"""
+
+_APPLICATION_PACKAGE = 'src.'
+"""Prefix of the modules of the application.
+"""
+
+_QUERY_STATISTICS = None
+"""Reference to the single instance of the query statistics.
+"""
+
+
+def get_query_statistics():
+    """Returns a reference to the statistics collected for all termbases,
+    creating them if accessed for the first time (lazy initialization).
+
+    :returns: reference to the query statistics
+    :rtype: QueryStatistics
+    """
+    global _QUERY_STATISTICS
+    if not _QUERY_STATISTICS:
+        _QUERY_STATISTICS = QueryStatistics()
+    return _QUERY_STATISTICS
+
+
+Counter = collections.namedtuple('Counter', ['name', 'count', 'total_time'])
+"""Number of statements issued by a method and their total duration.
+"""
+
+Statement = collections.namedtuple('Statement', ['duration', 'statement',
+                                                 'origin', 'caller'])
+"""A single SQL statement with its duration and where it was issued from.
+"""
+
+
+class QueryStatistics(object):
+    """Collector of the number and duration of the SQL statements which have
+    been executed, safe to be used from more than one thread.
+    """
+
+    _SLOWEST_STATEMENTS = 20
+    """Number of slowest statements that are remembered.
+    """
+
+    def __init__(self):
+        """Constructor method. This should *never* be called from outside this
+        module, use the ``get_query_statistics()`` top-level function instead.
+
+        :rtype: QueryStatistics
+        """
+        self._lock = threading.Lock()
+        # walking the stack for every statement is not free, hence statements
+        # are only recorded on demand
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """Discards all the statistics collected so far.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._by_origin = collections.defaultdict(lambda: [0, 0.0])
+            self._by_caller = collections.defaultdict(lambda: [0, 0.0])
+            self._slowest = []
+            self._counters = collections.Counter()
+
+    def record(self, statement, duration, origin, caller):
+        """Records the execution of a statement.
+
+        :param statement: SQL text of the statement
+        :type statement: str
+        :param duration: duration of the statement in seconds
+        :type duration: float
+        :param origin: data access method that issued the statement
+        :type origin: str
+        :param caller: application method that called the data access layer
+        :type caller: str
+        :rtype: None
+        """
+        with self._lock:
+            for (key, groups) in [(origin, self._by_origin),
+                                  (caller, self._by_caller)]:
+                groups[key][0] += 1
+                groups[key][1] += duration
+            item = (duration, statement, origin, caller)
+            if len(self._slowest) < self._SLOWEST_STATEMENTS:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def increment(self, name, amount=1):
+        """Increments a generic named counter, used by the caches of the
+        application to report their hits and misses alongside statements.
+
+        :param name: name of the counter
+        :type name: str
+        :param amount: increment of the counter
+        :type amount: int
+        :rtype: None
+        """
+        with self._lock:
+            self._counters[name] += amount
+
+    @property
+    def counters(self):
+        """Returns the current value of generic named counters.
+
+        :returns: a dictionary keyed by counter names
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def _get_counters(self, groups):
+        with self._lock:
+            counters = [Counter(name, count, total) for
+                        (name, (count, total)) in groups.items()]
+        counters.sort(key=lambda c: c.count, reverse=True)
+        return counters
+
+    @property
+    def by_origin(self):
+        """Returns the statement counters grouped by data access method,
+        sorted by decreasing number of statements.
+
+        :rtype: list
+        """
+        return self._get_counters(self._by_origin)
+
+    @property
+    def by_caller(self):
+        """Returns the statement counters grouped by the caller of the data
+        access layer, sorted by decreasing number of statements.
+
+        :rtype: list
+        """
+        return self._get_counters(self._by_caller)
+
+    @property
+    def slowest_statements(self):
+        """Returns the slowest statements that have been recorded, sorted by
+        decreasing duration.
+
+        :rtype: list
+        """
+        with self._lock:
+            return [Statement(*item) for item in
+                    sorted(self._slowest, reverse=True)]
+
+    @property
+    def total(self):
+        """Returns the total number of statements and their total duration.
+
+        :returns: a (count, total time) 2-tuple
+        :rtype: tuple
+        """
+        with self._lock:
+            return (sum(c for (c, t) in self._by_origin.values()),
+                    sum(t for (c, t) in self._by_origin.values()))
+
+
+def _describe_frame(frame):
+    """Returns a readable name of the function executed in a frame, prefixed
+    by its class name in case of methods.
+    """
+    name = frame.f_code.co_name
+    instance = frame.f_locals.get('self')
+    if instance is not None:
+        return '{0}.{1}'.format(type(instance).__name__, name)
+    return '{0}.{1}'.format(frame.f_globals.get('__name__'), name)
+
+
+def _find_origin():
+    """Walks the stack to find the data access method that issued the current
+    statement and the application method that called the data access layer.
+
+    :returns: an (origin, caller) 2-tuple
+    :rtype: tuple
+    """
+    origin = caller = '<unknown>'
+    frame = sys._getframe(2)
+    while frame:
+        module = frame.f_globals.get('__name__', '')
+        if module == __name__ or module.startswith(
+                _DATA_ACCESS_PACKAGE + '.orm'):
+            pass
+        elif module.startswith(_DATA_ACCESS_PACKAGE):
+            if frame.f_code.co_name != 'get_session':
+                origin = _describe_frame(frame)
+        elif module.startswith(_APPLICATION_PACKAGE):
+            caller = _describe_frame(frame)
+            break
+        frame = frame.f_back
+    return origin, caller
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    statistics = get_query_statistics()
+    log_level = (logging.INFO if duration > SLOW_STATEMENT_THRESHOLD
+                 else logging.DEBUG)
+    if not statistics.enabled and not _LOG.isEnabledFor(log_level):
+        return
+    origin, caller = _find_origin()
+    if statistics.enabled:
+        statistics.record(statement, duration, origin, caller)
+    if _LOG.isEnabledFor(log_level):
+        _LOG.log(log_level, json.dumps({
+            'origin': origin, 'caller': caller, 'duration': duration,
+            'executemany': executemany, 'statement': statement}))
+
+
+def install(engine):
+    """Hooks the instrumentation into the given engine.
+
+    :param engine: SQLAlchemy engine of a termbase
+    :type engine: object
+    :rtype: None
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.journal
+
+This module contains the change journal of termbases, i.e. the ``Changes``
+table where the data access layer records every insertion, update and deletion
+of entries, terms and property values in the same transaction as the change
+itself. Each record has a monotonically increasing sequence number, so that
+downstream systems can ask for the changes that occurred after the last
+sequence number they have seen and only transfer the affected entries.
+"""
+
+import collections
+import datetime
+
+from sqlalchemy import func
+
+from src.model.dataaccess import orm
+from src.model.dataaccess.lookup import chunks
+
+INSERT, UPDATE, DELETE = 'I', 'U', 'D'
+"""Operations recorded in the journal.
+"""
+
+Change = collections.namedtuple('Change', ['seq', 'timestamp', 'operation',
+                                           'kind', 'entry_id', 'term_id',
+                                           'prop_id', 'locale'])
+"""A record of the change journal.
+"""
+
+
+def record(session, operation, kind, entry_id=None, term_id=None,
+           prop_id=None, locale=None):
+    """Adds a record to the journal within the transaction of the given
+    session.
+
+    :param session: session used to change the termbase content
+    :type session: object
+    :param operation: one of ``INSERT``, ``UPDATE`` and ``DELETE``
+    :type operation: str
+    :param kind: kind of the changed item (see ``constants.CHANGE_KINDS``)
+    :type kind: str
+    :param entry_id: ID of the changed entry (or of the entry of the term)
+    :type entry_id: str
+    :param term_id: ID of the changed term (or of the term of the property)
+    :type term_id: str
+    :param prop_id: ID of the changed property
+    :type prop_id: str
+    :param locale: locale of the changed term or language property
+    :type locale: str
+    :rtype: None
+    """
+    session.add(orm.Change(timestamp=datetime.datetime.utcnow(),
+                           operation=operation, kind=kind, entry_id=entry_id,
+                           term_id=term_id, prop_id=prop_id, locale=locale))
+
+
+def record_many(session, records):
+    """Adds several records to the journal with a single statement, within
+    the transaction of the given session.
+
+    :param session: session used to change the termbase content
+    :type session: object
+    :param records: list of (operation, kind, entry ID, term ID, property ID,
+    locale) 6-tuples, whose items are as in ``record``
+    :type records: list
+    :rtype: None
+    """
+    if not records:
+        return
+    timestamp = datetime.datetime.utcnow()
+    session.execute(orm.Change.__table__.insert(), [
+        {'timestamp': timestamp, 'operation': operation, 'kind': kind,
+         'entry_id': entry_id, 'term_id': term_id, 'prop_id': prop_id,
+         'locale': locale}
+        for (operation, kind, entry_id, term_id, prop_id, locale) in records])
+
+
+def get_last_sequence(session):
+    """Returns the sequence number of the last change (0 if none).
+
+    :param session: session used to query the termbase
+    :type session: object
+    :rtype: int
+    """
+    return session.query(func.max(orm.Change.seq)).scalar() or 0
+
+
+def get_changes(session, since=0):
+    """Returns the changes recorded after the given sequence number.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param since: sequence number of the last change already known
+    :type since: int
+    :returns: a list of changes sorted by sequence number
+    :rtype: list
+    """
+    return [Change(c.seq, c.timestamp, c.operation, c.kind, c.entry_id,
+                   c.term_id, c.prop_id, c.locale) for c in
+            session.query(orm.Change).filter(
+                orm.Change.seq > since).order_by(orm.Change.seq)]
+
+
+def get_changed_entries(session, since=0):
+    """Returns the IDs of the entries affected by the changes recorded after
+    the given sequence number, split between the ones that still exist and
+    the ones that have been deleted.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param since: sequence number of the last change already known
+    :type since: int
+    :returns: a (changed entry IDs, deleted entry IDs) 2-tuple of sets
+    :rtype: tuple
+    """
+    affected = {row[0] for row in session.query(
+        orm.Change.entry_id.distinct()).filter(
+        orm.Change.seq > since, orm.Change.entry_id != None)}
+    # term properties are recorded along with the term only
+    affected.update(row[0] for row in session.query(
+        orm.Term.entry_id.distinct()).join(
+        orm.Change, orm.Change.term_id == orm.Term.term_id).filter(
+        orm.Change.seq > since, orm.Change.entry_id == None))
+    existing = set()
+    for chunk in chunks(list(affected)):
+        existing.update(row[0] for row in session.query(
+            orm.Entry.entry_id).filter(orm.Entry.entry_id.in_(chunk)))
+    return existing, affected - existing
+
+
+def purge(session, up_to):
+    """Deletes the changes up to the given sequence number, which are no
+    longer needed by downstream systems.
+
+    :param session: session used to change the termbase
+    :type session: object
+    :param up_to: sequence number of the last change to be deleted
+    :type up_to: int
+    :returns: the number of deleted changes
+    :rtype: int
+    """
+    return session.query(orm.Change).filter(orm.Change.seq <= up_to).delete()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: src.model.dataaccess.lookup
+
+This module contains the queries used to look up many lemmata at once in a
+termbase. Lemmata and entry IDs are passed to the database in chunks, so that
+a whole batch is resolved with a handful of queries instead of one query per
+lemma, without exceeding the limit on the number of host parameters that
+SQLite allows in a single statement.
+
+Lemmata can also be looked up regardless of accents and case, in which case
+each of them is resolved through a range scan of the index on sort keys.
+"""
+
+from src.model.dataaccess import orm, collation
+
+CHUNK_SIZE = 500
+"""Maximum number of values passed to the database in a single IN-list.
+"""
+
+
+def chunks(values, size=CHUNK_SIZE):
+    """Splits a list of values into consecutive chunks of the given size.
+
+    :param values: list of values to be split
+    :type values: list
+    :param size: maximum size of each chunk
+    :type size: int
+    :rtype: generator
+    """
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def lookup_many(session, locale, lemmas, target_locales):
+    """Resolves many lemmata to the entries they appear in and to the terms of
+    those entries in the target languages.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param locale: locale of the language of the lemmata
+    :type locale: str
+    :param lemmas: lemmata to be looked up
+    :type lemmas: iterable
+    :param target_locales: locales whose terms must be retrieved
+    :type target_locales: iterable
+    :returns: a dictionary keyed by the given lemmata whose values are
+    dictionaries keyed by entry IDs, which in turn map each target locale to
+    the list of lemmata of the entry for that language (lemmata which are not
+    found are mapped to an empty dictionary)
+    :rtype: dict
+    """
+    lemmas = list(set(lemmas))
+    target_locales = list(target_locales)
+    result = {lemma: {} for lemma in lemmas}
+    entries = {}  # entry ID -> dictionary of target terms (shared)
+    for chunk in chunks(lemmas):
+        for (lemma, entry_id) in session.query(
+                orm.Term.lemma, orm.Term.entry_id).filter(
+                orm.Term.lang_id == locale, orm.Term.lemma.in_(chunk)):
+            if entry_id not in entries:
+                entries[entry_id] = {target: [] for target in target_locales}
+            result[lemma][entry_id] = entries[entry_id]
+    _add_target_terms(session, entries, target_locales)
+    return result
+
+
+def lookup_variants(session, locale, lemmas, target_locales):
+    """Resolves many lemmata to the terms which are equal to them regardless
+    of accents and case, and to the terms of the entries of those terms in the
+    target languages.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param locale: locale of the language of the lemmata
+    :type locale: str
+    :param lemmas: lemmata to be looked up
+    :type lemmas: iterable
+    :param target_locales: locales whose terms must be retrieved
+    :type target_locales: iterable
+    :returns: a dictionary keyed by the given lemmata whose values are lists
+    of (lemma of the term, entry ID, target terms) 3-tuples in collation
+    order, the target terms mapping each target locale to the list of lemmata
+    of the entry for that language
+    :rtype: dict
+    """
+    lemmas = list(set(lemmas))
+    target_locales = list(target_locales)
+    result = {lemma: [] for lemma in lemmas}
+    entries = {}  # entry ID -> dictionary of target terms (shared)
+    for lemma in lemmas:
+        lowest, highest = collation.get_variant_range(lemma, locale)
+        for (variant, entry_id) in session.query(
+                orm.Term.lemma, orm.Term.entry_id).filter(
+                orm.Term.lang_id == locale, orm.Term.sort_key >= lowest,
+                orm.Term.sort_key < highest).order_by(orm.Term.sort_key):
+            if entry_id not in entries:
+                entries[entry_id] = {target: [] for target in target_locales}
+            result[lemma].append((variant, entry_id, entries[entry_id]))
+    _add_target_terms(session, entries, target_locales)
+    return result
+
+
+def _add_target_terms(session, entries, target_locales):
+    """Fills the dictionaries of target terms of the given entries.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param entries: dictionary mapping entry IDs to dictionaries keyed by the
+    target locales, whose values are (initially empty) lists of lemmata
+    :type entries: dict
+    :param target_locales: locales whose terms must be retrieved
+    :type target_locales: list
+    :rtype: None
+    """
+    if not target_locales:
+        return
+    for chunk in chunks(list(entries)):
+        for (entry_id, lang_id, lemma) in session.query(
+                orm.Term.entry_id, orm.Term.lang_id, orm.Term.lemma).filter(
+                orm.Term.entry_id.in_(chunk),
+                orm.Term.lang_id.in_(target_locales)):
+            entries[entry_id][lang_id].append(lemma)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.maintenance
+
+This module contains the maintenance operations of termbase files, which are
+performed on plain SQLite connections rather than through the ORM:
+
+* ``reclaim_free_pages`` returns the pages freed by deletions to the file
+  system, provided that the termbase uses incremental auto-vacuum (as all the
+  termbases created or compacted by the application do);
+* ``compact`` rewrites the whole termbase into a temporary file with ``VACUUM
+  INTO`` and then atomically replaces the original file with it;
+* ``check_integrity`` runs the SQLite integrity checks;
+* ``analyze`` updates the statistics used by the SQLite query planner.
+
+The long-running operations accept a ``progress`` callable, which is invoked
+periodically with the number of steps performed so far and can abort the
+operation by returning a true value.
+"""
+
+import logging
+import os
+import sqlite3
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+AUTO_VACUUM_INCREMENTAL = 2
+"""Value of the ``auto_vacuum`` pragma corresponding to incremental mode.
+"""
+
+_PROGRESS_STEPS = 10000
+"""Number of SQLite virtual machine instructions between progress updates.
+"""
+
+
+def _connect(termbase, progress=None):
+    """Opens a plain SQLite connection to the file of a termbase.
+
+    :param termbase: termbase to be maintained
+    :type termbase: Termbase
+    :param progress: callable receiving the number of steps performed
+    :type progress: callable
+    :rtype: sqlite3.Connection
+    """
+    connection = sqlite3.connect(termbase.get_termbase_file_name(),
+                                 isolation_level=None)
+    if progress:
+        steps = [0]
+
+        def handler():
+            steps[0] += 1
+            return progress(steps[0])
+        connection.set_progress_handler(handler, _PROGRESS_STEPS)
+    return connection
+
+
+def get_free_pages(termbase):
+    """Returns the number of unused pages of the termbase file and the size
+    of each page.
+
+    :param termbase: termbase to be queried
+    :type termbase: Termbase
+    :returns: a (free pages, page size) 2-tuple
+    :rtype: tuple
+    """
+    connection = _connect(termbase)
+    try:
+        return (connection.execute('PRAGMA freelist_count').fetchone()[0],
+                connection.execute('PRAGMA page_size').fetchone()[0])
+    finally:
+        connection.close()
+
+
+def reclaim_free_pages(termbase):
+    """Returns the unused pages of a termbase to the file system, which is
+    fast since no page is moved except the ones at the end of the file. It has
+    no effect unless the termbase uses incremental auto-vacuum.
+
+    :param termbase: termbase to be maintained
+    :type termbase: Termbase
+    :returns: whether the termbase uses incremental auto-vacuum
+    :rtype: bool
+    """
+    connection = _connect(termbase)
+    try:
+        if connection.execute('PRAGMA auto_vacuum').fetchone()[0] != \
+                AUTO_VACUUM_INCREMENTAL:
+            return False
+        # run as a script, otherwise a single page is freed
+        connection.executescript('PRAGMA incremental_vacuum;')
+        return True
+    finally:
+        connection.close()
+
+
+def compact(termbase, progress=None):
+    """Rewrites a termbase into a temporary file, with no unused space and
+    incremental auto-vacuum enabled, copies the compacted pages back into the
+    original file with the backup API and finally analyzes it. The file is
+    never renamed, so that the compaction also works where open files cannot
+    be replaced (i.e. on Windows).
+    The termbase can be read while it is being compacted, except while the
+    pages are copied back, but writers are locked out (by a reserved lock
+    taken on a second connection, which is kept in exclusive locking mode
+    while the pages are copied) until the end, so that no change can be lost.
+
+    The engine of the termbase is disposed here, but any other handle on the
+    same file must be closed first: termbases opened read-only (including
+    reference termbases, which assume that the file never changes),
+    asynchronous termbases and prefetchers (whose reads may keep the pages
+    from being copied) and catalog refreshes which are still running.
+
+    :param termbase: termbase to be compacted
+    :type termbase: Termbase
+    :param progress: callable receiving the number of steps performed and
+    returning a true value if the operation must be aborted
+    :type progress: callable
+    :returns: the size of the file before and after the compaction
+    :rtype: tuple
+    :raises sqlite3.OperationalError: if the termbase is being modified or
+    read by another connection, or the operation is aborted
+    """
+    file_name = termbase.get_termbase_file_name()
+    temp_file_name = '{0}.compact.tmp'.format(file_name)
+    if os.path.exists(temp_file_name):
+        os.remove(temp_file_name)
+    old_size = os.path.getsize(file_name)
+    termbase.dispose()
+    connection = _connect(termbase, progress)
+    lock = sqlite3.connect(file_name, isolation_level=None)
+    try:
+        # may write the database header, hence it precedes the lock
+        connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        lock.execute('BEGIN IMMEDIATE')
+        if sqlite3.sqlite_version_info >= (3, 27):
+            connection.execute('VACUUM INTO ?', (temp_file_name,))
+        else:
+            # older SQLite versions: copy first, then vacuum the copy
+            target = sqlite3.connect(temp_file_name, isolation_level=None)
+            try:
+                connection.backup(target)
+                target.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                target.execute('VACUUM')
+            finally:
+                target.close()
+        connection.close()
+        # a connection in exclusive locking mode keeps its lock after the
+        # transaction, and the backup API requires no open transaction
+        lock.execute('PRAGMA locking_mode = EXCLUSIVE')
+        lock.execute('COMMIT')
+        compacted = sqlite3.connect(temp_file_name)
+        try:
+            # in a single step, i.e. in a single transaction
+            compacted.backup(lock)
+        finally:
+            compacted.close()
+    finally:
+        connection.close()
+        lock.close()
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+    analyze(termbase)
+    new_size = os.path.getsize(file_name)
+    _LOG.info('termbase %s compacted from %d to %d bytes', termbase.name,
+              old_size, new_size)
+    return old_size, new_size
+
+
+def check_integrity(termbase, quick=False, progress=None):
+    """Checks the integrity of a termbase file with ``PRAGMA integrity_check``
+    or, if quick is true, with the faster ``PRAGMA quick_check`` which does
+    not verify that indexes match the content of tables.
+
+    :param termbase: termbase to be checked
+    :type termbase: Termbase
+    :param quick: whether to perform the quick check
+    :type quick: bool
+    :param progress: callable receiving the number of steps performed and
+    returning a true value if the operation must be aborted
+    :type progress: callable
+    :returns: the list of the problems found (empty if the file is sane)
+    :rtype: list
+    :raises sqlite3.OperationalError: if the operation is aborted
+    """
+    connection = _connect(termbase, progress)
+    try:
+        pragma = 'quick_check' if quick else 'integrity_check'
+        errors = [row[0] for row in
+                  connection.execute('PRAGMA {0}'.format(pragma))]
+    finally:
+        connection.close()
+    return [] if errors == ['ok'] else errors
+
+
+def analyze(termbase, progress=None):
+    """Gathers the statistics used by the SQLite query planner, which should
+    be done after bulk changes to the termbase content.
+
+    :param termbase: termbase to be analyzed
+    :type termbase: Termbase
+    :param progress: callable receiving the number of steps performed and
+    returning a true value if the operation must be aborted
+    :type progress: callable
+    :rtype: None
+    :raises sqlite3.OperationalError: if the operation is aborted
+    """
+    connection = _connect(termbase, progress)
+    try:
+        connection.execute('ANALYZE')
+    finally:
+        connection.close()
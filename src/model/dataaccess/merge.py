@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.merge
+
+This module contains the merge engine, which copies the content of a termbase
+into another one. The termbase to be merged is attached to a plain SQLite
+connection to the target termbase and all the data are moved with set-based
+SQL statements, in a single transaction, rather than entry by entry:
+
+* languages are added to the target termbase if missing;
+* properties are matched by their (name, level, type) triple and created in
+  the target termbase if missing, along with their picklist values;
+* entries are matched by a hash of their normalized vedette terms in the
+  languages shared by the two termbases; an entry is merged into the matching
+  entry of the target termbase if the match is unambiguous, otherwise it is
+  added as a new entry;
+* terms of merged entries are added unless a term with the same normalized
+  lemma already exists, and property values are added unless the target
+  termbase already has a value for the same property.
+
+Whatever could not be merged automatically (ambiguous matches, different
+vedettes and different property values) is collected in a report of
+conflicts, the values of the target termbase always taking precedence.
+"""
+
+import collections
+import csv
+import datetime
+import hashlib
+import logging
+import os
+import sqlite3
+import unicodedata
+import uuid
+
+from src.model.dataaccess import collation, maintenance
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+_PROGRESS_STEPS = 100000
+"""Number of SQLite virtual machine instructions between progress updates.
+"""
+
+AMBIGUOUS, VEDETTE, PROPERTY = 'ambiguous', 'vedette', 'property'
+"""Kinds of conflicts.
+"""
+
+Conflict = collections.namedtuple('Conflict', ['kind', 'entry_id', 'locale',
+                                               'property', 'target_value',
+                                               'source_value'])
+"""A difference between the two termbases that has not been merged. For
+ambiguous matches, the target value lists the IDs of the matching entries.
+"""
+
+MergeReport = collections.namedtuple('MergeReport', [
+    'merged_entries', 'added_entries', 'added_terms', 'added_values',
+    'conflicts'])
+"""Outcome of a merge, with the number of items merged or added and the list
+of conflicts.
+"""
+
+_VALUE_TABLES = [
+    ('EntryPropertyAssoc', 'entry_id', 'entry_map'),
+    ('EntryLanguageAssocPropertyAssoc', 'ela_id', 'ela_map'),
+    ('TermPropertyAssoc', 'term_id', 'term_map'),
+]
+"""Tables of property values, along with the column of the item the values
+refer to and the temporary table mapping those items to the target termbase.
+"""
+
+
+def normalize_lemma(lemma):
+    """Returns the normalized form of a lemma used to compare terms, which is
+    insensitive to case, to Unicode composition and to whitespace.
+
+    :param lemma: lemma to be normalized
+    :type lemma: str
+    :rtype: str
+    """
+    return ' '.join(unicodedata.normalize('NFKC', lemma).casefold().split())
+
+
+def get_vedette_key(locale, lemma):
+    """Returns the (64 bit) hash of a normalized vedette in a language, which
+    is used to match entries.
+
+    :param locale: locale of the language of the vedette
+    :type locale: str
+    :param lemma: lemma of the vedette
+    :type lemma: str
+    :rtype: int
+    """
+    digest = hashlib.blake2b('{0}\0{1}'.format(
+        locale, normalize_lemma(lemma)).encode('utf-8'), digest_size=8)
+    return int.from_bytes(digest.digest(), 'big', signed=True)
+
+
+def write_report(report, file_name):
+    """Writes the conflicts of a merge to a CSV file, with a header row.
+
+    :param report: report of the merge
+    :type report: MergeReport
+    :param file_name: path of the output file
+    :type file_name: str
+    :rtype: None
+    """
+    with open(file_name, 'w', newline='') as file_handle:
+        writer = csv.writer(file_handle)
+        writer.writerow(Conflict._fields)
+        writer.writerows(report.conflicts)
+
+
+def _new_id():
+    return str(uuid.uuid4())
+
+
+def _connect(file_name, source_file_name, progress=None):
+    """Opens a plain SQLite connection to the target termbase, with the
+    functions used by the merge statements and the source termbase attached.
+    """
+    connection = sqlite3.connect(file_name, isolation_level=None)
+    # attached before installing the progress handler, since an interrupted
+    # ATTACH is reported as a file which cannot be opened
+    connection.execute('ATTACH DATABASE ? AS source', (source_file_name,))
+    connection.create_function('normalize_lemma', 1, normalize_lemma)
+    connection.create_function('vedette_key', 2, get_vedette_key)
+    connection.create_function('sort_key', 2, collation.get_sort_key)
+    connection.create_function('new_id', 0, _new_id)
+    if progress:
+        steps = [0]
+
+        def handler():
+            steps[0] += 1
+            return progress(steps[0])
+        connection.set_progress_handler(handler, _PROGRESS_STEPS)
+    return connection
+
+
+def _match_entries(connection):
+    """Fills the temporary entry map, matching the entries of the source
+    termbase with the entries of the target termbase sharing a vedette in one
+    of their common languages.
+
+    :returns: the conflicts due to ambiguous matches
+    :rtype: list
+    """
+    for (name, schema, other) in [('source_keys', 'source', 'main'),
+                                  ('target_keys', 'main', 'source')]:
+        connection.execute(
+            'CREATE TEMP TABLE {0} (key INTEGER, entry_id TEXT)'.format(name))
+        connection.execute(
+            'INSERT INTO {0} SELECT vedette_key(lang_id, lemma), entry_id '
+            'FROM {1}.Terms WHERE vedette AND lang_id IN '
+            '(SELECT locale FROM {2}.Languages)'.format(name, schema, other))
+    connection.execute(
+        'CREATE INDEX temp.target_keys_key ON target_keys (key)')
+    connection.execute(
+        'CREATE TEMP TABLE candidates AS SELECT DISTINCT '
+        's.entry_id AS src_id, t.entry_id AS tgt_id '
+        'FROM source_keys s JOIN target_keys t '
+        'ON s.key = t.key')
+    connection.execute(
+        'CREATE TEMP TABLE entry_map (src_id TEXT PRIMARY KEY, tgt_id TEXT, '
+        'entry_id TEXT, locale TEXT, new INTEGER NOT NULL DEFAULT 0)')
+    # matches must be one-to-one
+    connection.execute(
+        'INSERT INTO entry_map (src_id, tgt_id) SELECT src_id, tgt_id '
+        'FROM candidates WHERE src_id IN (SELECT src_id FROM candidates '
+        'GROUP BY src_id HAVING count(*) = 1) AND tgt_id IN (SELECT tgt_id '
+        'FROM candidates GROUP BY tgt_id HAVING count(*) = 1)')
+    connection.execute(
+        'INSERT INTO entry_map (src_id, tgt_id, new) SELECT entry_id, '
+        'new_id(), 1 FROM source.Entries WHERE entry_id NOT IN '
+        '(SELECT src_id FROM entry_map)')
+    connection.execute('UPDATE entry_map SET entry_id = tgt_id')
+    return [Conflict(AMBIGUOUS, entry_id, None, None, candidates, None)
+            for (entry_id, candidates) in connection.execute(
+                'SELECT m.tgt_id, group_concat(c.tgt_id, \', \') '
+                'FROM candidates c JOIN entry_map m ON m.src_id = c.src_id '
+                'WHERE m.new GROUP BY c.src_id ORDER BY m.tgt_id')]
+
+
+def _map_properties(connection):
+    """Adds the missing languages, properties and picklist values to the
+    target termbase and fills the temporary property map.
+    """
+    connection.execute('INSERT OR IGNORE INTO main.Languages (locale) '
+                       'SELECT locale FROM source.Languages')
+    connection.execute(
+        'CREATE TEMP TABLE prop_map (src_id TEXT PRIMARY KEY, tgt_id TEXT, '
+        'new INTEGER NOT NULL DEFAULT 0)')
+    connection.execute(
+        'INSERT INTO prop_map (src_id, tgt_id) SELECT s.prop_id, '
+        '(SELECT min(t.prop_id) FROM main.Properties t WHERE t.name = s.name '
+        'AND t.level = s.level AND t.prop_type = s.prop_type) '
+        'FROM source.Properties s')
+    connection.execute('UPDATE prop_map SET tgt_id = new_id(), new = 1 '
+                       'WHERE tgt_id IS NULL')
+    connection.execute(
+        'INSERT INTO main.Properties (name, prop_id, level, prop_type) '
+        'SELECT s.name, m.tgt_id, s.level, s.prop_type FROM prop_map m '
+        'JOIN source.Properties s ON s.prop_id = m.src_id WHERE m.new')
+    connection.execute(
+        'INSERT OR IGNORE INTO main.PickListValues (prop_id, value) '
+        'SELECT m.tgt_id, v.value FROM source.PickListValues v '
+        'JOIN prop_map m ON m.src_id = v.prop_id')
+
+
+def _map_languages_and_terms(connection):
+    """Fills the temporary maps of the entry-language associations and of
+    the terms, matching the terms of merged entries by normalized lemma.
+
+    :returns: the conflicts due to different vedettes
+    :rtype: list
+    """
+    # the target items of merged entries, indexed to speed up matching
+    connection.execute(
+        'CREATE TEMP TABLE target_terms AS SELECT t.term_id, t.entry_id, '
+        't.lang_id, t.vedette, normalize_lemma(t.lemma) AS lemma, '
+        't.lemma AS original FROM main.Terms t JOIN entry_map m '
+        'ON m.tgt_id = t.entry_id WHERE NOT m.new')
+    connection.execute('CREATE INDEX temp.target_terms_lemma ON target_terms '
+                       '(entry_id, lang_id, lemma)')
+    connection.execute(
+        'CREATE TEMP TABLE target_elas AS SELECT a.ela_id, a.entry_id, '
+        'a.lang_id FROM main.EntryLanguageAssoc a JOIN entry_map m '
+        'ON m.tgt_id = a.entry_id WHERE NOT m.new')
+    connection.execute('CREATE INDEX temp.target_elas_lang ON target_elas '
+                       '(entry_id, lang_id)')
+    conflicts = [Conflict(VEDETTE, *row) for row in connection.execute(
+        'SELECT m.tgt_id, s.lang_id, NULL, t.original, s.lemma '
+        'FROM entry_map m JOIN source.Terms s ON s.entry_id = m.src_id '
+        'JOIN target_terms t ON t.entry_id = m.tgt_id '
+        'AND t.lang_id = s.lang_id WHERE s.vedette AND t.vedette '
+        'AND t.lemma != normalize_lemma(s.lemma) ORDER BY m.tgt_id')]
+    connection.execute(
+        'CREATE TEMP TABLE ela_map (src_id TEXT PRIMARY KEY, tgt_id TEXT, '
+        'entry_id TEXT, locale TEXT, new INTEGER NOT NULL DEFAULT 0)')
+    connection.execute(
+        'INSERT INTO ela_map (src_id, tgt_id, entry_id, locale) '
+        'SELECT s.ela_id, (SELECT min(t.ela_id) FROM target_elas t '
+        'WHERE t.entry_id = m.tgt_id AND t.lang_id = s.lang_id), m.tgt_id, '
+        's.lang_id FROM source.EntryLanguageAssoc s JOIN entry_map m '
+        'ON m.src_id = s.entry_id')
+    connection.execute(
+        'CREATE TEMP TABLE term_map (src_id TEXT PRIMARY KEY, tgt_id TEXT, '
+        'entry_id TEXT, locale TEXT, lemma TEXT, '
+        'new INTEGER NOT NULL DEFAULT 0)')
+    connection.execute(
+        'INSERT INTO term_map (src_id, tgt_id, entry_id, locale, lemma) '
+        'SELECT s.term_id, (SELECT min(t.term_id) FROM target_terms t '
+        'WHERE t.entry_id = m.tgt_id AND t.lang_id = s.lang_id '
+        'AND t.lemma = normalize_lemma(s.lemma)), m.tgt_id, s.lang_id, '
+        's.lemma FROM source.Terms s JOIN entry_map m '
+        'ON m.src_id = s.entry_id')
+    for table in ['ela_map', 'term_map']:
+        connection.execute('UPDATE {0} SET tgt_id = new_id(), new = 1 '
+                           'WHERE tgt_id IS NULL'.format(table))
+    # the same lemma may appear twice in an entry of older termbases
+    connection.execute('CREATE INDEX temp.term_map_lemma ON term_map '
+                       '(entry_id, locale, lemma)')
+    connection.execute(
+        'UPDATE term_map SET tgt_id = (SELECT min(d.tgt_id) FROM term_map d '
+        'WHERE d.new AND d.entry_id = term_map.entry_id '
+        'AND d.locale = term_map.locale AND d.lemma = term_map.lemma) '
+        'WHERE new')
+    return conflicts
+
+
+def _get_value_conflicts(connection):
+    """Returns the conflicts due to properties having different values in the
+    two termbases.
+
+    :rtype: list
+    """
+    conflicts = []
+    for (table, column, item_map) in _VALUE_TABLES:
+        rows = connection.execute(
+            'SELECT i.entry_id, i.locale, n.name, t.value, s.value '
+            'FROM source.{0} s JOIN {2} i ON i.src_id = s.{1} '
+            'JOIN prop_map p ON p.src_id = s.prop_id '
+            'JOIN source.Properties n ON n.prop_id = s.prop_id '
+            'JOIN main.{0} t ON t.{1} = i.tgt_id AND t.prop_id = p.tgt_id '
+            'WHERE t.value != s.value ORDER BY i.entry_id'.format(
+                table, column, item_map))
+        conflicts.extend(Conflict(PROPERTY, *row) for row in rows)
+    return conflicts
+
+
+def _copy_data(connection, timestamp):
+    """Inserts the new entries, terms and property values into the target
+    termbase, recording them in the change journal.
+
+    :returns: the number of added terms and property values
+    :rtype: tuple
+    """
+    connection.execute('CREATE TEMP TABLE touched (entry_id TEXT PRIMARY KEY)')
+    connection.execute('INSERT OR IGNORE INTO touched SELECT entry_id '
+                       'FROM term_map WHERE new')
+    for (table, column, item_map) in _VALUE_TABLES:
+        connection.execute(
+            'INSERT OR IGNORE INTO touched SELECT i.entry_id '
+            'FROM source.{0} s JOIN {2} i ON i.src_id = s.{1} '
+            'JOIN prop_map p ON p.src_id = s.prop_id WHERE NOT EXISTS '
+            '(SELECT 1 FROM main.{0} t WHERE t.{1} = i.tgt_id '
+            'AND t.prop_id = p.tgt_id)'.format(table, column, item_map))
+    connection.execute('INSERT INTO main.Entries (entry_id) '
+                       'SELECT tgt_id FROM entry_map WHERE new')
+    connection.execute(
+        'INSERT INTO main.EntryLanguageAssoc (ela_id, entry_id, lang_id) '
+        'SELECT tgt_id, entry_id, locale FROM ela_map WHERE new')
+    # a new term cannot be the vedette of a merged entry which has one
+    added_terms = connection.execute(
+        'INSERT OR IGNORE INTO main.Terms '
+        '(term_id, lemma, lang_id, vedette, entry_id, sort_key) '
+        'SELECT m.tgt_id, s.lemma, s.lang_id, s.vedette AND NOT EXISTS '
+        '(SELECT 1 FROM target_terms t WHERE t.entry_id = m.entry_id '
+        'AND t.lang_id = s.lang_id AND t.vedette), m.entry_id, '
+        'sort_key(s.lemma, s.lang_id) '
+        'FROM term_map m JOIN source.Terms s ON s.term_id = m.src_id '
+        'WHERE m.new').rowcount
+    added_values = 0
+    for (table, column, item_map) in _VALUE_TABLES:
+        added_values += connection.execute(
+            'INSERT OR IGNORE INTO main.{0} ({1}, prop_id, value) '
+            'SELECT i.tgt_id, p.tgt_id, s.value FROM source.{0} s '
+            'JOIN {2} i ON i.src_id = s.{1} '
+            'JOIN prop_map p ON p.src_id = s.prop_id'.format(
+                table, column, item_map)).rowcount
+    connection.execute(
+        'INSERT INTO main.Changes (timestamp, operation, kind, entry_id) '
+        'SELECT ?, \'I\', \'entry\', tgt_id FROM entry_map WHERE new '
+        'UNION ALL SELECT ?, \'U\', \'entry\', t.entry_id FROM touched t '
+        'JOIN entry_map m ON m.tgt_id = t.entry_id WHERE NOT m.new',
+        (timestamp, timestamp))
+    return added_terms, added_values
+
+
+def merge(termbase, file_name, progress=None):
+    """Merges the content of a termbase file into a termbase, in a single
+    transaction. The statistics of the termbase are computed again and the
+    query planner statistics are updated afterwards.
+
+    :param termbase: termbase where the content is merged
+    :type termbase: Termbase
+    :param file_name: path of the termbase file to be merged
+    :type file_name: str
+    :param progress: callable receiving the number of steps performed and
+    returning a true value if the operation must be aborted
+    :type progress: callable
+    :returns: the report of the merge
+    :rtype: MergeReport
+    :raises ValueError: if the file does not exist or is the termbase file
+    itself
+    :raises sqlite3.OperationalError: if the operation is aborted
+    """
+    target_file_name = termbase.get_termbase_file_name()
+    if not os.path.exists(file_name):
+        raise ValueError('termbase file {0} does not exist'.format(file_name))
+    if os.path.samefile(file_name, target_file_name):
+        raise ValueError('a termbase cannot be merged into itself')
+    timestamp = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    connection = _connect(target_file_name, file_name, progress)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            conflicts = _match_entries(connection)
+            _map_properties(connection)
+            conflicts.extend(_map_languages_and_terms(connection))
+            conflicts.extend(_get_value_conflicts(connection))
+            added_terms, added_values = _copy_data(connection, timestamp)
+            merged, added = connection.execute(
+                'SELECT count(*) - sum(new), sum(new) FROM entry_map'
+            ).fetchone()
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            # an interrupted write statement has already rolled back the
+            # transaction, and the original error must not be replaced
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+    finally:
+        connection.close()
+    report = MergeReport(merged or 0, added or 0, added_terms, added_values,
+                         conflicts)
+    _LOG.info('%s merged into termbase %s: %d entries merged, %d added, '
+              '%d conflicts', file_name, termbase.name, report.merged_entries,
+              report.added_entries, len(conflicts))
+    termbase.rebuild_statistics()
+    maintenance.analyze(termbase)
+    return report
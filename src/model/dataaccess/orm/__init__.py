@@ -31,6 +31,7 @@ in the sql module.
 from src.model.dataaccess.orm.mapping import (
     Entry, EntryLanguageAssociation,
     EntryPropertyAssociation, EntryLanguagePropertyAssociation, Term,
-    TermPropertyAssociation, Language, Property, PickListValue)
+    TermPropertyAssociation, Language, Property, PickListValue, Statistic,
+    Change)
 from src.model.dataaccess.orm.sql import (
     write_to_disk, DB_DIR, initialize_tb_folder, get_termbase_names)
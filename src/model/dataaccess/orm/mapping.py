@@ -26,8 +26,8 @@ object-relational mapping with SQLAlchemy. This is the basis for the data access
 layer too.
 """
 
-from sqlalchemy.schema import Column, ForeignKey, UniqueConstraint
-from sqlalchemy.types import String, Boolean, Enum
+from sqlalchemy.schema import Column, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.types import String, Boolean, Enum, Integer, DateTime
 
 from src.model import constants
 from src.model.dataaccess.orm import sql
@@ -129,6 +129,11 @@ class Term(sql.Mappable):
     """
     # name of the corresponding table
     __tablename__ = 'Terms'
+    # a lemma can appear only once in each language of an entry, terms are
+    # listed and searched in the collation order of their language
+    __table_args__ = (UniqueConstraint('entry_id', 'lang_id', 'lemma'),
+                      Index('ix_Terms_lang_id_sort_key', 'lang_id',
+                            'sort_key'))
     # field mapping
     term_id = Column(String, primary_key=True)
     lemma = Column(String, nullable=False)
@@ -138,8 +143,7 @@ class Term(sql.Mappable):
     entry_id = Column(String,
                       ForeignKey('Entries.entry_id', ondelete='CASCADE'),
                       nullable=False)
-    # other constraints
-    UniqueConstraint('entry_id', 'lang_id', 'lemma')
+    sort_key = Column(String)
 
 
 class TermPropertyAssociation(sql.Mappable):
@@ -154,3 +158,34 @@ class TermPropertyAssociation(sql.Mappable):
                      ForeignKey('Properties.prop_id', ondelete='CASCADE'),
                      primary_key=True)
     value = Column(String, nullable=False)
+
+
+class Statistic(sql.Mappable):
+    """Named counter of the termbase statistics (e.g. the number of entries or
+    the number of terms in a language), kept up to date whenever the content
+    of the termbase changes.
+    """
+    # name of the corresponding table
+    __tablename__ = 'Statistics'
+    # field mapping
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class Change(sql.Mappable):
+    """Record of the change journal, describing an insertion, update or
+    deletion of an entry, term or property value.
+    """
+    # name of the corresponding table
+    __tablename__ = 'Changes'
+    # sequence numbers must never be reused, even after a purge
+    __table_args__ = {'sqlite_autoincrement': True}
+    # field mapping
+    seq = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    operation = Column(Enum(*constants.CHANGE_OPERATIONS), nullable=False)
+    kind = Column(Enum(*constants.CHANGE_KINDS), nullable=False)
+    entry_id = Column(String)
+    term_id = Column(String)
+    prop_id = Column(String)
+    locale = Column(String)
@@ -59,7 +59,9 @@ def get_termbase_names():
 
 
 def write_to_disk(tb_name, engine):
-    """Creates an empty termbase in a local file.
+    """Creates an empty termbase in a local file, with incremental auto-vacuum
+    enabled so that the space freed by deletions can be given back to the file
+    system.
 
     :param tb_name: name of the termbase to be saved
     :type tb_name: str
@@ -68,4 +70,10 @@ def write_to_disk(tb_name, engine):
     :rtype: None
     """
     if not os.path.exists(tb_name):
-        Mappable.metadata.create_all(engine)
+        connection = engine.connect()
+        try:
+            # must be set before the first table is created
+            connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            Mappable.metadata.create_all(connection)
+        finally:
+            connection.close()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.prefetch
+
+This module contains the prefetcher of terminological entries, which is used
+while the user browses the entry list: whenever an entry is displayed, its
+neighbours in the list are read in a background thread and kept in a bounded
+cache, so that moving to the next (or previous) entry does not need to wait
+for the termbase.
+
+Entries are cached as read-only snapshots, i.e. plain in-memory copies of all
+the values of an entry which are loaded with a fixed number of queries.
+Snapshots expose the same getters as ``Entry`` and ``Term`` so that they can be
+displayed in their place, but they are never updated: the snapshot of an entry
+must be invalidated as soon as the entry is modified.
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from src.model.dataaccess import orm
+from src.model.dataaccess.instrumentation import get_query_statistics
+
+HIT_COUNTER = 'EntryPrefetcher.hit'
+"""Name of the instrumentation counter of snapshots found in the cache.
+"""
+
+MISS_COUNTER = 'EntryPrefetcher.miss'
+"""Name of the instrumentation counter of snapshots read on demand.
+"""
+
+
+class TermSnapshot(object):
+    """Read-only copy of a term and of the values of its properties.
+    """
+
+    def __init__(self, term_id, lemma, locale, vedette, values):
+        """Constructor method.
+
+        :param term_id: ID of the term
+        :type term_id: str
+        :param lemma: lemma of the term
+        :type lemma: str
+        :param locale: ID of the language of the term
+        :type locale: str
+        :param vedette: flag indicating whether the term is a vedette or not
+        :type vedette: bool
+        :param values: values of the term properties keyed by property ID
+        :type values: dict
+        :rtype: TermSnapshot
+        """
+        self.term_id = term_id
+        self.lemma = lemma
+        self.locale = locale
+        self.vedette = vedette
+        self._values = values
+
+    def get_property(self, prop_id):
+        """Gets the value of a given property for the term.
+
+        :param prop_id: ID of the property involved
+        :type prop_id: str
+        :returns: the value of the property (None if it is not set)
+        :rtype: str
+        """
+        return self._values.get(prop_id)
+
+
+class EntrySnapshot(object):
+    """Read-only copy of a terminological entry, its terms and the values of
+    all their properties.
+    """
+
+    def __init__(self, entry_id, values, language_values, terms):
+        """Constructor method.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :param values: values of entry-level properties keyed by property ID
+        :type values: dict
+        :param language_values: values of language-level properties keyed by
+        (locale, property ID) 2-tuples
+        :type language_values: dict
+        :param terms: lists of terms keyed by locale
+        :type terms: dict
+        :rtype: EntrySnapshot
+        """
+        self.entry_id = entry_id
+        self._values = values
+        self._language_values = language_values
+        self._terms = terms
+
+    def get_vedette(self, locale):
+        """Returns the lemma of the vedette term of the given language.
+
+        :param locale: ID of the language of which the vedette term is needed
+        :type locale: str
+        :rtype: str
+        """
+        for term in self._terms.get(locale, []):
+            if term.vedette:
+                return term.lemma
+
+    def get_property(self, prop_id):
+        """Gets the value of a given entry-level property.
+
+        :param prop_id: ID of the property involved
+        :type prop_id: str
+        :rtype: str
+        """
+        return self._values.get(prop_id)
+
+    def get_language_property(self, lang_id, prop_id):
+        """Gets the value of a language-level property.
+
+        :param lang_id: ID of the language involved
+        :type lang_id: str
+        :param prop_id: ID of the property involved
+        :type prop_id: str
+        :rtype: str
+        """
+        return self._language_values.get((lang_id, prop_id))
+
+    def get_term(self, locale, lemma):
+        """Returns the term having the given locale and lemma.
+
+        :param locale: ID of the language of the desired term
+        :type locale: str
+        :param lemma: lemma of the desired term
+        :type lemma: str
+        :returns: the term if it exists, None otherwise
+        :rtype: TermSnapshot
+        """
+        for term in self._terms.get(locale, []):
+            if term.lemma == lemma:
+                return term
+
+    def get_terms(self, locale):
+        """Returns the terms of the given language.
+
+        :param locale: ID of the language whose terms must be retrieved
+        :type locale: str
+        :rtype: list
+        """
+        return list(self._terms.get(locale, []))
+
+
+def load_entry(session, entry_id):
+    """Reads the whole content of an entry with four queries, regardless of
+    the number of its terms and properties.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :param entry_id: ID of the entry
+    :type entry_id: str
+    :returns: the snapshot of the entry
+    :rtype: EntrySnapshot
+    """
+    values = dict(session.query(
+        orm.EntryPropertyAssociation.prop_id,
+        orm.EntryPropertyAssociation.value).filter(
+        orm.EntryPropertyAssociation.entry_id == entry_id))
+    language_values = {
+        (lang_id, prop_id): value for (lang_id, prop_id, value) in
+        session.query(orm.EntryLanguageAssociation.lang_id,
+                      orm.EntryLanguagePropertyAssociation.prop_id,
+                      orm.EntryLanguagePropertyAssociation.value).join(
+            orm.EntryLanguagePropertyAssociation,
+            orm.EntryLanguagePropertyAssociation.ela_id ==
+            orm.EntryLanguageAssociation.ela_id).filter(
+            orm.EntryLanguageAssociation.entry_id == entry_id)}
+    term_values = {}
+    for (term_id, prop_id, value) in session.query(
+            orm.TermPropertyAssociation.term_id,
+            orm.TermPropertyAssociation.prop_id,
+            orm.TermPropertyAssociation.value).join(
+            orm.Term, orm.Term.term_id ==
+            orm.TermPropertyAssociation.term_id).filter(
+            orm.Term.entry_id == entry_id):
+        term_values.setdefault(term_id, {})[prop_id] = value
+    terms = {}
+    for term in session.query(orm.Term).filter(orm.Term.entry_id == entry_id):
+        terms.setdefault(term.lang_id, []).append(
+            TermSnapshot(term.term_id, term.lemma, term.lang_id,
+                         term.vedette, term_values.get(term.term_id, {})))
+    return EntrySnapshot(entry_id, values, language_values, terms)
+
+
+class EntryPrefetcher(object):
+    """Bounded cache of entry snapshots which is filled in advance by a
+    background thread, the least recently used snapshots being discarded
+    first. Snapshots that are requested before being prefetched are read on
+    demand, hits and misses being counted by the query statistics.
+    """
+
+    _CAPACITY = 64
+    """Maximum number of snapshots kept in memory.
+    """
+
+    DISTANCE = 5
+    """Default number of entries prefetched before and after the displayed
+    one.
+    """
+
+    def __init__(self, termbase, capacity=_CAPACITY):
+        """Constructor method.
+
+        :param termbase: termbase whose entries are prefetched
+        :type termbase: Termbase
+        :param capacity: maximum number of snapshots kept in memory
+        :type capacity: int
+        :rtype: EntryPrefetcher
+        """
+        self._tb = termbase
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._snapshots = collections.OrderedDict()
+        # futures of the entries which are waiting to be read (or being read)
+        self._pending = {}
+        # incremented upon invalidation, so that snapshots read before it are
+        # not stored in the cache
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(1)
+
+    def _load(self, entry_id):
+        """Reads the snapshot of an entry from the termbase.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :returns: the snapshot, None if the termbase could not be read
+        :rtype: EntrySnapshot
+        """
+        snapshot = None
+        with self._tb.get_session() as session:
+            snapshot = load_entry(session, entry_id)
+        return snapshot
+
+    def _store(self, entry_id, snapshot, generation):
+        """Puts a snapshot in the cache, unless it has been invalidated in the
+        meantime. The lock must be held by the caller.
+        """
+        if snapshot is None or generation != self._generation:
+            return
+        self._snapshots[entry_id] = snapshot
+        self._snapshots.move_to_end(entry_id)
+        if len(self._snapshots) > self._capacity:
+            self._snapshots.popitem(last=False)
+
+    def _prefetch_entry(self, entry_id, generation):
+        """Reads the snapshot of an entry in the background thread.
+        """
+        try:
+            snapshot = self._load(entry_id)
+        finally:
+            with self._lock:
+                self._pending.pop(entry_id, None)
+        with self._lock:
+            self._store(entry_id, snapshot, generation)
+
+    def get(self, entry_id):
+        """Returns the snapshot of an entry, reading it from the termbase if it
+        has not been prefetched.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :returns: the snapshot, None if the termbase could not be read
+        :rtype: EntrySnapshot
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(entry_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(entry_id)
+            future = self._pending.get(entry_id)
+            generation = self._generation
+        if snapshot is not None:
+            get_query_statistics().increment(HIT_COUNTER)
+            return snapshot
+        get_query_statistics().increment(MISS_COUNTER)
+        if future and not future.cancel():
+            # already being read, which is faster than starting over (errors
+            # are not raised here, the entry being read again below)
+            future.exception()
+            with self._lock:
+                snapshot = self._snapshots.get(entry_id)
+            if snapshot is not None:
+                return snapshot
+        snapshot = self._load(entry_id)
+        with self._lock:
+            self._store(entry_id, snapshot, generation)
+        return snapshot
+
+    def prefetch(self, entry_ids):
+        """Schedules the given entries to be read in the background, in the
+        given order. Entries that were scheduled by previous calls and are not
+        in the list are not read any more, unless they are already being read.
+
+        :param entry_ids: IDs of the entries to be prefetched
+        :type entry_ids: list
+        :rtype: None
+        """
+        with self._lock:
+            wanted = set(entry_ids)
+            for (entry_id, future) in list(self._pending.items()):
+                if entry_id not in wanted and future.cancel():
+                    del self._pending[entry_id]
+            for entry_id in entry_ids:
+                if entry_id in self._snapshots or entry_id in self._pending:
+                    continue
+                self._pending[entry_id] = self._executor.submit(
+                    self._prefetch_entry, entry_id, self._generation)
+
+    def invalidate(self, entry_id=None):
+        """Discards the snapshot of an entry after it has been modified (or all
+        the snapshots if no entry is given).
+
+        :param entry_id: ID of the entry, None for all the entries
+        :type entry_id: str
+        :rtype: None
+        """
+        with self._lock:
+            self._generation += 1
+            if entry_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(entry_id, None)
+
+    def close(self):
+        """Stops prefetching and discards all the snapshots, to be called when
+        the termbase is closed.
+
+        :rtype: None
+        """
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            self._snapshots.clear()
+            self._generation += 1
+        self._executor.shutdown(wait=False)
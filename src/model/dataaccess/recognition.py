@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: src.model.dataaccess.recognition
+
+This module contains the term recognition engine, which is used to find all the
+terms of a termbase that occur in a running text (e.g. a source document to be
+translated). All the lemmata of a given language are compiled into an
+Aho-Corasick automaton, so that a text can be scanned in a time that is linear
+in its length no matter how many terms the termbase contains.
+
+Compiled automata are cached in the termbase folder next to the termbase file
+and they are automatically rebuilt whenever the termbase file has changed since
+they were compiled.
+"""
+
+import collections
+import logging
+import os
+import pickle
+import re
+
+from src.model.dataaccess import orm
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+Match = collections.namedtuple('Match', ['start', 'end', 'lemma'])
+"""Occurrence of a term in a text, ``start`` and ``end`` are the offsets of the
+occurrence in the text (as in slices) and ``lemma`` is the lemma of the term as
+it is stored in the termbase.
+"""
+
+_CACHE_VERSION = 2
+"""Version of the format of the cache files, to be increased whenever the
+internal structure of the automaton changes.
+"""
+
+
+class TermRecognizer(object):
+    """Finds the occurrences of the terms of a termbase in a text, for the
+    language with the given locale.
+    """
+
+    def __init__(self, termbase, locale, case_sensitive=False,
+                 whole_words=True):
+        """Constructor method.
+
+        :param termbase: termbase whose terms must be recognized
+        :type termbase: Termbase
+        :param locale: locale of the language of the text
+        :type locale: str
+        :param case_sensitive: whether the case of lemmata must be respected
+        :type case_sensitive: bool
+        :param whole_words: whether terms must be found only between word
+        boundaries, e.g. not to find 'cat' in 'concatenate'
+        :type whole_words: bool
+        :rtype: TermRecognizer
+        """
+        self._tb = termbase
+        self.locale = locale
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+        self._automaton = None
+
+    def get_cache_file_name(self):
+        """Returns the name of the file where the compiled automaton is cached.
+
+        :returns: path of the cache file in the termbase folder
+        :rtype: str
+        """
+        return os.path.join(orm.DB_DIR, '{0}.{1}.{2}.ac'.format(
+            self._tb.name, self.locale, 'cs' if self.case_sensitive else 'ci'))
+
+    def _get_fingerprint(self):
+        """Returns a value identifying the current state of the termbase file,
+        used to detect whether a cached automaton is stale.
+
+        :returns: a tuple with the modification time and size of the file
+        :rtype: tuple
+        """
+        stat = os.stat(self._tb.get_termbase_file_name())
+        return _CACHE_VERSION, stat.st_mtime_ns, stat.st_size
+
+    @property
+    def automaton(self):
+        """Returns the automaton used to recognize terms, loading it from the
+        cache if possible or compiling it from the termbase otherwise.
+
+        :returns: the compiled automaton
+        :rtype: _Automaton
+        """
+        fingerprint = self._get_fingerprint()
+        if self._automaton and self._automaton.fingerprint == fingerprint:
+            return self._automaton
+        self._automaton = self._load_cache(fingerprint)
+        if not self._automaton:
+            with self._tb.get_session() as session:
+                lemmata = [t[0] for t in session.query(orm.Term.lemma).filter(
+                    orm.Term.lang_id == self.locale).distinct()]
+            self._automaton = _Automaton(lemmata, self.case_sensitive,
+                                         fingerprint)
+            self._save_cache()
+        return self._automaton
+
+    def _load_cache(self, fingerprint):
+        """Loads the compiled automaton from the cache file, provided that it
+        exists and has been compiled from the current termbase content.
+
+        :param fingerprint: fingerprint of the current termbase content
+        :type fingerprint: tuple
+        :returns: the cached automaton or None
+        :rtype: _Automaton
+        """
+        try:
+            with open(self.get_cache_file_name(), 'rb') as file_handle:
+                automaton = pickle.load(file_handle)
+        except (IOError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if automaton.fingerprint == fingerprint:
+            return automaton
+
+    def _save_cache(self):
+        """Writes the compiled automaton to the cache file, errors are not
+        fatal since the automaton can be compiled again.
+
+        :rtype: None
+        """
+        file_name = self.get_cache_file_name()
+        try:
+            with open(file_name + '.tmp', 'wb') as file_handle:
+                pickle.dump(self._automaton, file_handle,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(file_name + '.tmp', file_name)
+        except IOError as exc:
+            _LOG.exception(exc)
+
+    def invalidate(self):
+        """Discards the compiled automaton, which will be compiled again the
+        next time it is needed.
+
+        :rtype: None
+        """
+        self._automaton = None
+        if os.path.exists(self.get_cache_file_name()):
+            os.remove(self.get_cache_file_name())
+
+    def find_terms(self, text, overlapping=True):
+        """Finds all the occurrences of the termbase terms in the given text.
+
+        :param text: the text to be scanned
+        :type text: str
+        :param overlapping: if False, only the leftmost-longest occurrences
+        are returned and occurrences overlapping them are discarded
+        :type overlapping: bool
+        :returns: a list of matches sorted by their position in the text
+        :rtype: list
+        """
+        automaton = self.automaton
+        matches = []
+        for (start, end, index) in automaton.scan(text):
+            if self.whole_words and not _is_at_boundaries(
+                    text, start, end, automaton.lemmata[index]):
+                continue
+            matches.append(Match(start, end, automaton.lemmata[index]))
+        matches.sort(key=lambda m: (m.start, m.start - m.end))
+        if overlapping:
+            return matches
+        result = []
+        for match in matches:
+            if not result or match.start >= result[-1].end:
+                result.append(match)
+        return result
+
+
+class _Automaton(object):
+    """Aho-Corasick automaton compiled from a list of lemmata, with goto,
+    failure and dictionary suffix links stored in flat lists so that it can
+    be pickled efficiently.
+    """
+
+    def __init__(self, lemmata, case_sensitive, fingerprint):
+        """Constructor method, compiles the automaton.
+
+        :param lemmata: lemmata to be recognized
+        :type lemmata: list
+        :param case_sensitive: whether the automaton is case sensitive
+        :type case_sensitive: bool
+        :param fingerprint: fingerprint of the termbase content
+        :type fingerprint: tuple
+        :rtype: _Automaton
+        """
+        self.fingerprint = fingerprint
+        self.case_sensitive = case_sensitive
+        self.lemmata = [l for l in lemmata if l]
+        self._goto = [{}]
+        self._fail = [0]
+        # indexes of the lemmata ending in each state, which are more than one
+        # if different lemmata have the same folded form
+        self._output = [[]]
+        self._dict_link = [0]
+        for (index, lemma) in enumerate(self.lemmata):
+            state = 0
+            for char in self._fold(lemma):
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._dict_link.append(0)
+                state = next_state
+            self._output[state].append(index)
+        self._link()
+
+    def _link(self):
+        """Computes failure and dictionary suffix links with a breadth-first
+        visit of the trie.
+
+        :rtype: None
+        """
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for (char, child) in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                failure = self._fail[child]
+                self._dict_link[child] = (
+                    failure if self._output[failure]
+                    else self._dict_link[failure])
+
+    def _fold(self, text):
+        """Folds the case of the given text, preserving its length so that
+        offsets in the folded text are valid in the original one too.
+
+        :param text: text to be folded
+        :type text: str
+        :returns: the folded text
+        :rtype: str
+        """
+        if self.case_sensitive:
+            return text
+        folded = text.lower()
+        if len(folded) == len(text):
+            return folded
+        return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+    def scan(self, text):
+        """Scans the text, generating a (start, end, lemma index) 3-tuple for
+        each occurrence of a lemma.
+
+        :param text: text to be scanned
+        :type text: str
+        :rtype: generator
+        """
+        goto, fail = self._goto, self._fail
+        output, dict_link = self._output, self._dict_link
+        lemmata = self.lemmata
+        state = 0
+        for (position, char) in enumerate(self._fold(text)):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match_state = state if output[state] else dict_link[state]
+            while match_state:
+                end = position + 1
+                for index in output[match_state]:
+                    yield end - len(lemmata[index]), end, index
+                match_state = dict_link[match_state]
+
+
+def _is_word_character(char):
+    return char.isalnum() or char == '_'
+
+
+def _is_at_boundaries(text, start, end, lemma):
+    """Checks that an occurrence of a lemma is not part of a longer word. No
+    check is performed at one side of the lemma if the lemma itself does not
+    begin (or end) with a word character, e.g. for 'C++'.
+    """
+    if (start > 0 and _is_word_character(lemma[0])
+            and _is_word_character(text[start - 1])):
+        return False
+    if (end < len(text) and _is_word_character(lemma[-1])
+            and _is_word_character(text[end])):
+        return False
+    return True
+
+
+def delete_recognition_caches(termbase_name):
+    """Removes all the cached automata compiled from the given termbase, e.g.
+    when the termbase itself is deleted.
+
+    :param termbase_name: name of the termbase
+    :type termbase_name: str
+    :rtype: None
+    """
+    # locales contain no dots, hence the caches of a termbase named e.g.
+    # 'name.other' are not matched
+    pattern = re.compile(r'{0}\.[^.]+\.c[is]\.ac'.format(
+        re.escape(termbase_name)))
+    for file_name in os.listdir(orm.DB_DIR):
+        if pattern.fullmatch(file_name):
+            os.remove(os.path.join(orm.DB_DIR, file_name))
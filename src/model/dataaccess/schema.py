@@ -28,7 +28,33 @@ queried and is accessible via the 'schema' property of each termbase instance.
 
 import uuid
 
-from src.model.dataaccess import orm
+from src.model.dataaccess import orm, statistics
+
+
+def get_property_records(name, level, prop_type='T', values=()):
+    """Returns the records that must be added to a termbase in order to define
+    a new property, i.e. the property itself and its picklist values.
+
+    :param name: name of the property
+    :type name: str
+    :param level: level of the property (entry, language or term)
+    :type level: str
+    :param prop_type: type of the property (picklist, text or image)
+    :type prop_type: str
+    :param values: list of possible picklist values
+    :type values: tuple
+    :returns: a list of mapped objects to be added to a session
+    :rtype: list
+    """
+    # it is impossible to create empty picklists
+    assert prop_type != 'P' or values
+    prop_id = str(uuid.uuid4())
+    records = [orm.Property(name=name, prop_id=prop_id, level=level,
+                            prop_type=prop_type)]
+    # adds the possible values for picklist properties
+    records.extend(orm.PickListValue(prop_id=prop_id, value=picklist_value)
+                   for picklist_value in values)
+    return records
 
 
 class Schema(object):
@@ -59,18 +85,9 @@ class Schema(object):
         :returns: the newly created property
         :rtype: None
         """
-        # it is impossible to create empty picklists
-        assert prop_type != 'P' or values
         with self._tb.get_session() as session:
-            prop_id = str(uuid.uuid4())
-            prop = orm.Property(name=name, prop_id=prop_id, level=level,
-                                prop_type=prop_type)
-            session.add(prop)
-            # adds the possible values for picklist properties
-            for picklist_value in values:
-                value = orm.PickListValue(prop_id=prop_id,
-                                          value=picklist_value)
-                session.add(value)
+            session.add_all(get_property_records(name, level, prop_type,
+                                                 values))
 
     def delete_property(self, prop_id):
         """Deletes of a property from the termbase schema.
@@ -82,6 +99,9 @@ class Schema(object):
         with self._tb.get_session() as session:
             session.query(orm.Property).filter(
                 orm.Property.prop_id == prop_id).delete()
+            session.query(orm.Statistic).filter(
+                orm.Statistic.name == statistics.get_property_key(prop_id)
+            ).delete()
 
     def get_properties(self, level):
         """Returns a list of all the properties that a given termbase schema
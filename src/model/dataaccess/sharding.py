@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.sharding
+
+This module contains the sharded layout of termbases, meant for very large
+termbases whose single file would take too long to be compacted or backed up.
+The entries of a sharded termbase are hash-partitioned across a fixed number
+of ordinary termbase files (the shards), which are stored in the
+``<name>.shards`` folder of the termbase directory and share the same
+languages and properties (with the same IDs). A ``ShardedTermbase`` hides the
+shards behind the interface of ``Termbase``:
+
+* operations on a single entry are routed to the shard the entry belongs to,
+  which is determined by a stable hash of its ID;
+* searches (sorted vedettes, lookups) are run on all the shards in parallel,
+  on the threads of a pool, and their results are merged in collation order;
+* statistics are the sum of the statistics of the shards.
+
+Each shard has its own change journal, whose sequence numbers are unrelated to
+the ones of the other shards, hence incremental exports are not supported.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import logging
+import os
+import shutil
+import sqlite3
+import uuid
+import zlib
+
+from src.model.dataaccess import orm, collation, statistics
+from src.model.dataaccess.entry import Entry
+from src.model.dataaccess.schema import Schema, get_property_records
+from src.model.dataaccess.termbase import Termbase
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.dataaccess')
+
+_SHARD_DIR = '{0}.shards'
+"""Name of the folder where the shards of a termbase are stored.
+"""
+
+_SHARD_NAME = '{0:02d}'
+"""Name of a shard inside the folder of its termbase.
+"""
+
+MAX_SHARDS = 100
+"""Maximum number of shards of a termbase.
+"""
+
+_ENTRY_TABLES = [
+    (orm.Entry, 'entry_id IN (SELECT entry_id FROM shard_entries)'),
+    (orm.EntryPropertyAssociation,
+     'entry_id IN (SELECT entry_id FROM shard_entries)'),
+    (orm.EntryLanguageAssociation,
+     'entry_id IN (SELECT entry_id FROM shard_entries)'),
+    (orm.EntryLanguagePropertyAssociation,
+     'ela_id IN (SELECT ela_id FROM main.EntryLanguageAssoc)'),
+    (orm.Term, 'entry_id IN (SELECT entry_id FROM shard_entries)'),
+    (orm.TermPropertyAssociation,
+     'term_id IN (SELECT term_id FROM main.Terms)')]
+"""Tables holding the content of entries, along with the condition selecting
+the rows of the entries of a shard (in this order, since conditions may refer
+to the tables which have already been copied).
+"""
+
+
+def get_shard_index(entry_id, shard_count):
+    """Returns the index of the shard an entry belongs to. The hash of the ID
+    is stable across processes (unlike the built-in ``hash``).
+
+    :param entry_id: ID of the entry
+    :type entry_id: str
+    :param shard_count: number of shards of the termbase
+    :type shard_count: int
+    :rtype: int
+    """
+    return zlib.crc32(entry_id.encode('utf-8')) % shard_count
+
+
+def _get_shard_dir(name):
+    """Returns the path of the folder of the shards of a termbase.
+
+    :param name: name of the sharded termbase
+    :type name: str
+    :rtype: str
+    """
+    return os.path.join(orm.DB_DIR, _SHARD_DIR.format(name))
+
+
+def _get_shard_name(name, index):
+    """Returns the name of a shard, which is the name of a termbase stored in
+    the folder of the shards.
+
+    :param name: name of the sharded termbase
+    :type name: str
+    :param index: index of the shard
+    :type index: int
+    :rtype: str
+    """
+    return os.path.join(_SHARD_DIR.format(name), _SHARD_NAME.format(index))
+
+
+def _copy_shard(source_file_name, shard, index, shard_count):
+    """Copies the entries of a termbase belonging to a shard into the (empty)
+    shard, attaching the termbase to a plain SQLite connection to the shard.
+
+    :param source_file_name: path of the termbase file
+    :type source_file_name: str
+    :param shard: the shard
+    :type shard: Termbase
+    :param index: index of the shard
+    :type index: int
+    :param shard_count: number of shards
+    :type shard_count: int
+    :rtype: None
+    """
+    connection = sqlite3.connect(shard.get_termbase_file_name())
+    connection.create_function(
+        'shard_index', 1, lambda e: get_shard_index(e, shard_count))
+    try:
+        connection.execute('ATTACH DATABASE ? AS source', (source_file_name,))
+        with connection:
+            connection.execute(
+                'CREATE TEMP TABLE shard_entries AS SELECT entry_id FROM '
+                'source.Entries WHERE shard_index(entry_id) = ?', (index,))
+            for (mapping, condition) in _ENTRY_TABLES:
+                table = mapping.__table__
+                columns = ', '.join(c.name for c in table.columns)
+                connection.execute(
+                    'INSERT INTO main.{0} ({1}) SELECT {1} FROM source.{0} '
+                    'WHERE {2}'.format(table.name, columns, condition))
+    finally:
+        connection.close()
+    shard.rebuild_statistics()
+
+
+def _check_new_termbase(name, shard_count):
+    """Checks that a sharded termbase can be created with the given name and
+    number of shards.
+
+    :param name: name of the new termbase
+    :type name: str
+    :param shard_count: number of shards
+    :type shard_count: int
+    :rtype: None
+    :raises ValueError: if a (sharded or ordinary) termbase with the given
+    name already exists or the number of shards is not valid
+    """
+    if not 0 < shard_count <= MAX_SHARDS:
+        raise ValueError('invalid number of shards: {0}'.format(shard_count))
+    if ShardedTermbase.exists(name) or os.path.exists(
+            os.path.join(orm.DB_DIR, '{0}.sqlite'.format(name))):
+        raise ValueError('termbase {0} already exists'.format(name))
+
+
+class ShardedTermbase(object):
+    """Representation of a terminological database whose entries are
+    partitioned across several termbase files.
+    """
+
+    @staticmethod
+    def exists(name):
+        """Returns whether a sharded termbase with the given name exists.
+
+        :param name: name of the termbase
+        :type name: str
+        :rtype: bool
+        """
+        return os.path.isdir(_get_shard_dir(name))
+
+    @classmethod
+    def create(cls, name, shard_count, languages=(), properties=()):
+        """Creates a new sharded termbase with the given languages and
+        properties. The first shard is created as an ordinary termbase and the
+        others copy its definition, so that properties have the same IDs in
+        all the shards.
+
+        :param name: name of the termbase
+        :type name: str
+        :param shard_count: number of shards
+        :type shard_count: int
+        :param languages: locales of the termbase languages
+        :type languages: iterable
+        :param properties: dictionaries with the ``name``, ``level``,
+        ``prop_type`` and ``values`` keys defining the termbase properties
+        :type properties: iterable
+        :returns: the newly created termbase
+        :rtype: ShardedTermbase
+        :raises ValueError: if the termbase cannot be created
+        """
+        _check_new_termbase(name, shard_count)
+        os.makedirs(_get_shard_dir(name))
+        first_name = _get_shard_name(name, 0)
+        Termbase.create(first_name, languages, properties).dispose()
+        for index in range(1, shard_count):
+            Termbase.create_from_template(
+                _get_shard_name(name, index), first_name).dispose()
+        return cls(name)
+
+    @classmethod
+    def create_from_termbase(cls, name, source_name, shard_count):
+        """Creates a new sharded termbase with the content of an existing
+        (ordinary) termbase, which is left untouched. Entries are copied into
+        the shards in parallel with set-based SQL statements, their change
+        journals starting empty.
+
+        :param name: name of the new termbase
+        :type name: str
+        :param source_name: name of the termbase to be copied
+        :type source_name: str
+        :param shard_count: number of shards
+        :type shard_count: int
+        :returns: the newly created termbase
+        :rtype: ShardedTermbase
+        :raises ValueError: if the new termbase cannot be created or the
+        source termbase does not exist
+        """
+        _check_new_termbase(name, shard_count)
+        # brings the source termbase up to date (e.g. its sort keys)
+        source = Termbase(source_name, read_only=True)
+        source_file_name = source.get_termbase_file_name()
+        source.dispose()
+        os.makedirs(_get_shard_dir(name))
+        try:
+            shards = [Termbase.create_from_template(
+                _get_shard_name(name, index), source_name)
+                for index in range(shard_count)]
+            with ThreadPoolExecutor(shard_count) as executor:
+                futures = [executor.submit(_copy_shard, source_file_name,
+                                           shard, index, shard_count)
+                           for (index, shard) in enumerate(shards)]
+                for future in futures:
+                    future.result()
+            for shard in shards:
+                shard.dispose()
+        except (sqlite3.Error, ValueError):
+            shutil.rmtree(_get_shard_dir(name), ignore_errors=True)
+            raise
+        return cls(name)
+
+    def __init__(self, name, read_only=False):
+        """Opens an existing sharded termbase.
+
+        :param name: name of the termbase
+        :type name: str
+        :param read_only: whether the shards are opened read-only
+        :type read_only: bool
+        :rtype: ShardedTermbase
+        :raises ValueError: if the termbase does not exist or some of its
+        shards are missing
+        """
+        self.name = name
+        self.read_only = read_only
+        shard_dir = _get_shard_dir(name)
+        if not os.path.isdir(shard_dir):
+            raise ValueError('termbase {0} does not exist'.format(name))
+        file_names = sorted(f for f in os.listdir(shard_dir)
+                            if f.endswith('.sqlite'))
+        expected = ['{0}.sqlite'.format(_SHARD_NAME.format(i))
+                    for i in range(len(file_names))]
+        # entries would be looked for in the wrong shard
+        if not file_names or file_names != expected:
+            raise ValueError('shards of termbase {0} are missing'.format(
+                name))
+        self._shards = [Termbase(_get_shard_name(name, index), read_only)
+                        for index in range(len(file_names))]
+        self._executor = ThreadPoolExecutor(len(self._shards))
+
+    @property
+    def shards(self):
+        """Returns the shards of the termbase, sorted by index.
+
+        :rtype: list
+        """
+        return list(self._shards)
+
+    @property
+    def shard_count(self):
+        """Returns the number of shards of the termbase.
+
+        :rtype: int
+        """
+        return len(self._shards)
+
+    def get_shard(self, entry_id):
+        """Returns the shard where the entry with the given ID is stored.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :rtype: Termbase
+        """
+        return self._shards[get_shard_index(entry_id, len(self._shards))]
+
+    def map_shards(self, function):
+        """Calls a function on all the shards in parallel.
+
+        :param function: callable taking a shard as its only argument
+        :type function: callable
+        :returns: the results of the calls, in the order of the shards
+        :rtype: list
+        """
+        return list(self._executor.map(function, self._shards))
+
+    def get_termbase_file_names(self):
+        """Returns the names of the files where the shards are stored.
+
+        :rtype: list
+        """
+        return [s.get_termbase_file_name() for s in self._shards]
+
+    def dispose(self):
+        """Closes all the connections to the shards and releases the threads
+        of the pool.
+
+        :rtype: None
+        """
+        for shard in self._shards:
+            shard.dispose()
+        self._executor.shutdown(wait=False)
+
+    @property
+    def schema(self):
+        """Returns the schema of the first shard, which is the same as the one
+        of the others. It must only be used to read properties, new
+        properties being added through ``add_property``.
+
+        :rtype: Schema
+        """
+        return Schema(self._shards[0])
+
+    def add_property(self, name, level, prop_type='T', values=()):
+        """Adds a new property to all the shards, with the same ID.
+
+        :param name: name of the property
+        :type name: str
+        :param level: level of the property (entry, language or term)
+        :type level: str
+        :param prop_type: type of the property (picklist, text or image)
+        :type prop_type: str
+        :param values: list of possible picklist values
+        :type values: tuple
+        :rtype: None
+        """
+        records = get_property_records(name, level, prop_type, values)
+        for shard in self._shards:
+            with shard.get_session() as session:
+                # merging leaves the records free to be added to other shards
+                for record in records:
+                    session.merge(record)
+
+    def add_language(self, locale):
+        """Adds the language with the given locale to all the shards.
+
+        :param locale: the locale of the language
+        :type locale: str
+        :rtype: None
+        """
+        for shard in self._shards:
+            shard.add_language(locale)
+
+    @property
+    def languages(self):
+        """Returns the locales of the termbase languages.
+
+        :rtype: list
+        """
+        return self._shards[0].languages
+
+    def create_entry(self):
+        """Creates a new entry in the shard its (new) ID belongs to.
+
+        :returns: the newly created entry
+        :rtype: Entry
+        """
+        entry_id = str(uuid.uuid4())
+        return self.get_shard(entry_id).create_entry(entry_id)
+
+    def get_entry(self, entry_id):
+        """Returns the entry with the given ID, bound to its shard.
+
+        :param entry_id: ID of the entry
+        :type entry_id: str
+        :rtype: Entry
+        """
+        return Entry(entry_id, self.get_shard(entry_id))
+
+    def delete_entry(self, entry):
+        """Deletes the given entry from its shard.
+
+        :param entry: reference to the Entry to be deleted
+        :type entry: Entry
+        :rtype: None
+        """
+        self.get_shard(entry.entry_id).delete_entry(entry)
+
+    @property
+    def entries(self):
+        """Returns all the entries of all the shards.
+
+        :rtype: list
+        """
+        return [e for entries in self.map_shards(lambda s: s.entries)
+                for e in entries]
+
+    @property
+    def entry_number(self):
+        """Returns the total number of entries of all the shards.
+
+        :rtype: int
+        """
+        return self.statistics.entry_number
+
+    @property
+    def statistics(self):
+        """Returns the statistics of the termbase, i.e. the sum of the
+        counters of the shards.
+
+        :returns: the combined statistics, or None if they could not be read
+        from some shard
+        :rtype: TermbaseStatistics
+        """
+        snapshots = self.map_shards(lambda s: s.statistics)
+        if any(s is None for s in snapshots):
+            return None
+        return statistics.combine(snapshots, self.languages)
+
+    def rebuild_statistics(self):
+        """Computes the statistics of all the shards from scratch.
+
+        :rtype: None
+        """
+        self.map_shards(lambda s: s.rebuild_statistics())
+
+    @property
+    def size(self):
+        """Returns the total size of the files of the shards.
+
+        :returns: a string representing the total size of the termbase
+        :rtype: str
+        """
+        return Termbase.format_size(sum(
+            os.path.getsize(f) for f in self.get_termbase_file_names()))
+
+    def lookup_many(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata in all the shards, see
+        ``Termbase.lookup_many``.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: a dictionary mapping each lemma to a dictionary keyed by
+        entry IDs, or None if the lookup failed in some shard
+        :rtype: dict
+        """
+        lemmas = list(set(lemmas))
+        target_locales = list(target_locales)
+        results = self.map_shards(
+            lambda s: s.lookup_many(locale, lemmas, target_locales))
+        if any(r is None for r in results):
+            return None
+        merged = {lemma: {} for lemma in lemmas}
+        for result in results:
+            for (lemma, entries) in result.items():
+                merged[lemma].update(entries)
+        return merged
+
+    def lookup_variants(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata in all the shards regardless of accents and
+        case, see ``Termbase.lookup_variants``.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: a dictionary mapping each lemma to a list of (lemma of the
+        term, entry ID, target terms) 3-tuples in collation order, or None if
+        the lookup failed in some shard
+        :rtype: dict
+        """
+        lemmas = list(set(lemmas))
+        target_locales = list(target_locales)
+        results = self.map_shards(
+            lambda s: s.lookup_variants(locale, lemmas, target_locales))
+        if any(r is None for r in results):
+            return None
+        return {lemma: list(heapq.merge(
+            *[r[lemma] for r in results],
+            key=lambda m: collation.get_sort_key(m[0], locale)))
+            for lemma in lemmas}
+
+    def get_sorted_vedettes(self, locale, prefix=None):
+        """Returns the vedettes of all the shards in collation order, see
+        ``Termbase.get_sorted_vedettes``.
+
+        :param locale: locale of the language of the vedettes
+        :type locale: str
+        :param prefix: beginning of the lemmata of the vedettes
+        :type prefix: str
+        :returns: a list of (entry ID, lemma, sort key) 3-tuples, or None if
+        the vedettes could not be read from some shard
+        :rtype: list
+        """
+        results = self.map_shards(
+            lambda s: s.get_sorted_vedettes(locale, prefix))
+        if any(r is None for r in results):
+            return None
+        return list(heapq.merge(*results, key=lambda v: v[2]))
+
+    def get_sorted_entries(self, locale):
+        """Returns all the entries sorted by their vedette in the given
+        language, the entries with no vedette in that language coming last.
+
+        :param locale: locale of the language of the vedettes
+        :type locale: str
+        :returns: a list of entries bound to their shards, or None if the
+        vedettes could not be read from some shard
+        :rtype: list
+        """
+        vedettes = self.get_sorted_vedettes(locale)
+        if vedettes is None:
+            return None
+        with_vedette = {v[0] for v in vedettes}
+        result = [self.get_entry(v[0]) for v in vedettes]
+        result.extend(e for e in self.entries
+                      if e.entry_id not in with_vedette)
+        return result
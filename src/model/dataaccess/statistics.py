@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.dataaccess.statistics
+
+This module contains the statistics of termbases, which are kept as named
+counters in the ``Statistics`` table of each termbase. Counters are updated by
+the data access layer in the same transaction as the changes they reflect, so
+that the number of entries, the number of terms and entries for each language
+and the number of values of each property can be read with a single query
+instead of scanning the whole termbase.
+
+Termbases created before the introduction of the statistics table have their
+counters computed from scratch the first time they are opened.
+"""
+
+import collections
+
+from sqlalchemy import func
+
+from src.model.dataaccess import orm
+
+_VERSION_KEY = 'version'
+"""Name of the counter storing the version of the statistics.
+"""
+
+STATISTICS_VERSION = 1
+"""Version of the statistics, to be increased whenever the counters change and
+have to be computed again for existing termbases.
+"""
+
+ENTRIES_KEY = 'entries'
+"""Name of the counter of the number of entries.
+"""
+
+
+def get_terms_key(locale):
+    """Returns the name of the counter of the terms in a language.
+
+    :param locale: locale of the language
+    :type locale: str
+    :rtype: str
+    """
+    return 'terms:{0}'.format(locale)
+
+
+def get_coverage_key(locale):
+    """Returns the name of the counter of the entries having at least a term
+    in a language.
+
+    :param locale: locale of the language
+    :type locale: str
+    :rtype: str
+    """
+    return 'covered:{0}'.format(locale)
+
+
+def get_property_key(prop_id):
+    """Returns the name of the counter of the values of a property.
+
+    :param prop_id: ID of the property
+    :type prop_id: str
+    :rtype: str
+    """
+    return 'property:{0}'.format(prop_id)
+
+
+def increment(session, name, amount=1):
+    """Increments (or decrements, if the amount is negative) a counter within
+    the transaction of the given session.
+
+    :param session: session used to change the termbase content
+    :type session: object
+    :param name: name of the counter
+    :type name: str
+    :param amount: increment of the counter
+    :type amount: int
+    :rtype: None
+    """
+    if not amount:
+        return
+    updated = session.query(orm.Statistic).filter(
+        orm.Statistic.name == name).update(
+        {orm.Statistic.value: orm.Statistic.value + amount},
+        synchronize_session=False)
+    if not updated:
+        session.add(orm.Statistic(name=name, value=amount))
+        session.flush()
+
+
+def _decrement_all(session, query):
+    """Decrements the counters of the properties returned by a query yielding
+    (property ID, number of values) pairs.
+    """
+    for (prop_id, count) in query:
+        increment(session, get_property_key(prop_id), -count)
+
+
+def record_entry_deletion(session, entry_id):
+    """Updates the counters before the deletion of an entry, along with all
+    its terms and property values.
+
+    :param session: session used to delete the entry
+    :type session: object
+    :param entry_id: ID of the entry which is being deleted
+    :type entry_id: str
+    :rtype: None
+    """
+    if not session.query(orm.Entry.entry_id).filter(
+            orm.Entry.entry_id == entry_id).count():
+        return
+    increment(session, ENTRIES_KEY, -1)
+    for (locale, count) in session.query(
+            orm.Term.lang_id, func.count(orm.Term.term_id)).filter(
+            orm.Term.entry_id == entry_id).group_by(orm.Term.lang_id):
+        increment(session, get_terms_key(locale), -count)
+        increment(session, get_coverage_key(locale), -1)
+    _decrement_all(session, session.query(
+        orm.EntryPropertyAssociation.prop_id, func.count()).filter(
+        orm.EntryPropertyAssociation.entry_id == entry_id).group_by(
+        orm.EntryPropertyAssociation.prop_id))
+    _decrement_all(session, session.query(
+        orm.EntryLanguagePropertyAssociation.prop_id, func.count()).join(
+        orm.EntryLanguageAssociation,
+        orm.EntryLanguageAssociation.ela_id ==
+        orm.EntryLanguagePropertyAssociation.ela_id).filter(
+        orm.EntryLanguageAssociation.entry_id == entry_id).group_by(
+        orm.EntryLanguagePropertyAssociation.prop_id))
+    _decrement_all(session, session.query(
+        orm.TermPropertyAssociation.prop_id, func.count()).join(
+        orm.Term, orm.Term.term_id == orm.TermPropertyAssociation.term_id
+    ).filter(orm.Term.entry_id == entry_id).group_by(
+        orm.TermPropertyAssociation.prop_id))
+
+
+def record_term_addition(session, entry_id, locale):
+    """Updates the counters before the addition of a term to an entry.
+
+    :param session: session used to add the term
+    :type session: object
+    :param entry_id: ID of the entry the term is added to
+    :type entry_id: str
+    :param locale: locale of the language of the term
+    :type locale: str
+    :rtype: None
+    """
+    if not session.query(orm.Term.term_id).filter(
+            orm.Term.entry_id == entry_id,
+            orm.Term.lang_id == locale).count():
+        increment(session, get_coverage_key(locale))
+    increment(session, get_terms_key(locale))
+
+
+def record_term_deletion(session, term_id):
+    """Updates the counters before the deletion of a term, along with its
+    property values.
+
+    :param session: session used to delete the term
+    :type session: object
+    :param term_id: ID of the term which is being deleted
+    :type term_id: str
+    :rtype: None
+    """
+    term = session.query(orm.Term.entry_id, orm.Term.lang_id).filter(
+        orm.Term.term_id == term_id).first()
+    if term is None:
+        return
+    (entry_id, locale) = term
+    increment(session, get_terms_key(locale), -1)
+    if session.query(orm.Term.term_id).filter(
+            orm.Term.entry_id == entry_id,
+            orm.Term.lang_id == locale).count() == 1:
+        increment(session, get_coverage_key(locale), -1)
+    _decrement_all(session, session.query(
+        orm.TermPropertyAssociation.prop_id, func.count()).filter(
+        orm.TermPropertyAssociation.term_id == term_id).group_by(
+        orm.TermPropertyAssociation.prop_id))
+
+
+def is_up_to_date(session):
+    """Returns whether the counters of a termbase have been computed by the
+    current version of the statistics.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :rtype: bool
+    """
+    return session.query(orm.Statistic.value).filter(
+        orm.Statistic.name == _VERSION_KEY).scalar() == STATISTICS_VERSION
+
+
+def rebuild(session):
+    """Computes all the counters from scratch, scanning the whole termbase.
+
+    :param session: session used to query and update the termbase
+    :type session: object
+    :rtype: None
+    """
+    counters = collections.Counter()
+    counters[_VERSION_KEY] = STATISTICS_VERSION
+    counters[ENTRIES_KEY] = session.query(
+        func.count(orm.Entry.entry_id)).scalar()
+    for (locale, terms, entries) in session.query(
+            orm.Term.lang_id, func.count(orm.Term.term_id),
+            func.count(orm.Term.entry_id.distinct())).group_by(
+            orm.Term.lang_id):
+        counters[get_terms_key(locale)] = terms
+        counters[get_coverage_key(locale)] = entries
+    for association in [orm.EntryPropertyAssociation,
+                        orm.EntryLanguagePropertyAssociation,
+                        orm.TermPropertyAssociation]:
+        for (prop_id, count) in session.query(
+                association.prop_id, func.count()).group_by(
+                association.prop_id):
+            counters[get_property_key(prop_id)] += count
+    session.query(orm.Statistic).delete()
+    session.add_all([orm.Statistic(name=name, value=value)
+                     for (name, value) in counters.items()])
+
+
+class TermbaseStatistics(object):
+    """Snapshot of the counters of a termbase.
+    """
+
+    def __init__(self, counters, languages):
+        """Constructor method.
+
+        :param counters: dictionary mapping counter names to their values
+        :type counters: dict
+        :param languages: locales of the termbase languages
+        :type languages: list
+        :rtype: TermbaseStatistics
+        """
+        self._counters = counters
+        self.languages = languages
+
+    @property
+    def counters(self):
+        """Returns a copy of all the counters of the snapshot.
+
+        :returns: a dictionary mapping counter names to their values
+        :rtype: dict
+        """
+        return dict(self._counters)
+
+    @property
+    def entry_number(self):
+        """Returns the number of entries of the termbase.
+
+        :rtype: int
+        """
+        return self._counters.get(ENTRIES_KEY, 0)
+
+    @property
+    def term_number(self):
+        """Returns the number of terms of the termbase in all languages.
+
+        :rtype: int
+        """
+        return sum(self.get_term_number(l) for l in self.languages)
+
+    def get_term_number(self, locale):
+        """Returns the number of terms in a language.
+
+        :param locale: locale of the language
+        :type locale: str
+        :rtype: int
+        """
+        return self._counters.get(get_terms_key(locale), 0)
+
+    def get_covered_entries(self, locale):
+        """Returns the number of entries having at least a term in a language.
+
+        :param locale: locale of the language
+        :type locale: str
+        :rtype: int
+        """
+        return self._counters.get(get_coverage_key(locale), 0)
+
+    def get_missing_entries(self, locale):
+        """Returns the number of entries having no term in a language.
+
+        :param locale: locale of the language
+        :type locale: str
+        :rtype: int
+        """
+        return self.entry_number - self.get_covered_entries(locale)
+
+    def get_property_values(self, prop_id):
+        """Returns the number of values of a property.
+
+        :param prop_id: ID of the property
+        :type prop_id: str
+        :rtype: int
+        """
+        return self._counters.get(get_property_key(prop_id), 0)
+
+    def get_fill_rate(self, prop_id, level):
+        """Returns the ratio between the number of values of a property and
+        the number of items which could have a value for it (i.e. entries,
+        entry/language pairs or terms depending on the property level).
+
+        :param prop_id: ID of the property
+        :type prop_id: str
+        :param level: level of the property ('E', 'L' or 'T')
+        :type level: str
+        :returns: a number between 0 and 1
+        :rtype: float
+        """
+        if level == 'E':
+            total = self.entry_number
+        elif level == 'L':
+            total = self.entry_number * len(self.languages)
+        else:
+            total = self.term_number
+        if not total:
+            return 0.0
+        return min(1.0, float(self.get_property_values(prop_id)) / total)
+
+
+def get_statistics(session):
+    """Reads all the counters of a termbase, along with its languages.
+
+    :param session: session used to query the termbase
+    :type session: object
+    :rtype: TermbaseStatistics
+    """
+    counters = dict(session.query(orm.Statistic.name, orm.Statistic.value))
+    languages = [l[0] for l in session.query(orm.Language.locale)]
+    return TermbaseStatistics(counters, languages)
+
+
+def combine(snapshots, languages):
+    """Adds up the counters of several termbases (e.g. the shards of a
+    sharded termbase) which have the same languages and properties.
+
+    :param snapshots: statistics of the termbases
+    :type snapshots: iterable
+    :param languages: locales of the termbase languages
+    :type languages: list
+    :rtype: TermbaseStatistics
+    """
+    counters = collections.Counter()
+    for snapshot in snapshots:
+        counters.update(snapshot.counters)
+    counters.pop(_VERSION_KEY, None)
+    return TermbaseStatistics(dict(counters), languages)
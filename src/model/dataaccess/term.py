@@ -27,7 +27,7 @@ This module contains the classes used to represent terms inside a termbase.
 import sqlalchemy
 import sqlalchemy.orm
 
-from src.model.dataaccess import orm
+from src.model.dataaccess import orm, statistics, journal
 
 
 class Term(object):
@@ -81,12 +81,26 @@ class Term(object):
                     orm.TermPropertyAssociation.term_id == self.term_id,
                     orm.TermPropertyAssociation.prop_id == prop_id).one()
                 if value:
+                    if prop.value != value:
+                        journal.record(session, journal.UPDATE,
+                                       'term_property', term_id=self.term_id,
+                                       prop_id=prop_id, locale=self.locale)
                     prop.value = value
                 else:
                     session.delete(prop)
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id), -1)
+                    journal.record(session, journal.DELETE, 'term_property',
+                                   term_id=self.term_id, prop_id=prop_id,
+                                   locale=self.locale)
             except sqlalchemy.orm.exc.NoResultFound:
                 # the property had not been set previously
                 if value:
+                    statistics.increment(
+                        session, statistics.get_property_key(prop_id))
+                    journal.record(session, journal.INSERT, 'term_property',
+                                   term_id=self.term_id, prop_id=prop_id,
+                                   locale=self.locale)
                     prop = orm.TermPropertyAssociation(term_id=self.term_id,
                                                        prop_id=prop_id,
                                                        value=value)
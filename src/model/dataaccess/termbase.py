@@ -27,40 +27,271 @@ mapping modules to create those sessions used to retrieve, update and delete
 data on the underlying terminological database. An instance of the containing
 termbase is therefore used by all other classes in this package to access the
 data persistence level of the system.
+
+Termbases which are only used for reference can be opened read-only, in which
+case the database file is assumed not to change while it is open: SQLite then
+reads it through memory mapping without any locking, so that several processes
+share the same pages of the operating system cache, and the data cached by the
+termbase are read once and never invalidated.
 """
 
 from contextlib import contextmanager
+import hashlib
 import os
+import shutil
+import sqlite3
 import uuid
 import logging
 
 import sqlalchemy.orm
+import sqlalchemy.pool
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from src.model.dataaccess.entry import Entry
-from src.model.dataaccess import orm
-from src.model.dataaccess.schema import Schema
+from src.model.dataaccess import (orm, lookup, instrumentation, statistics,
+                                  journal, merge, collation)
+from src.model.dataaccess.schema import Schema, get_property_records
 
 
 # a logger for this module
 _LOG = logging.getLogger('src.model.dataaccess')
 
 
+_TEMPLATE_DIR = '.templates'
+"""Name of the folder (inside the termbase folder) where the templates of empty
+termbases are cached.
+"""
+
+_TEMPLATE_VERSION = 2
+"""Version of the way templates are created, to be increased whenever it
+changes without affecting the database schema.
+"""
+
+_DEFINITION_TABLES = [orm.Language, orm.Property, orm.PickListValue]
+"""Mapping classes of the tables containing the termbase definition.
+"""
+
+READ_ONLY_MMAP_SIZE = 1 << 30
+"""Maximum number of bytes of a read-only termbase which are accessed through
+memory mapping.
+"""
+
+
+def get_template_file_name():
+    """Returns the name of the template file of an empty termbase for the
+    current version of the database schema. The name depends on the DDL of
+    all tables and indexes so that templates are never used after the schema
+    has changed.
+
+    :returns: path of the template file
+    :rtype: str
+    """
+    metadata = orm.sql.Mappable.metadata
+    ddl = [str(CreateTable(table)) for table in metadata.sorted_tables]
+    ddl.extend(str(CreateIndex(index)) for table in metadata.sorted_tables
+               for index in sorted(table.indexes, key=lambda i: i.name))
+    ddl.append(str(statistics.STATISTICS_VERSION))
+    ddl.append(str(_TEMPLATE_VERSION))
+    digest = hashlib.sha1('\n'.join(ddl).encode('utf-8')).hexdigest()
+    return os.path.join(orm.DB_DIR, _TEMPLATE_DIR,
+                        'empty-{0}.sqlite'.format(digest[:16]))
+
+
+def _create_template(file_name):
+    """Writes the template of an empty termbase, i.e. a database with all the
+    tables and indexes and with the statistics and the collation version
+    initialized.
+
+    :param file_name: path of the template file
+    :type file_name: str
+    :rtype: None
+    """
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    temp_file_name = '{0}.{1}.tmp'.format(file_name, os.getpid())
+    engine = sqlalchemy.create_engine('sqlite:///{0}'.format(temp_file_name))
+    orm.write_to_disk(temp_file_name, engine)
+    session = sqlalchemy.orm.sessionmaker(engine)()
+    try:
+        statistics.rebuild(session)
+        collation.rebuild(session)
+        session.commit()
+    finally:
+        session.close()
+        engine.dispose()
+    os.replace(temp_file_name, file_name)
+
+
+def _copy_empty_termbase(file_name):
+    """Writes an empty termbase copying it from the template, which is created
+    first if needed.
+
+    :param file_name: path of the new termbase file
+    :type file_name: str
+    :rtype: None
+    """
+    template_file_name = get_template_file_name()
+    if not os.path.exists(template_file_name):
+        _create_template(template_file_name)
+    shutil.copyfile(template_file_name, file_name)
+
+
+def _copy_definition(source, file_name):
+    """Copies the languages, properties and picklist values of a termbase into
+    an empty termbase, attaching the latter to the connection of the former.
+
+    :param source: connection to the termbase whose definition is copied
+    :type source: sqlite3.Connection
+    :param file_name: path of the empty termbase
+    :type file_name: str
+    :rtype: None
+    """
+    source.execute('ATTACH DATABASE ? AS target', (file_name,))
+    try:
+        with source:
+            for mapping in _DEFINITION_TABLES:
+                table = mapping.__table__
+                columns = ', '.join(c.name for c in table.columns)
+                source.execute(
+                    'INSERT INTO target.{0} ({1}) SELECT {1} FROM main.{0}'
+                    .format(table.name, columns))
+    finally:
+        source.execute('DETACH DATABASE target')
+
+
+def _get_file_name(name):
+    """Returns the path of the file of the termbase with the given name.
+
+    :param name: name of the termbase
+    :type name: str
+    :rtype: str
+    """
+    return os.path.join(orm.DB_DIR, '{0}.sqlite'.format(name))
+
+
 class Termbase(object):
     """Representation of a terminological database.
     """
 
-    def __init__(self, name):
+    @classmethod
+    def create(cls, name, languages=(), properties=(), use_template=True):
+        """Creates a new termbase with the given languages and properties,
+        all the definitions being added in a single transaction.
+
+        The empty database is copied from a cached template (which is created
+        the first time it is needed) unless ``use_template`` is false, in which
+        case all the tables are created from scratch.
+
+        :param name: name of the termbase
+        :type name: str
+        :param languages: locales of the termbase languages
+        :type languages: iterable
+        :param properties: dictionaries with the ``name``, ``level``,
+        ``prop_type`` and ``values`` keys defining the termbase properties
+        :type properties: iterable
+        :param use_template: whether to copy the empty database from a
+        template
+        :type use_template: bool
+        :returns: the newly created termbase
+        :rtype: Termbase
+        :raises ValueError: if a termbase with the given name already exists
+        """
+        file_name = _get_file_name(name)
+        if os.path.exists(file_name):
+            raise ValueError('termbase {0} already exists'.format(name))
+        if use_template:
+            _copy_empty_termbase(file_name)
+        termbase = cls(name)
+        with termbase.get_session() as session:
+            session.add_all([orm.Language(locale=locale)
+                             for locale in languages])
+            for prop in properties:
+                session.add_all(get_property_records(**prop))
+        return termbase
+
+    @classmethod
+    def create_from_template(cls, name, template_name, with_data=False):
+        """Creates a new termbase with the same languages and properties as an
+        existing one, copying the definition tables with SQL statements rather
+        than through the ORM.
+
+        If ``with_data`` is true, the whole content of the existing termbase
+        (entries included) is copied by means of the SQLite backup API, which
+        produces a consistent copy even if the termbase is being modified.
+
+        :param name: name of the new termbase
+        :type name: str
+        :param template_name: name of the termbase used as a template
+        :type template_name: str
+        :param with_data: whether entries must be copied too
+        :type with_data: bool
+        :returns: the newly created termbase
+        :rtype: Termbase
+        :raises ValueError: if the new termbase already exists or the template
+        does not exist
+        """
+        file_name = _get_file_name(name)
+        template_file_name = _get_file_name(template_name)
+        if os.path.exists(file_name):
+            raise ValueError('termbase {0} already exists'.format(name))
+        if not os.path.exists(template_file_name):
+            raise ValueError('termbase {0} does not exist'.format(
+                template_name))
+        temp_file_name = '{0}.{1}.tmp'.format(file_name, os.getpid())
+        source = sqlite3.connect('file:{0}?mode=ro'.format(template_file_name),
+                                 uri=True)
+        try:
+            if with_data:
+                target = sqlite3.connect(temp_file_name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            else:
+                _copy_empty_termbase(temp_file_name)
+                _copy_definition(source, temp_file_name)
+        except sqlite3.Error:
+            if os.path.exists(temp_file_name):
+                os.remove(temp_file_name)
+            raise
+        finally:
+            source.close()
+        os.replace(temp_file_name, file_name)
+        return cls(name)
+
+    def __init__(self, name, read_only=False):
         """Creates a new termbase with the given name.
 
         :param name: name of the termbase
+        :param read_only: whether the termbase is opened read-only, which
+        requires it to exist and not to be changed by anybody while it is open
+        :type read_only: bool
         :rtype: Termbase
+        :raises ValueError: if the termbase is opened read-only and does not
+        exist or cannot be upgraded
         """
         self.name = name
-        session = sqlalchemy.orm.sessionmaker(self._get_engine())
+        self.read_only = read_only
+        # locales of the termbase, read when they are first needed
+        self._languages = None
+        # statistics of read-only termbases, which never change
+        self._statistics = None
+        if read_only and not os.path.exists(self.get_termbase_file_name()):
+            raise ValueError('termbase {0} does not exist'.format(name))
+        self._engine = self._get_engine()
+        instrumentation.install(self._engine)
+        session = sqlalchemy.orm.sessionmaker(self._engine)
         self._session = sqlalchemy.orm.scoped_session(session)
+        if read_only:
+            self._initialize_read_only()
+            return
         # writes the termbase on disk (if needed)
-        orm.write_to_disk(self.get_termbase_file_name(), self._get_engine())
+        orm.write_to_disk(self.get_termbase_file_name(), self._engine)
+        # tables introduced after the first release of the application
+        for table in [orm.Statistic.__table__, orm.Change.__table__]:
+            table.create(self._engine, checkfirst=True)
+        self._initialize_statistics()
+        self._initialize_sort_keys()
 
     def get_termbase_file_name(self):
         """Returns the name of the file where the database is stored.
@@ -68,9 +299,9 @@ class Termbase(object):
         :returns: name of the local file where the termbase is stored
         :rtype: str
         """
-        return os.path.join(orm.DB_DIR, '{0}.sqlite'.format(self.name))
+        return _get_file_name(self.name)
 
-    def _get_connection_string(self):
+    def get_connection_string(self):
         """Returns the connection string to be used to interact with the local
         database associated to this termbase.
 
@@ -86,7 +317,104 @@ class Termbase(object):
         :returns: an engine object to interact with the termbase
         :rtype: object
         """
-        return sqlalchemy.create_engine(self._get_connection_string())
+        if not self.read_only:
+            return sqlalchemy.create_engine(self.get_connection_string())
+        file_name = self.get_termbase_file_name()
+
+        def connect():
+            connection = sqlite3.connect(
+                'file:{0}?mode=ro&immutable=1'.format(file_name), uri=True,
+                check_same_thread=False)
+            connection.execute('PRAGMA mmap_size = {0}'.format(
+                READ_ONLY_MMAP_SIZE))
+            return connection
+        # each thread keeps its connection, and the pages it has read, until
+        # the termbase is disposed
+        return sqlalchemy.create_engine(
+            'sqlite://', creator=connect,
+            poolclass=sqlalchemy.pool.SingletonThreadPool)
+
+    def _initialize_statistics(self):
+        """Computes all the counters of the statistics if the termbase has
+        been created by a previous version of the application.
+
+        :rtype: None
+        """
+        with self.get_session() as session:
+            if not statistics.is_up_to_date(session):
+                _LOG.info('computing statistics of termbase %s', self.name)
+                statistics.rebuild(session)
+
+    def _initialize_sort_keys(self):
+        """Adds the sort key column (and its index) to the terms of termbases
+        created by a previous version of the application and computes the sort
+        keys if they are missing or out of date.
+
+        :rtype: None
+        """
+        inspector = sqlalchemy.inspect(self._engine)
+        table = orm.Term.__table__
+        columns = [c['name'] for c in inspector.get_columns(table.name)]
+        indexes = [i['name'] for i in inspector.get_indexes(table.name)]
+        with self.get_session() as session:
+            if 'sort_key' not in columns:
+                session.execute('ALTER TABLE {0} ADD COLUMN {1} {2}'.format(
+                    table.name, table.c.sort_key.name,
+                    table.c.sort_key.type))
+            for index in table.indexes:
+                if index.name not in indexes:
+                    session.execute(CreateIndex(index))
+            if not collation.is_up_to_date(session):
+                _LOG.info('computing sort keys of termbase %s', self.name)
+                collation.rebuild(session)
+
+    def _is_up_to_date(self):
+        """Returns whether the sort keys and the statistics of the termbase
+        have been computed by the current version of the application.
+
+        :rtype: bool
+        """
+        up_to_date = False
+        with self.get_session() as session:
+            up_to_date = (collation.is_up_to_date(session) and
+                          statistics.is_up_to_date(session))
+        return up_to_date
+
+    def _initialize_read_only(self):
+        """Upgrades a termbase which is being opened read-only if it has been
+        written by a previous version of the application, then reads the data
+        which are cached by the termbase in advance.
+
+        :rtype: None
+        :raises ValueError: if the termbase is out of date and cannot be
+        upgraded (e.g. because the file itself is read-only)
+        """
+        if not self._is_up_to_date():
+            _LOG.info('upgrading termbase %s before opening it read-only',
+                      self.name)
+            # pages read so far are stale after the upgrade
+            self.dispose()
+            try:
+                Termbase(self.name).dispose()
+            except SQLAlchemyError as exc:
+                _LOG.exception(exc)
+            # the upgrade fails silently when the file cannot be written
+            if not self._is_up_to_date():
+                self.dispose()
+                raise ValueError(
+                    'termbase {0} has been written by a previous version and '
+                    'cannot be upgraded'.format(self.name))
+        self._languages = self.languages
+        self._statistics = self.statistics
+
+    def dispose(self):
+        """Closes all the connections to the termbase file, new ones being
+        opened when the termbase is accessed again.
+
+        :rtype: None
+        """
+        self._session.remove()
+        self._engine.dispose()
 
     @contextmanager
     def get_session(self):
@@ -116,17 +444,21 @@ class Termbase(object):
         """
         return Schema(self)
 
-    def create_entry(self):
+    def create_entry(self, entry_id=None):
         """Creates a new entry of the termbase and returns an entry instance.
 
+        :param entry_id: ID of the new entry (a new one by default)
+        :type entry_id: str
         :returns: the newly created entry
         :rtype: Entry
         """
-        entry_id = str(uuid.uuid4())
+        entry_id = entry_id or str(uuid.uuid4())
         # adds a new entry into the termbase
         with self.get_session() as session:
             entry = orm.Entry(entry_id=entry_id)
             session.add(entry)
+            statistics.increment(session, statistics.ENTRIES_KEY)
+            journal.record(session, journal.INSERT, 'entry', entry_id)
         return Entry(entry_id, self)
 
     def delete_entry(self, entry):
@@ -137,6 +469,8 @@ class Termbase(object):
         :rtype: None
         """
         with self.get_session() as session:
+            statistics.record_entry_deletion(session, entry.entry_id)
+            journal.record(session, journal.DELETE, 'entry', entry.entry_id)
             # deletes the entry
             session.query(orm.Entry).filter(
                 orm.Entry.entry_id == entry.entry_id).delete()
@@ -179,16 +513,67 @@ class Termbase(object):
         with self.get_session() as session:
             language = orm.Language(locale=locale)
             session.add(language)
+        self.invalidate_languages()
 
     @property
     def languages(self):
         """Returns an iterable with the locales stored in the current termbase.
+        They are read once and then cached, since they are needed over and
+        over by the user interface but they change very seldom.
 
         :returns: a list of all the termbase locales
         :rtype: list
         """
+        if self._languages is None:
+            with self.get_session() as session:
+                self._languages = [l[0] for l in
+                                   session.query(orm.Language.locale)]
+        return list(self._languages or [])
+
+    def invalidate_languages(self):
+        """Discards the cached locales of the termbase, to be called whenever
+        its languages are changed.
+
+        :rtype: None
+        """
+        self._languages = None
+
+    def lookup_many(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata at once, resolving them to the entries they
+        appear in and to the terms of those entries in the target languages.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: a dictionary mapping each lemma to a dictionary keyed by
+        entry IDs, whose values map target locales to lists of lemmata
+        :rtype: dict
+        """
         with self.get_session() as session:
-            return [l[0] for l in session.query(orm.Language.locale)]
+            return lookup.lookup_many(session, locale, lemmas, target_locales)
+
+    def lookup_variants(self, locale, lemmas, target_locales=()):
+        """Looks up many lemmata at once regardless of accents and case,
+        resolving them to the terms they match and to the terms of the entries
+        of those terms in the target languages.
+
+        :param locale: locale of the language of the lemmata
+        :type locale: str
+        :param lemmas: lemmata to be looked up
+        :type lemmas: iterable
+        :param target_locales: locales whose terms must be retrieved
+        :type target_locales: iterable
+        :returns: a dictionary mapping each lemma to a list of (lemma of the
+        term, entry ID, target terms) 3-tuples, the target terms mapping
+        target locales to lists of lemmata
+        :rtype: dict
+        """
+        with self.get_session() as session:
+            return lookup.lookup_variants(session, locale, lemmas,
+                                          target_locales)
 
     @property
     def entry_number(self):
@@ -197,8 +582,96 @@ class Termbase(object):
         :returns: number of entries of the termbase
         :rtype: int
         """
+        return self.statistics.entry_number
+
+    @property
+    def statistics(self):
+        """Returns the statistics of the termbase, which are maintained while
+        the termbase is modified and therefore need no scan to be computed.
+
+        :returns: the current counters of the termbase
+        :rtype: TermbaseStatistics
+        """
+        if self._statistics:
+            return self._statistics
+        with self.get_session() as session:
+            return statistics.get_statistics(session)
+
+    def rebuild_statistics(self):
+        """Computes the statistics of the termbase from scratch, which is only
+        needed if the termbase file has been modified by other programs.
+
+        :rtype: None
+        """
+        with self.get_session() as session:
+            statistics.rebuild(session)
+
+    def merge(self, name, progress=None):
+        """Merges the content of another termbase into this termbase (see the
+        ``merge`` module for the details).
+
+        :param name: name of the termbase to be merged
+        :type name: str
+        :param progress: callable receiving the number of steps performed and
+        returning a true value if the operation must be aborted
+        :type progress: callable
+        :returns: the report of the merge
+        :rtype: MergeReport
+        """
+        try:
+            return merge.merge(self, _get_file_name(name), progress)
+        finally:
+            # languages of the other termbase have been added
+            self.invalidate_languages()
+
+    @property
+    def last_change(self):
+        """Returns the sequence number of the last change recorded in the
+        change journal of the termbase.
+
+        :returns: the last sequence number (0 if nothing has changed)
+        :rtype: int
+        """
+        with self.get_session() as session:
+            return journal.get_last_sequence(session)
+
+    def get_changes(self, since=0):
+        """Returns the changes recorded in the journal after the given
+        sequence number.
+
+        :param since: sequence number of the last change already known
+        :type since: int
+        :returns: a list of changes sorted by sequence number
+        :rtype: list
+        """
+        with self.get_session() as session:
+            return journal.get_changes(session, since)
+
+    def get_changed_entries(self, since=0):
+        """Returns the entries which have been modified after the change with
+        the given sequence number, along with the IDs of the deleted ones.
+
+        :param since: sequence number of the last change already known
+        :type since: int
+        :returns: a (list of entries, set of deleted entry IDs) 2-tuple, None
+        if the change journal cannot be read
+        :rtype: tuple
+        """
+        with self.get_session() as session:
+            changed, deleted = journal.get_changed_entries(session, since)
+            return ([Entry(entry_id, self) for entry_id in sorted(changed)],
+                    deleted)
+
+    def purge_changes(self, up_to):
+        """Deletes the changes up to the given sequence number from the
+        journal, once all downstream systems have seen them.
+
+        :param up_to: sequence number of the last change to be deleted
+        :type up_to: int
+        :rtype: None
+        """
         with self.get_session() as session:
-            return session.query(orm.Entry).count()
+            journal.purge(session, up_to)
 
     @property
     def size(self):
@@ -235,3 +708,45 @@ class Termbase(object):
         with self.get_session() as session:
             return [Entry(e.entry_id, self) for e in
                     session.query(orm.Entry)]
+
+    def get_sorted_vedettes(self, locale, prefix=None):
+        """Returns the vedettes in the given language in collation order,
+        which is read from the index on the sort keys of the terms. If a prefix
+        is given, only the vedettes starting with it (regardless of accents and
+        case) are returned.
+
+        :param locale: locale of the language of the vedettes
+        :type locale: str
+        :param prefix: beginning of the lemmata of the vedettes
+        :type prefix: str
+        :returns: a list of (entry ID, lemma, sort key) 3-tuples
+        :rtype: list
+        """
+        with self.get_session() as session:
+            query = session.query(
+                orm.Term.entry_id, orm.Term.lemma, orm.Term.sort_key).filter(
+                orm.Term.lang_id == locale, orm.Term.vedette)
+            if prefix:
+                query = query.filter(sqlalchemy.or_(*[
+                    sqlalchemy.and_(orm.Term.sort_key >= lowest,
+                                    orm.Term.sort_key < highest) for
+                    (lowest, highest) in
+                    collation.get_prefix_ranges(prefix, locale)]))
+            return query.order_by(orm.Term.sort_key).all()
+
+    def get_sorted_entries(self, locale):
+        """Returns all the entries sorted by their vedette in the given
+        language, the entries with no vedette in that language coming last.
+
+        :param locale: locale of the language of the vedettes
+        :type locale: str
+        :returns: a list of entries
+        :rtype: list
+        """
+        entry_ids = [v[0] for v in self.get_sorted_vedettes(locale)]
+        with self.get_session() as session:
+            vedettes = session.query(orm.Term.entry_id).filter(
+                orm.Term.lang_id == locale, orm.Term.vedette)
+            entry_ids.extend(e[0] for e in session.query(
+                orm.Entry.entry_id).filter(~orm.Entry.entry_id.in_(vedettes)))
+        return [Entry(entry_id, self) for entry_id in entry_ids]
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: src.model.export
+
+This module contains the functions used to export the content of a termbase to
+simple delimited formats such as CSV and TSV, independently of the export
+wizard that is used to collect the export options in the user interface.
+
+Exports can be limited to the entries changed after a given sequence number of
+the change journal of the termbase, so that downstream systems only need to
+ingest the differences since their last import. Delimited formats have no way
+to express deletions, which can be obtained from the journal itself.
+
+The shards of sharded termbases are exported in parallel, but since the
+journals of the shards are independent, their exports cannot be incremental.
+
+Large termbases can also be exported by a pool of processes: the entries to be
+exported are split into ranges of consecutive entries (in collation order),
+each range is written to a temporary chunk by a worker process reading the
+termbase file through its own read-only SQLite connection, and the chunks are
+finally concatenated in order into the output file.
+"""
+
+import concurrent.futures
+import csv
+import heapq
+import itertools
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+
+FIELD_NAMES = ['source', 'target', 'third']
+"""Names of the fields of delimited exports.
+"""
+
+EXPORT_RANGE_SIZE = 1000
+"""Number of entries exported by a worker process at a time.
+"""
+
+
+def _get_exported_entries(termbase, locales, since):
+    """Returns the entries to be exported in the collation order of the source
+    language, optionally limited to the ones changed after a given change.
+
+    :param termbase: termbase to be exported
+    :type termbase: Termbase
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param since: if not None, only the entries changed after the change with
+    this sequence number are returned
+    :type since: int
+    :rtype: list
+    :raises ValueError: if the change journal cannot be read
+    """
+    entries = termbase.get_sorted_entries(locales[0])
+    if since is not None:
+        changes = termbase.get_changed_entries(since)
+        if changes is None:
+            raise ValueError('the changes of termbase {0} cannot be '
+                             'read'.format(termbase.name))
+        changed = {e.entry_id for e in changes[0]}
+        entries = [e for e in entries if e.entry_id in changed]
+    return entries
+
+
+def get_delimited_values(termbase, locales, third_field, third_field_details,
+                         since=None):
+    """Extracts the list of values that will form part of the exported data
+    for simple delimited formats such as CSV and TSV.
+
+    :param termbase: termbase to be exported
+    :type termbase: Termbase
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param third_field: property exported as the third field
+    :type third_field: Property
+    :param third_field_details: one of 'entry', 'source' or 'target'
+    indicating where the value of the third field is taken from
+    :type third_field_details: str
+    :param since: if given, only the entries changed after the change with
+    this sequence number are exported
+    :type since: int
+    :returns: a list of dictionaries containing the 'source', 'target'
+    and 'third' keys that will correspond to export fields
+    :rtype: list
+    """
+    result = []
+    for entry in _get_exported_entries(termbase, locales, since):
+        result.extend(_get_entry_values(entry, locales, third_field,
+                                        third_field_details))
+    return result
+
+
+def get_sharded_delimited_values(termbase, locales, third_field,
+                                 third_field_details):
+    """Extracts the values to be exported from a sharded termbase, see
+    ``get_delimited_values``. The entries of each shard are read in parallel
+    and the values of the shards are then merged in the collation order of
+    the source language.
+
+    :param termbase: sharded termbase to be exported
+    :type termbase: ShardedTermbase
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param third_field: property exported as the third field
+    :type third_field: Property
+    :param third_field_details: one of 'entry', 'source' or 'target'
+    indicating where the value of the third field is taken from
+    :type third_field_details: str
+    :returns: a list of dictionaries containing the 'source', 'target'
+    and 'third' keys that will correspond to export fields
+    :rtype: list
+    """
+    def get_shard_values(shard):
+        keys = {v[0]: v[2] for v in shard.get_sorted_vedettes(locales[0])}
+        # entries with no vedette (hence no sort key) come last
+        return [((entry.entry_id not in keys, keys.get(entry.entry_id, '')),
+                 _get_entry_values(entry, locales, third_field,
+                                   third_field_details))
+                for entry in shard.get_sorted_entries(locales[0])]
+    return [values for (_, entry_values) in heapq.merge(
+        *termbase.map_shards(get_shard_values), key=lambda e: e[0])
+        for values in entry_values]
+
+
+def _get_entry_values(entry, locales, third_field, third_field_details):
+    """Returns the values to be exported for a single entry, i.e. one for each
+    pair of source and target terms.
+
+    :param entry: entry to be exported
+    :type entry: Entry
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param third_field: property exported as the third field
+    :type third_field: Property
+    :param third_field_details: one of 'entry', 'source' or 'target'
+    indicating where the value of the third field is taken from
+    :type third_field_details: str
+    :rtype: list
+    """
+    source_terms = entry.get_terms(locales[0])
+    target_terms = entry.get_terms(locales[1])
+    if third_field_details == 'entry':
+        third_value = entry.get_property(third_field.prop_id)
+        return [{'source': s.lemma, 'target': t.lemma, 'third': third_value}
+                for s in source_terms for t in target_terms]
+    elif third_field_details == 'source':
+        return [{'source': s.lemma, 'target': t.lemma,
+                 'third': s.get_property(third_field.prop_id)}
+                for s in source_terms for t in target_terms]
+    elif third_field_details == 'target':
+        return [{'source': s.lemma, 'target': t.lemma,
+                 'third': t.get_property(third_field.prop_id)}
+                for s in source_terms for t in target_terms]
+    return [{'source': s.lemma, 'target': t.lemma, 'third': ''}
+            for s in source_terms for t in target_terms]
+
+
+def write_delimited(output_path, values, delimiter=','):
+    """Writes the data in delimited format, basing on the dictionaries with the
+    'source', 'target' and 'third' keys returned by ``get_delimited_values``.
+
+    :param output_path: path of the output file
+    :type output_path: str
+    :param values: list of dictionaries to be written
+    :type values: list
+    :param delimiter: field delimiter, e.g. ',' for CSV or '\\t' for TSV
+    :type delimiter: str
+    :rtype: None
+    """
+    with open(output_path, 'w') as file_handle:
+        writer = csv.DictWriter(file_handle, FIELD_NAMES,
+                                delimiter=delimiter,
+                                quoting=csv.QUOTE_MINIMAL)
+        writer.writerows(values)
+
+
+def write_range(file_name, entry_ids, locales, prop_id, third_field_details,
+                output_path, delimiter=','):
+    """Writes the values of a range of entries in delimited format, reading
+    them with a read-only SQLite connection to the termbase file. This is the
+    unit of work of the process pool, hence it only takes picklable arguments.
+    The output is the same as the one of ``write_delimited`` for the values
+    of the same entries.
+
+    :param file_name: path of the termbase file
+    :type file_name: str
+    :param entry_ids: IDs of the entries, in the order they are written
+    :type entry_ids: list
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param prop_id: ID of the property exported as the third field, if any
+    :type prop_id: str
+    :param third_field_details: one of 'entry', 'source' or 'target'
+    indicating where the value of the third field is taken from
+    :type third_field_details: str
+    :param output_path: path of the output file
+    :type output_path: str
+    :param delimiter: field delimiter
+    :type delimiter: str
+    :returns: the number of rows written
+    :rtype: int
+    """
+    connection = sqlite3.connect('file:{0}?mode=ro'.format(file_name),
+                                 uri=True)
+    try:
+        connection.execute('CREATE TEMP TABLE export_range '
+                           '(pos INTEGER PRIMARY KEY, entry_id TEXT)')
+        connection.executemany('INSERT INTO export_range (entry_id) '
+                               'VALUES (?)', ((e,) for e in entry_ids))
+        # terms of an entry are listed in the order of Entry.get_terms, which
+        # does not depend on the indexes of the termbase
+        terms = connection.execute(
+            'SELECT r.pos, t.term_id, t.lemma, t.lang_id '
+            'FROM export_range r JOIN Terms t ON t.entry_id = r.entry_id '
+            'WHERE t.lang_id IN (?, ?) '
+            'ORDER BY r.pos, t.lang_id, t.lemma, t.term_id',
+            locales[:2]).fetchall()
+        third_values = {}
+        if third_field_details == 'entry':
+            third_values = dict(connection.execute(
+                'SELECT r.pos, v.value FROM export_range r '
+                'JOIN EntryPropertyAssoc v ON v.entry_id = r.entry_id '
+                'WHERE v.prop_id = ?', (prop_id,)))
+        elif third_field_details in ['source', 'target']:
+            locale = locales[0 if third_field_details == 'source' else 1]
+            third_values = dict(connection.execute(
+                'SELECT t.term_id, v.value FROM export_range r '
+                'JOIN Terms t ON t.entry_id = r.entry_id '
+                'JOIN TermPropertyAssoc v ON v.term_id = t.term_id '
+                'WHERE t.lang_id = ? AND v.prop_id = ?', (locale, prop_id)))
+    finally:
+        connection.close()
+    values = []
+    for (pos, entry_terms) in itertools.groupby(terms, lambda t: t[0]):
+        entry_terms = list(entry_terms)
+        source_terms = [t for t in entry_terms if t[3] == locales[0]]
+        target_terms = [t for t in entry_terms if t[3] == locales[1]]
+        for s in source_terms:
+            for t in target_terms:
+                if third_field_details == 'entry':
+                    third_value = third_values.get(pos)
+                elif third_field_details == 'source':
+                    third_value = third_values.get(s[1])
+                elif third_field_details == 'target':
+                    third_value = third_values.get(t[1])
+                else:
+                    third_value = ''
+                values.append({'source': s[2], 'target': t[2],
+                               'third': third_value})
+    write_delimited(output_path, values, delimiter)
+    return len(values)
+
+
+def write_delimited_parallel(termbase, output_path, locales, third_field,
+                             third_field_details, delimiter=',', since=None,
+                             workers=None, progress=None):
+    """Exports a termbase in delimited format with a pool of processes, each
+    of them writing a range of entries to a temporary chunk. The chunks are
+    concatenated into the output file only after all of them have been
+    written, hence the output file is left untouched if the export fails or
+    is aborted.
+
+    :param termbase: termbase to be exported
+    :type termbase: Termbase
+    :param output_path: path of the output file
+    :type output_path: str
+    :param locales: source and target locales (in this order)
+    :type locales: list
+    :param third_field: property exported as the third field
+    :type third_field: Property
+    :param third_field_details: one of 'entry', 'source' or 'target'
+    indicating where the value of the third field is taken from
+    :type third_field_details: str
+    :param delimiter: field delimiter, e.g. ',' for CSV or '\\t' for TSV
+    :type delimiter: str
+    :param since: if given, only the entries changed after the change with
+    this sequence number are exported
+    :type since: int
+    :param workers: maximum number of processes (by default, the number of
+    processors); if 1, ranges are written in the current process
+    :type workers: int
+    :param progress: callable receiving the number of ranges written so far
+    and the total number of ranges, and returning a true value if the
+    operation must be aborted
+    :type progress: callable
+    :returns: the number of rows written
+    :rtype: int
+    :raises RuntimeError: if the operation is aborted
+    """
+    file_name = termbase.get_termbase_file_name()
+    entry_ids = [e.entry_id for e in
+                 _get_exported_entries(termbase, locales, since)]
+    ranges = [entry_ids[start:start + EXPORT_RANGE_SIZE] for start in
+              range(0, len(entry_ids), EXPORT_RANGE_SIZE)]
+    prop_id = third_field.prop_id if third_field else None
+    chunk_dir = tempfile.mkdtemp(prefix='metaterm-export-')
+    chunk_paths = [os.path.join(chunk_dir, '{0:06d}'.format(index))
+                   for index in range(len(ranges))]
+    arguments = [(file_name, ids, list(locales), prop_id,
+                  third_field_details, path, delimiter)
+                 for (ids, path) in zip(ranges, chunk_paths)]
+    rows = 0
+    try:
+        if workers == 1 or len(ranges) < 2:
+            for (index, args) in enumerate(arguments):
+                rows += write_range(*args)
+                if progress and progress(index + 1, len(ranges)):
+                    raise RuntimeError('export aborted')
+        else:
+            # forking a process with running (Qt) threads is not safe
+            with concurrent.futures.ProcessPoolExecutor(
+                    workers, mp_context=multiprocessing.get_context(
+                        'spawn')) as executor:
+                futures = [executor.submit(write_range, *args)
+                           for args in arguments]
+                for (done, future) in enumerate(
+                        concurrent.futures.as_completed(futures), 1):
+                    rows += future.result()
+                    if progress and progress(done, len(ranges)):
+                        for pending in futures:
+                            pending.cancel()
+                        raise RuntimeError('export aborted')
+        with open(output_path, 'wb') as output:
+            for path in chunk_paths:
+                with open(path, 'rb') as chunk:
+                    shutil.copyfileobj(chunk, output)
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+    return rows
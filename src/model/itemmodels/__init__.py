@@ -29,3 +29,4 @@ library view in order to reflect part of the information stored in the termbase.
 from src.model.itemmodels.termbasedefinition import (TermbaseDefinitionModel,
                                                      PropertyNode)
 from src.model.itemmodels.entry import EntryModel
+from src.model.itemmodels.catalog import TermbaseCatalogModel
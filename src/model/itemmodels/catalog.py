@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.itemmodels.catalog
+
+This module contains the ``QtCore.QAbstractItemModel`` subclass that is used
+to represent the termbases available on the system along with their metadata.
+The model is immediately filled with the content of the termbase catalog cache
+and then updated as soon as the catalog has been refreshed in a background
+thread, so that the user interface is never blocked by the file system.
+"""
+
+import datetime
+
+from PyQt4 import QtCore
+
+from src.model.dataaccess import Termbase, get_termbase_catalog
+
+
+class _CatalogRefresher(QtCore.QThread):
+    """Thread refreshing the termbase catalog in the background.
+    """
+
+    refreshed = QtCore.pyqtSignal(list)
+    """Signal emitted with the updated catalog entries."""
+
+    def run(self):
+        """Refreshes the catalog and notifies the result.
+
+        :rtype: None
+        """
+        self.refreshed.emit(get_termbase_catalog().refresh())
+
+
+class TermbaseCatalogModel(QtCore.QAbstractTableModel):
+    """Table model of the termbases available on the system, displaying for
+    each of them its name, languages, number of entries, size and the time of
+    its last modification.
+    """
+
+    _COLUMNS = 5
+    """Number of columns of the model.
+    """
+
+    def __init__(self, parent=None):
+        """Constructor method.
+
+        :param parent: parent object of the model
+        :type parent: QtCore.QObject
+        :rtype: TermbaseCatalogModel
+        """
+        super(TermbaseCatalogModel, self).__init__(parent)
+        self._entries = get_termbase_catalog().entries
+        self._refresher = None
+
+    def refresh(self):
+        """Starts refreshing the catalog in the background, the model is
+        reset when the refresh is complete.
+
+        :rtype: None
+        """
+        if self._refresher is None:
+            self._refresher = _CatalogRefresher(self)
+            self._refresher.refreshed.connect(self._handle_refreshed)
+        if not self._refresher.isRunning():
+            self._refresher.start()
+
+    def detach(self):
+        """Stops listening to the background refresh (if any), which is let
+        finish on its own without blocking the caller. The thread is handed
+        over to the application, so that it outlives the model, and deleted
+        when it is finished.
+
+        :rtype: None
+        """
+        if self._refresher is None:
+            return
+        self._refresher.refreshed.disconnect(self._handle_refreshed)
+        if self._refresher.isRunning():
+            self._refresher.setParent(QtCore.QCoreApplication.instance())
+            self._refresher.finished.connect(self._refresher.deleteLater)
+        self._refresher = None
+
+    @QtCore.pyqtSlot(list)
+    def _handle_refreshed(self, entries):
+        """Replaces the displayed entries with the refreshed ones.
+
+        :param entries: the refreshed catalog entries
+        :type entries: list
+        :rtype: None
+        """
+        self.beginResetModel()
+        self._entries = entries
+        self.endResetModel()
+
+    def get_name(self, index):
+        """Returns the name of the termbase corresponding to the given index.
+
+        :param index: index that identifies the termbase within the model
+        :type index: QtCore.QModelIndex
+        :returns: the name of the termbase
+        :rtype: str
+        """
+        if index.isValid() and index.row() < len(self._entries):
+            return self._entries[index.row()].name
+
+    def get_index(self, name):
+        """Returns the index of the first column of the termbase with the
+        given name.
+
+        :param name: name of the termbase
+        :type name: str
+        :returns: the index, which is not valid if there is no such termbase
+        :rtype: QtCore.QModelIndex
+        """
+        for (row, entry) in enumerate(self._entries):
+            if entry.name == name:
+                return self.index(row, 0)
+        return QtCore.QModelIndex()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Allows views connected to this model to display the correct headers.
+
+        :param section: section of the column
+        :type section: int
+        :param orientation: orientation of the view
+        :type orientation: int
+        :param role: role the index is being accessed with
+        :type role: int
+        :return: the label of the header
+        :rtype: str
+        """
+        if orientation == QtCore.Qt.Horizontal and \
+                role == QtCore.Qt.DisplayRole:
+            return [self.tr('Name'), self.tr('Languages'), self.tr('Entries'),
+                    self.tr('Size'), self.tr('Modified')][section]
+
+    def rowCount(self, parent=QtCore.QModelIndex(), *args, **kwargs):
+        """Returns the number of termbases in the model.
+
+        :param parent: index whose child number must be determined
+        :returns: the number of rows of the model
+        :rtype: int
+        """
+        if parent.isValid():
+            return 0
+        return len(self._entries)
+
+    def columnCount(self, parent=QtCore.QModelIndex(), *args, **kwargs):
+        """Returns the number of columns of the model.
+
+        :param parent: index whose column number must be determined
+        :returns: the number of columns of the model
+        :rtype: int
+        """
+        return self._COLUMNS
+
+    def data(self, index=QtCore.QModelIndex(), role=QtCore.Qt.DisplayRole):
+        """Allows view to access the data that are stored inside the model.
+
+        :param index: reference to the model index being accessed
+        :type index: QtCore.QModelIndex
+        :param role: role the view is trying to access with
+        :type role: int
+        :returns: a graphical representation of the model data
+        :rtype: object
+        """
+        if not index.isValid() or index.row() >= len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return entry.name
+            elif column == 1:
+                return ', '.join(entry.languages)
+            elif column == 2:
+                return str(entry.entry_number)
+            elif column == 3:
+                return Termbase.format_size(entry.size)
+            elif column == 4:
+                return datetime.datetime.fromtimestamp(
+                    entry.mtime / 1e9).strftime('%Y-%m-%d %H:%M')
+        elif role == QtCore.Qt.TextAlignmentRole and index.column() in (2, 3):
+            return QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter
@@ -27,10 +27,16 @@ This model is the basis on top of which the entry list in the user interface is
 built and allows to access to entries via model indexes as well as extracting
 the lemma of the vedette term for each entry depending on the main language
 that has been selected for display.
+
+Vedettes are read all at once, in collation order, when the main language is
+selected and they are sorted by the sort keys stored in the termbase rather
+than by comparing their lemmata.
 """
 
 from PyQt4 import QtCore
 
+from src.model.dataaccess import get_sort_key, MAX_SORT_KEY
+
 
 class EntryModel(QtCore.QAbstractListModel):
     """High level representation of the list of the entries that belong to the
@@ -38,6 +44,11 @@ class EntryModel(QtCore.QAbstractListModel):
     are connected to it.
     """
 
+    SORT_KEY_ROLE = QtCore.Qt.UserRole + 1
+    """Role used to access the sort key of the vedette of an entry, which the
+    entries must be sorted by.
+    """
+
     def __init__(self, termbase):
         """Constructor method.
 
@@ -46,8 +57,11 @@ class EntryModel(QtCore.QAbstractListModel):
         :rtype: EntryModel
         """
         super(EntryModel, self).__init__()
+        self._termbase = termbase
         self._entries = termbase.entries
         self._language = None
+        # (lemma, sort key) of the vedettes in the main language by entry ID
+        self._vedettes = {}
 
     @property
     def language(self):
@@ -71,6 +85,17 @@ class EntryModel(QtCore.QAbstractListModel):
         :rtype: None
         """
         self._language = value
+        self._vedettes = {}
+        if value:
+            # entries are stored in the order of their vedettes, so that
+            # sorting them is cheap, the ones with no vedette coming last
+            positions = {}
+            vedettes = self._termbase.get_sorted_vedettes(value)
+            for (entry_id, lemma, sort_key) in vedettes:
+                positions[entry_id] = len(positions)
+                self._vedettes[entry_id] = (lemma, sort_key)
+            self._entries.sort(
+                key=lambda e: positions.get(e.entry_id, len(positions)))
         self.modelReset.emit()
 
     def rowCount(self, parent=QtCore.QModelIndex(), *args, **kwargs):
@@ -97,9 +122,14 @@ class EntryModel(QtCore.QAbstractListModel):
         """
         if index.isValid():
             entry = self.get_entry(index)
-            if entry and role == QtCore.Qt.DisplayRole:
-                # FIXME: first check should not be needed
-                return entry.get_vedette(self.language)
+            if not entry:
+                # FIXME: this check should not be needed
+                return None
+            if role == QtCore.Qt.DisplayRole:
+                return self._vedettes.get(entry.entry_id, (None, None))[0]
+            if role == self.SORT_KEY_ROLE:
+                return self._vedettes.get(
+                    entry.entry_id, (None, MAX_SORT_KEY))[1]
 
     def get_entry(self, index):
         """Returns the (data access) Entry object that corresponds to the given
@@ -124,6 +154,7 @@ class EntryModel(QtCore.QAbstractListModel):
         self.beginInsertRows(QtCore.QModelIndex(), self.rowCount(),
                              self.rowCount())
         self._entries.append(entry)
+        self._update_vedette(entry)
         self.endInsertRows()
 
     def delete_entry(self, entry):
@@ -138,6 +169,7 @@ class EntryModel(QtCore.QAbstractListModel):
         self.beginRemoveRows(self.createIndex(position, 0, entry), position,
                              position)
         self._entries.remove(entry)
+        self._vedettes.pop(entry.entry_id, None)
         self.endRemoveRows()
 
     def update_entry(self, entry):
@@ -150,5 +182,20 @@ class EntryModel(QtCore.QAbstractListModel):
         :type entry: Entry
         :rtype: None
         """
+        self._update_vedette(entry)
         entry_index = self.createIndex(self._entries.index(entry), 0, entry)
         self.dataChanged.emit(entry_index, entry_index)
+
+    def _update_vedette(self, entry):
+        """Reads again the vedette of an entry in the main language.
+
+        :param entry: entry that has been added or changed
+        :type entry: Entry
+        :rtype: None
+        """
+        lemma = entry.get_vedette(self.language)
+        if lemma is None:
+            self._vedettes.pop(entry.entry_id, None)
+        else:
+            self._vedettes[entry.entry_id] = (
+                lemma, get_sort_key(lemma, self.language))
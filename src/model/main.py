@@ -24,10 +24,15 @@
 This module contains the implementation of the main model, which is a Singleton
 class used to store information about the shared state of the  application model
 such as the currently opened (main) termbase.
+
+Besides the main termbase, other termbases can be opened (read-only) for
+reference, so that lemmata are looked up in all of them at once.
 """
 
 from PyQt4 import QtCore
 
+from src.model.dataaccess import FederatedLookup
+
 _MAIN_MODEL = None
 """Reference to the single instance of the main model of the application.
 """
@@ -66,6 +71,10 @@ class MainModel(QtCore.QObject):
     """Signal emitted whenever the open termbase gets closed.
     """
 
+    reference_termbases_changed = QtCore.pyqtSignal()
+    """Signal emitted when reference termbases are opened or closed.
+    """
+
     def __init__(self):
         """Constructor method. This should *never* be called from outside this
         module, use the ``get_main_model()`` top-level function to obtain a
@@ -75,6 +84,10 @@ class MainModel(QtCore.QObject):
         """
         super(MainModel, self).__init__()
         self._open_termbase = None
+        # termbases opened for reference, sorted by decreasing priority
+        self._reference_termbases = []
+        # lookup in all the open termbases, created when first needed
+        self._federated_lookup = None
 
     @property
     def open_termbase(self):
@@ -97,7 +110,63 @@ class MainModel(QtCore.QObject):
         :rtype: None
         """
         self._open_termbase = value
+        self._reset_federated_lookup()
         if value:
             self.termbase_opened.emit()
         else:
             self.termbase_closed.emit()
+
+    @property
+    def reference_termbases(self):
+        """Returns the termbases which have been opened for reference, sorted
+        by decreasing priority.
+
+        :rtype: list
+        """
+        return list(self._reference_termbases)
+
+    def add_reference_termbase(self, termbase):
+        """Adds a termbase to the reference termbases, with a lower priority
+        than the ones which have been added before.
+
+        :param termbase: termbase opened for reference
+        :type termbase: Termbase
+        :rtype: None
+        """
+        self._reference_termbases.append(termbase)
+        self._reset_federated_lookup()
+        self.reference_termbases_changed.emit()
+
+    def close_reference_termbases(self):
+        """Closes all the reference termbases.
+
+        :rtype: None
+        """
+        termbases, self._reference_termbases = self._reference_termbases, []
+        self._reset_federated_lookup()
+        for termbase in termbases:
+            termbase.dispose()
+        self.reference_termbases_changed.emit()
+
+    @property
+    def federated_lookup(self):
+        """Returns the lookup in the main termbase (which has the highest
+        priority) and in all the reference termbases.
+
+        :rtype: FederatedLookup
+        """
+        if not self._federated_lookup:
+            termbases = self._reference_termbases
+            if self._open_termbase:
+                termbases = [self._open_termbase] + termbases
+            self._federated_lookup = FederatedLookup(termbases)
+        return self._federated_lookup
+
+    def _reset_federated_lookup(self):
+        """Discards the federated lookup after the open termbases have changed.
+
+        :rtype: None
+        """
+        if self._federated_lookup:
+            self._federated_lookup.close()
+            self._federated_lookup = None
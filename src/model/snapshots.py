@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.model.snapshots
+
+This module contains the scheduler of termbase snapshots, which periodically
+takes a hot backup of the currently open termbase in a background thread and
+deletes the oldest snapshots beyond the retention limit, so that the user
+interface is never blocked while large termbases are being copied.
+"""
+
+import logging
+import sqlite3
+
+from PyQt4 import QtCore
+
+from src.model.dataaccess import backup
+from src.model.main import get_main_model
+
+# a logger for this module
+_LOG = logging.getLogger('src.model.snapshots')
+
+SNAPSHOT_INTERVAL = 30 * 60 * 1000
+"""Default interval (in milliseconds) between scheduled snapshots.
+"""
+
+SNAPSHOT_RETENTION = 10
+"""Default number of snapshots kept for each termbase.
+"""
+
+
+class SnapshotTask(QtCore.QThread):
+    """Thread taking a snapshot of a termbase and pruning the old ones.
+    """
+
+    progress = QtCore.pyqtSignal(int, int)
+    """Signal emitted with the number of pages copied and the total number of
+    pages of the termbase."""
+
+    def __init__(self, termbase, retention, parent):
+        """Constructor method.
+
+        :param termbase: termbase to be copied
+        :type termbase: Termbase
+        :param retention: number of snapshots to be kept
+        :type retention: int
+        :param parent: reference to the parent object
+        :type parent: QtCore.QObject
+        :rtype: SnapshotTask
+        """
+        super(SnapshotTask, self).__init__(parent)
+        self._termbase = termbase
+        self._retention = retention
+        # read before copying, since later changes may be missing from the
+        # snapshot
+        self.sequence = termbase.last_change
+        self.snapshot = None
+        self.error = None
+
+    def run(self):
+        """Takes the snapshot, storing it or the error message.
+
+        :rtype: None
+        """
+        try:
+            self.snapshot = backup.create_snapshot(self._termbase,
+                                                   self.progress.emit)
+            backup.prune_snapshots(self._termbase.name, self._retention)
+        except (sqlite3.Error, OSError) as exc:
+            _LOG.exception(exc)
+            self.error = str(exc)
+
+
+class SnapshotScheduler(QtCore.QObject):
+    """Object taking snapshots of the currently open termbase at regular
+    intervals, as well as on demand.
+    """
+
+    snapshot_finished = QtCore.pyqtSignal(object, str)
+    """Signal emitted when a snapshot has been taken, with the snapshot (None
+    in case of failure) and the error message (empty in case of success)."""
+
+    def __init__(self, parent=None, interval=SNAPSHOT_INTERVAL,
+                 retention=SNAPSHOT_RETENTION):
+        """Constructor method.
+
+        :param parent: reference to the parent object
+        :type parent: QtCore.QObject
+        :param interval: interval between snapshots in milliseconds
+        :type interval: int
+        :param retention: number of snapshots kept for each termbase
+        :type retention: int
+        :rtype: SnapshotScheduler
+        """
+        super(SnapshotScheduler, self).__init__(parent)
+        self.retention = retention
+        self._task = None
+        # last sequence number of the change journal of each termbase when
+        # its latest snapshot was taken
+        self._sequences = {}
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._handle_timeout)
+        main_model = get_main_model()
+        main_model.termbase_opened.connect(self._handle_termbase_opened)
+        main_model.termbase_closed.connect(self._timer.stop)
+
+    @QtCore.pyqtSlot()
+    def _handle_termbase_opened(self):
+        """Starts taking snapshots periodically, unless the termbase has been
+        opened read-only and therefore never changes.
+
+        :rtype: None
+        """
+        if not get_main_model().open_termbase.read_only:
+            self._timer.start()
+
+    @property
+    def running(self):
+        """Returns whether a snapshot is being taken.
+
+        :rtype: bool
+        """
+        return self._task is not None and self._task.isRunning()
+
+    @QtCore.pyqtSlot()
+    def _handle_timeout(self):
+        """Takes a scheduled snapshot, unless the termbase has not changed
+        since the previous one (which would push useful snapshots out of the
+        retention limit for nothing).
+
+        :rtype: None
+        """
+        termbase = get_main_model().open_termbase
+        if termbase and self._sequences.get(
+                termbase.name) == termbase.last_change:
+            _LOG.debug('termbase %s unchanged, snapshot skipped',
+                       termbase.name)
+            return
+        self.take_snapshot()
+
+    @QtCore.pyqtSlot()
+    def take_snapshot(self):
+        """Starts taking a snapshot of the currently open termbase in the
+        background, unless another snapshot is being taken.
+
+        :returns: the task taking the snapshot or None
+        :rtype: SnapshotTask
+        """
+        termbase = get_main_model().open_termbase
+        if not termbase or self.running:
+            return None
+        self._task = SnapshotTask(termbase, self.retention, self)
+        self._task.finished.connect(self._handle_task_finished)
+        self._task.start(QtCore.QThread.LowPriority)
+        return self._task
+
+    @QtCore.pyqtSlot()
+    def _handle_task_finished(self):
+        """Notifies the end of the snapshot.
+
+        :rtype: None
+        """
+        task, self._task = self._task, None
+        if task.snapshot is not None and task.sequence is not None:
+            self._sequences[task.snapshot.termbase_name] = task.sequence
+        self.snapshot_finished.emit(task.snapshot, task.error or '')
+        task.deleteLater()
+
+    def wait(self):
+        """Waits for the snapshot being taken (if any) to be complete.
+
+        :rtype: None
+        """
+        if self._task is not None:
+            self._task.wait()
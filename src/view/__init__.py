@@ -22,8 +22,31 @@
 .. currentmodule:: src.view
 
 This package contains the modules which the application GUI is made up of.
+Wizards are not needed to draw the main window, hence they are imported only
+the first time they are accessed.
 """
 
+import importlib
+
 from src.view.main import MainWindow
-from src.view.wizards import NewTermbaseWizard, ExportWizard
 from src.view import res
+
+_LAZY_NAMES = {'NewTermbaseWizard': 'src.view.wizards',
+               'ExportWizard': 'src.view.wizards'}
+"""Names exported by this package that are imported on first access.
+"""
+
+
+def __getattr__(name):
+    """Imports lazily exported names the first time they are accessed.
+
+    :param name: name of the attribute being accessed
+    :type name: str
+    :returns: the requested object
+    :rtype: object
+    """
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(name)
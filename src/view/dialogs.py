@@ -26,17 +26,26 @@ interact with the end user by collecting input data or simply displaying some
 pieces of information of interest.
 """
 
+import datetime
+import sqlite3
+
 from PyQt4 import QtCore, QtGui
 
 from src import model as mdl
-from src.view.enum import DefaultLanguages
+from src.view.enum import DefaultLanguages, get_language_names
+from src.view import res
 
 
 class SelectTermbaseDialog(QtGui.QDialog):
     """Simple dialog where one among the available termbase can be chosen. It
     must display a list of the possible termbase names depending on the content
     of the termbase directory in the local system, and allow the user to select
-    one among them to open it.
+    one among them to open it. The list is taken from the termbase catalog and
+    refreshed in the background while the dialog is shown.
+    """
+
+    _WIDTH = 600
+    """Default width of the dialog.
     """
 
     def __init__(self, parent):
@@ -48,14 +57,26 @@ class SelectTermbaseDialog(QtGui.QDialog):
         """
         super(SelectTermbaseDialog, self).__init__(parent)
         self.setWindowTitle(self.tr('Select termbase'))
+        self.resize(self._WIDTH, self.height())
         self.selected_termbase_name = None
         self.setLayout(QtGui.QVBoxLayout(self))
         # dialog content
         upper_label = QtGui.QLabel(
             self.tr('Please select a termbase from the list below:'), self)
         upper_label.setWordWrap(True)
-        self._view = QtGui.QListView(self)
-        self._view.setModel(QtGui.QStringListModel(mdl.get_termbase_names()))
+        self._model = mdl.TermbaseCatalogModel(self)
+        self._view = QtGui.QTreeView(self)
+        self._view.setRootIsDecorated(False)
+        self._view.setAlternatingRowColors(True)
+        self._view.setModel(self._model)
+        self._view.doubleClicked.connect(self._handle_ok_pressed)
+        self._model.modelReset.connect(self._resize_columns)
+        # the selection is lost when the refreshed catalog is displayed
+        self._selected_name = None
+        self._model.modelAboutToBeReset.connect(self._remember_selection)
+        self._model.modelReset.connect(self._restore_selection)
+        self._resize_columns()
+        self._model.refresh()
         # button box
         button_box = QtGui.QDialogButtonBox(self)
         ok_button = button_box.addButton(QtGui.QDialogButtonBox.Ok)
@@ -67,6 +88,39 @@ class SelectTermbaseDialog(QtGui.QDialog):
         self.layout().addWidget(self._view)
         self.layout().addWidget(button_box)
 
+    @QtCore.pyqtSlot()
+    def _resize_columns(self):
+        """Adapts the width of the columns to their content.
+
+        :rtype: None
+        """
+        for column in range(self._model.columnCount()):
+            self._view.resizeColumnToContents(column)
+
+    @QtCore.pyqtSlot()
+    def _remember_selection(self):
+        """Remembers the name of the selected termbase before the model is
+        reset.
+
+        :rtype: None
+        """
+        selected_indexes = self._view.selectedIndexes()
+        self._selected_name = (self._model.get_name(selected_indexes[0])
+                               if selected_indexes else None)
+
+    @QtCore.pyqtSlot()
+    def _restore_selection(self):
+        """Selects again the termbase which was selected before the model
+        was reset, if it is still available.
+
+        :rtype: None
+        """
+        if self._selected_name is None:
+            return
+        index = self._model.get_index(self._selected_name)
+        if index.isValid():
+            self._view.setCurrentIndex(index)
+
     @QtCore.pyqtSlot()
     def _handle_ok_pressed(self):
         """Defines the dialog behaviour when the user presses the 'Ok' button of
@@ -79,16 +133,224 @@ class SelectTermbaseDialog(QtGui.QDialog):
             self.reject()
         else:
             # extracts the name of the selected termbase
-            name = self._view.model().data(selected_indexes[0],
-                                           QtCore.Qt.DisplayRole)
-            self.selected_termbase_name = '.'.join(name.split('.')[:-1])
+            self.selected_termbase_name = self._model.get_name(
+                selected_indexes[0])
             super(SelectTermbaseDialog, self).accept()
 
+    def done(self, result):
+        """Detaches the catalog refresh before closing, so that the background
+        thread finishes on its own and the dialog never waits for a slow file
+        system.
+
+        :param result: result code of the dialog
+        :type result: int
+        :rtype: None
+        """
+        self._model.detach()
+        super(SelectTermbaseDialog, self).done(result)
+
+
+class RestoreSnapshotDialog(QtGui.QDialog):
+    """Dialog where one among the available termbase snapshots can be chosen,
+    along with the name of the new termbase it must be restored as.
+    """
+
+    _WIDTH = 600
+    """Default width of the dialog.
+    """
+
+    def __init__(self, parent):
+        """Constructor method.
+
+        :param parent: the dialog parent widget
+        :type parent: QtCore.QWidget
+        :rtype: RestoreSnapshotDialog
+        """
+        super(RestoreSnapshotDialog, self).__init__(parent)
+        self.setWindowTitle(self.tr('Restore snapshot'))
+        self.resize(self._WIDTH, self.height())
+        self.selected_snapshot = None
+        self.termbase_name = None
+        self.setLayout(QtGui.QVBoxLayout(self))
+        self._snapshots = mdl.backup.get_snapshots()
+        self._view = QtGui.QTreeWidget(self)
+        self._view.setRootIsDecorated(False)
+        self._view.setHeaderLabels([self.tr('Termbase'), self.tr('Taken on'),
+                                    self.tr('Size')])
+        for snapshot in self._snapshots:
+            item = QtGui.QTreeWidgetItem(self._view)
+            item.setText(0, snapshot.termbase_name)
+            item.setText(1, self._get_local_time(snapshot).strftime(
+                '%Y-%m-%d %H:%M:%S'))
+            item.setText(2, mdl.Termbase.format_size(snapshot.size))
+        for column in range(3):
+            self._view.resizeColumnToContents(column)
+        self._view.currentItemChanged.connect(self._handle_snapshot_changed)
+        self._name_input = QtGui.QLineEdit(self)
+        name_layout = QtGui.QFormLayout()
+        name_layout.addRow(self.tr('Restore as:'), self._name_input)
+        # button box
+        button_box = QtGui.QDialogButtonBox(
+            QtGui.QDialogButtonBox.Ok | QtGui.QDialogButtonBox.Cancel,
+            parent=self)
+        button_box.accepted.connect(self._handle_ok_pressed)
+        button_box.rejected.connect(self.reject)
+        # puts it all together
+        self.layout().addWidget(self._view)
+        self.layout().addLayout(name_layout)
+        self.layout().addWidget(button_box)
+
+    @staticmethod
+    def _get_local_time(snapshot):
+        """Returns the time when a snapshot was taken in the local time zone.
+
+        :param snapshot: the snapshot
+        :type snapshot: Snapshot
+        :rtype: datetime.datetime
+        """
+        return snapshot.timestamp.replace(
+            tzinfo=datetime.timezone.utc).astimezone()
+
+    @QtCore.pyqtSlot()
+    def _handle_snapshot_changed(self):
+        """Suggests a name for the restored termbase when a snapshot is
+        selected.
+
+        :rtype: None
+        """
+        row = self._view.indexOfTopLevelItem(self._view.currentItem())
+        if row >= 0:
+            snapshot = self._snapshots[row]
+            self._name_input.setText('{0}-{1}'.format(
+                snapshot.termbase_name,
+                self._get_local_time(snapshot).strftime('%Y%m%d-%H%M%S')))
+
+    @QtCore.pyqtSlot()
+    def _handle_ok_pressed(self):
+        """Accepts the dialog if a snapshot has been selected and the name of
+        the new termbase is not already in use.
+
+        :rtype: None
+        """
+        row = self._view.indexOfTopLevelItem(self._view.currentItem())
+        name = self._name_input.text().strip()
+        if row < 0 or not name:
+            self.reject()
+        elif '{0}.sqlite'.format(name) in mdl.get_termbase_names():
+            QtGui.QMessageBox.warning(
+                self, self.tr('Name conflict'),
+                self.tr('A termbase with the same name already exists.'))
+        else:
+            self.selected_snapshot = self._snapshots[row]
+            self.termbase_name = name
+            self.accept()
+
+
+def run_task(parent, title, label, function):
+    """Runs an operation on the open termbase in a background thread,
+    showing a progress dialog from which it can be cancelled.
+
+    :param parent: reference to the parent widget
+    :type parent: QtGui.QWidget
+    :param title: title of the message box displayed in case of errors
+    :type title: str
+    :param label: description of the operation
+    :type label: str
+    :param function: function taking a termbase and a progress callable as
+    its arguments, the progress dialog showing the completed fraction of the
+    operation if the total number of steps is passed to the callable
+    :type function: callable
+    :returns: the result of the operation, None if it failed
+    :rtype: object
+    """
+    task = MaintenanceTask(mdl.get_main_model().open_termbase, function,
+                           parent)
+    progress = QtGui.QProgressDialog(label, parent.tr('Cancel'), 0, 0, parent)
+    progress.setWindowModality(QtCore.Qt.WindowModal)
+    progress.canceled.connect(task.cancel)
+
+    def show_progress(done, total):
+        progress.setMaximum(total)
+        progress.setValue(done)
+    task.progressed.connect(show_progress)
+    task.finished.connect(progress.reset)
+    task.start()
+    progress.exec()
+    task.wait()
+    if task.error:
+        QtGui.QMessageBox.warning(parent, title, task.error)
+        return None
+    return task.result
+
+
+class MaintenanceTask(QtCore.QThread):
+    """Thread running a (cancellable) maintenance operation on a termbase.
+    """
+
+    progressed = QtCore.pyqtSignal(int, int)
+    """Signal emitted with the number of steps performed so far and the total
+    number of steps, when the operation knows the latter.
+    """
+
+    def __init__(self, termbase, function, parent):
+        """Constructor method.
+
+        :param termbase: termbase to be maintained
+        :type termbase: Termbase
+        :param function: maintenance function taking a termbase and a progress
+        callable as its arguments
+        :type function: callable
+        :param parent: reference to the parent object
+        :type parent: QtCore.QObject
+        :rtype: MaintenanceTask
+        """
+        super(MaintenanceTask, self).__init__(parent)
+        self._termbase = termbase
+        self._function = function
+        self._cancelled = False
+        self.result = None
+        self.error = None
+
+    @QtCore.pyqtSlot()
+    def cancel(self):
+        """Requests the operation to be aborted as soon as possible.
+
+        :rtype: None
+        """
+        self._cancelled = True
+
+    def _report_progress(self, steps, total=0):
+        """Progress callable passed to the operation.
+
+        :param steps: number of steps performed so far
+        :type steps: int
+        :param total: total number of steps (0 if unknown)
+        :type total: int
+        :returns: whether the operation must be aborted
+        :rtype: bool
+        """
+        if total:
+            self.progressed.emit(steps, total)
+        return self._cancelled
+
+    def run(self):
+        """Runs the operation, storing its result or the error message.
+
+        :rtype: None
+        """
+        try:
+            self.result = self._function(self._termbase,
+                                         self._report_progress)
+        except (sqlite3.Error, RuntimeError, ValueError, OSError) as exc:
+            if not self._cancelled:
+                self.error = str(exc)
+
 
 class TermbasePropertyDialog(QtGui.QDialog):
     """Dialog window used to display read-only information about the currently
-    open termbase such as the languages involved, the number of entries it
-    contains and the space occupied on disk.
+    open termbase such as the languages involved and their coverage, the fill
+    rate of properties, the number of entries it contains and the space
+    occupied on disk. The termbase file can also be compacted and checked.
     """
 
     def __init__(self, parent):
@@ -101,27 +363,61 @@ class TermbasePropertyDialog(QtGui.QDialog):
         super(TermbasePropertyDialog, self).__init__(parent)
         self.setWindowTitle(self.tr('Termbase properties'))
         self.setLayout(QtGui.QVBoxLayout(self))
+        self._statistics = mdl.get_main_model().open_termbase.statistics
         self._populate_language_group()
+        self._populate_property_group()
         self._populate_stats_group()
+        self._populate_maintenance_group()
         self._create_buttons()
 
     def _populate_language_group(self):
         """Creates and fills the party of the dialog concerning the languages
-        that are involved in the termbase entries.
+        that are involved in the termbase entries, showing for each of them
+        the number of terms and the number of entries lacking a term.
 
         :rtype: None
         """
-        language_view = QtGui.QListWidget(self)
-        for locale in mdl.get_main_model().open_termbase.languages:
-            item = QtGui.QListWidgetItem()
-            item.setText(DefaultLanguages(self)[locale])
-            item.setIcon(QtGui.QIcon(':/flags/{0}.png'.format(locale)))
-            language_view.insertItem(language_view.count(), item)
+        stats = self._statistics
+        language_view = QtGui.QTreeWidget(self)
+        language_view.setRootIsDecorated(False)
+        language_view.setHeaderLabels([self.tr('Language'), self.tr('Terms'),
+                                       self.tr('Missing entries')])
+        for locale in stats.languages:
+            item = QtGui.QTreeWidgetItem(language_view)
+            item.setText(0, DefaultLanguages(self)[locale])
+            item.setIcon(0, QtGui.QIcon(res.flag_path(locale)))
+            item.setText(1, str(stats.get_term_number(locale)))
+            item.setText(2, str(stats.get_missing_entries(locale)))
+        language_view.resizeColumnToContents(0)
         language_group = QtGui.QGroupBox(self.tr('Languages'), self)
         language_group.setLayout(QtGui.QVBoxLayout(language_group))
         language_group.layout().addWidget(language_view)
         self.layout().addWidget(language_group)
 
+    def _populate_property_group(self):
+        """Creates and fills the part of the dialog showing the percentage of
+        entries, languages or terms having a value for each property.
+
+        :rtype: None
+        """
+        stats = self._statistics
+        schema = mdl.get_main_model().open_termbase.schema
+        property_view = QtGui.QTreeWidget(self)
+        property_view.setRootIsDecorated(False)
+        property_view.setHeaderLabels([self.tr('Property'),
+                                       self.tr('Filled')])
+        for level in ['E', 'L', 'T']:
+            for prop in schema.get_properties(level):
+                item = QtGui.QTreeWidgetItem(property_view)
+                item.setText(0, prop.name)
+                item.setText(1, '{0:.0%}'.format(
+                    stats.get_fill_rate(prop.prop_id, level)))
+        property_view.resizeColumnToContents(0)
+        property_group = QtGui.QGroupBox(self.tr('Properties'), self)
+        property_group.setLayout(QtGui.QVBoxLayout(property_group))
+        property_group.layout().addWidget(property_view)
+        self.layout().addWidget(property_group)
+
     def _populate_stats_group(self):
         """Creates and fills the statistics part of the dialog, displaying
         the number of entries of the termbase and its total size on disk
@@ -134,14 +430,80 @@ class TermbasePropertyDialog(QtGui.QDialog):
             QtGui.QLabel(self.tr('Number of entries:'), stats_group), 0, 0)
         tb = mdl.get_main_model().open_termbase
         stats_group.layout().addWidget(
-            QtGui.QLabel(str(tb.entry_number), stats_group), 0,
+            QtGui.QLabel(str(self._statistics.entry_number), stats_group), 0,
             1)
         stats_group.layout().addWidget(QtGui.QLabel(self.tr('Total size:'),
                                                     stats_group), 1, 0)
-        stats_group.layout().addWidget(
-            QtGui.QLabel(tb.size, stats_group), 1, 1)
+        self._size_label = QtGui.QLabel(tb.size, stats_group)
+        stats_group.layout().addWidget(self._size_label, 1, 1)
         self.layout().addWidget(stats_group)
 
+    def _populate_maintenance_group(self):
+        """Creates the part of the dialog used to compact the termbase file
+        and to check its integrity.
+
+        :rtype: None
+        """
+        maintenance_group = QtGui.QGroupBox(self.tr('Maintenance'), self)
+        maintenance_group.setLayout(QtGui.QHBoxLayout(maintenance_group))
+        compact_button = QtGui.QPushButton(self.tr('Compact'),
+                                           maintenance_group)
+        compact_button.clicked.connect(self._handle_compact)
+        check_button = QtGui.QPushButton(self.tr('Check integrity'),
+                                         maintenance_group)
+        check_button.clicked.connect(self._handle_check_integrity)
+        maintenance_group.layout().addWidget(compact_button)
+        maintenance_group.layout().addWidget(check_button)
+        self.layout().addWidget(maintenance_group)
+
+    def _run_task(self, label, function):
+        """Runs a maintenance operation in a background thread, showing a
+        progress dialog from which it can be cancelled.
+
+        :param label: description of the operation
+        :type label: str
+        :param function: maintenance function taking a termbase and a progress
+        callable as its arguments
+        :type function: callable
+        :returns: the result of the operation, None if it failed
+        :rtype: object
+        """
+        return run_task(self, self.tr('Maintenance'), label, function)
+
+    @QtCore.pyqtSlot()
+    def _handle_compact(self):
+        """Compacts the termbase, returning unused space to the file system.
+
+        :rtype: None
+        """
+        sizes = self._run_task(self.tr('Compacting termbase...'),
+                               mdl.maintenance.compact)
+        if sizes:
+            tb = mdl.get_main_model().open_termbase
+            self._size_label.setText(tb.size)
+            QtGui.QMessageBox.information(
+                self, self.tr('Maintenance'),
+                self.tr('The termbase size went from {0} to {1}.').format(
+                    tb.format_size(sizes[0]), tb.format_size(sizes[1])))
+
+    @QtCore.pyqtSlot()
+    def _handle_check_integrity(self):
+        """Checks the integrity of the termbase file.
+
+        :rtype: None
+        """
+        errors = self._run_task(
+            self.tr('Checking termbase integrity...'),
+            lambda tb, progress: mdl.maintenance.check_integrity(
+                tb, progress=progress))
+        if errors == []:
+            QtGui.QMessageBox.information(
+                self, self.tr('Maintenance'),
+                self.tr('No problem has been found.'))
+        elif errors:
+            QtGui.QMessageBox.warning(self, self.tr('Maintenance'),
+                                      '\n'.join(errors))
+
     def _create_buttons(self):
         """Creates the button box of the dialog.
 
@@ -151,3 +513,223 @@ class TermbasePropertyDialog(QtGui.QDialog):
         ok_button = button_box.addButton(QtGui.QDialogButtonBox.Ok)
         ok_button.clicked.connect(self.accept)
         self.layout().addWidget(button_box)
+
+
+class QueryStatisticsDialog(QtGui.QDialog):
+    """Debug dialog displaying how many SQL statements have been issued (and
+    how long they took) grouped by the data access method that issued them or
+    by the part of the application that called the data access layer, along
+    with the slowest statements that have been executed.
+    """
+
+    _WIDTH = 700
+    """Default width of the dialog.
+    """
+
+    _HEIGHT = 500
+    """Default height of the dialog.
+    """
+
+    def __init__(self, parent):
+        """Constructor method.
+
+        :param parent: reference to the parent widget
+        :type parent: QtGui.QWidget
+        :rtype: QueryStatisticsDialog
+        """
+        super(QueryStatisticsDialog, self).__init__(parent)
+        self.setWindowTitle(self.tr('Query statistics'))
+        self.setLayout(QtGui.QVBoxLayout(self))
+        # grouping selection
+        self._grouping_combo = QtGui.QComboBox(self)
+        self._grouping_combo.addItems([self.tr('Data access method'),
+                                       self.tr('Caller')])
+        self._grouping_combo.currentIndexChanged.connect(self.refresh)
+        grouping_layout = QtGui.QHBoxLayout()
+        grouping_layout.addWidget(QtGui.QLabel(self.tr('Group by:'), self))
+        grouping_layout.addWidget(self._grouping_combo)
+        grouping_layout.addStretch()
+        # statements are only recorded while collection is enabled
+        enabled_check = QtGui.QCheckBox(self.tr('Collect statistics'), self)
+        enabled_check.setChecked(mdl.get_query_statistics().enabled)
+        enabled_check.toggled.connect(self._handle_enabled_toggled)
+        grouping_layout.addWidget(enabled_check)
+        self._total_label = QtGui.QLabel(self)
+        # counters of the caches (e.g. hits and misses)
+        self._counters_label = QtGui.QLabel(self)
+        # statement counters and slowest statements
+        self._counter_table = QtGui.QTableWidget(0, 4, self)
+        self._counter_table.setHorizontalHeaderLabels(
+            [self.tr('Method'), self.tr('Statements'), self.tr('Total (ms)'),
+             self.tr('Mean (ms)')])
+        self._slowest_table = QtGui.QTableWidget(0, 3, self)
+        self._slowest_table.setHorizontalHeaderLabels(
+            [self.tr('Duration (ms)'), self.tr('Method'),
+             self.tr('Statement')])
+        for table in [self._counter_table, self._slowest_table]:
+            table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+            table.horizontalHeader().setStretchLastSection(True)
+        # button box
+        button_box = QtGui.QDialogButtonBox(self)
+        reset_button = button_box.addButton(self.tr('Reset'),
+                                            QtGui.QDialogButtonBox.ResetRole)
+        reset_button.clicked.connect(self._handle_reset_pressed)
+        refresh_button = button_box.addButton(self.tr('Refresh'),
+                                              QtGui.QDialogButtonBox.ApplyRole)
+        refresh_button.clicked.connect(self.refresh)
+        close_button = button_box.addButton(QtGui.QDialogButtonBox.Close)
+        close_button.clicked.connect(self.accept)
+        # puts it all together
+        self.layout().addLayout(grouping_layout)
+        self.layout().addWidget(self._total_label)
+        self.layout().addWidget(self._counters_label)
+        self.layout().addWidget(self._counter_table)
+        self.layout().addWidget(QtGui.QLabel(self.tr('Slowest statements:'),
+                                             self))
+        self.layout().addWidget(self._slowest_table)
+        self.layout().addWidget(button_box)
+        self.resize(self._WIDTH, self._HEIGHT)
+        self.refresh()
+
+    @QtCore.pyqtSlot()
+    def refresh(self):
+        """Fills the dialog with the statistics collected so far.
+
+        :rtype: None
+        """
+        statistics = mdl.get_query_statistics()
+        count, total = statistics.total
+        self._total_label.setText(
+            self.tr('{0} statements in {1:.1f} ms').format(count,
+                                                            total * 1000))
+        self._counters_label.setText(', '.join(
+            '{0}: {1}'.format(name, value) for (name, value) in
+            sorted(statistics.counters.items())))
+        if self._grouping_combo.currentIndex() == 0:
+            counters = statistics.by_origin
+        else:
+            counters = statistics.by_caller
+        self._counter_table.setRowCount(len(counters))
+        for (row, counter) in enumerate(counters):
+            for (column, text) in enumerate([
+                    counter.name, str(counter.count),
+                    '{0:.1f}'.format(counter.total_time * 1000),
+                    '{0:.2f}'.format(
+                        counter.total_time * 1000 / counter.count)]):
+                self._counter_table.setItem(row, column,
+                                            QtGui.QTableWidgetItem(text))
+        statements = statistics.slowest_statements
+        self._slowest_table.setRowCount(len(statements))
+        for (row, statement) in enumerate(statements):
+            for (column, text) in enumerate([
+                    '{0:.2f}'.format(statement.duration * 1000),
+                    statement.origin, ' '.join(statement.statement.split())]):
+                self._slowest_table.setItem(row, column,
+                                            QtGui.QTableWidgetItem(text))
+        self._counter_table.resizeColumnsToContents()
+        self._slowest_table.resizeColumnsToContents()
+
+    @QtCore.pyqtSlot(bool)
+    def _handle_enabled_toggled(self, enabled):
+        """Starts or stops the collection of the statistics.
+
+        :param enabled: whether statistics must be collected
+        :type enabled: bool
+        :rtype: None
+        """
+        mdl.get_query_statistics().enabled = enabled
+
+    @QtCore.pyqtSlot()
+    def _handle_reset_pressed(self):
+        """Discards the statistics collected so far.
+
+        :rtype: None
+        """
+        mdl.get_query_statistics().reset()
+        self.refresh()
+
+
+class LookupDialog(QtGui.QDialog):
+    """Dialog where lemmata are looked up at once in the open termbase and in
+    all the reference termbases, the matches being listed by decreasing
+    priority of the termbase they are found in.
+    """
+
+    _WIDTH = 700
+    """Default width of the dialog.
+    """
+
+    _HEIGHT = 400
+    """Default height of the dialog.
+    """
+
+    def __init__(self, parent):
+        """Constructor method.
+
+        :param parent: reference to the parent widget
+        :type parent: QtGui.QWidget
+        :rtype: LookupDialog
+        """
+        super(LookupDialog, self).__init__(parent)
+        self.setWindowTitle(self.tr('Look up'))
+        self.setLayout(QtGui.QVBoxLayout(self))
+        # lemma and languages
+        self._lemma_edit = QtGui.QLineEdit(self)
+        self._lemma_edit.returnPressed.connect(self.lookup)
+        self._source_combo = QtGui.QComboBox(self)
+        self._target_combo = QtGui.QComboBox(self)
+        names = [get_language_names().get_name(locale) for locale in
+                 mdl.get_main_model().federated_lookup.languages]
+        self._source_combo.addItems(names)
+        self._target_combo.addItems(names)
+        self._target_combo.setCurrentIndex(min(1, len(names) - 1))
+        lookup_layout = QtGui.QHBoxLayout()
+        lookup_layout.addWidget(self._lemma_edit)
+        lookup_layout.addWidget(self._source_combo)
+        lookup_layout.addWidget(QtGui.QLabel(self.tr('to'), self))
+        lookup_layout.addWidget(self._target_combo)
+        # matches
+        self._match_table = QtGui.QTableWidget(0, 3, self)
+        self._match_table.setHorizontalHeaderLabels(
+            [self.tr('Termbase'), self.tr('Term'), self.tr('Translations')])
+        self._match_table.setEditTriggers(
+            QtGui.QAbstractItemView.NoEditTriggers)
+        self._match_table.horizontalHeader().setStretchLastSection(True)
+        self._total_label = QtGui.QLabel(self)
+        # button box
+        button_box = QtGui.QDialogButtonBox(self)
+        close_button = button_box.addButton(QtGui.QDialogButtonBox.Close)
+        close_button.clicked.connect(self.accept)
+        # puts it all together
+        self.layout().addLayout(lookup_layout)
+        self.layout().addWidget(self._match_table)
+        self.layout().addWidget(self._total_label)
+        self.layout().addWidget(button_box)
+        self.resize(self._WIDTH, self._HEIGHT)
+
+    @QtCore.pyqtSlot()
+    def lookup(self):
+        """Looks up the lemma which has been typed in and lists its matches.
+
+        :rtype: None
+        """
+        lemma = self._lemma_edit.text().strip()
+        if not lemma:
+            return
+        source = get_language_names().get_locale(
+            self._source_combo.currentText())
+        target = get_language_names().get_locale(
+            self._target_combo.currentText())
+        matches = mdl.get_main_model().federated_lookup.lookup(
+            source, lemma, [target])
+        self._match_table.setRowCount(len(matches))
+        for (row, match) in enumerate(matches):
+            for (column, text) in enumerate([
+                    match.termbase, match.lemma,
+                    '; '.join(match.terms[target])]):
+                self._match_table.setItem(row, column,
+                                          QtGui.QTableWidgetItem(text))
+        self._match_table.resizeColumnsToContents()
+        self._total_label.setText(
+            self.tr('{0} matches in {1} termbases').format(
+                len(matches), len({m.termbase for m in matches})))
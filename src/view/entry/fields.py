@@ -184,6 +184,8 @@ class AbstractFormField(QtCore.QObject):
         self.level = level
         self.lemma = lemma
         self.widget = None
+        # value stored in the termbase when the form was loaded
+        self.loaded_value = None
 
     @property
     def value(self):
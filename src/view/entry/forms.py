@@ -32,6 +32,7 @@ from PyQt4 import QtCore, QtGui
 from src import model as mdl
 from src.view.entry import fields
 from src.view.enum import DefaultLanguages
+from src.view import res
 
 
 class AbstractEntryForm(QtGui.QWidget):
@@ -61,44 +62,50 @@ class AbstractEntryForm(QtGui.QWidget):
         # locale-keyed dictionary of term widgets (a list for every locale)
         self._term_widgets = {locale: [] for locale in
                               mdl.get_main_model().open_termbase.languages}
+        # (term ID, locale, vedette) 3-tuples of the terms the form was
+        # loaded with
+        self._loaded_terms = []
 
-    def get_entry_level_property_values(self):
-        """Allows the controller to access the information inserted in the
-        form by the user for entry-level properties.
+    def get_changes(self):
+        """Allows the controller to access the changes made by the user in the
+        form, comparing every field with the value it was loaded with so that
+        only the changed values are written to the termbase.
 
-        :returns: a dictionary keyed by property IDs containing the values
-        specified for entry-level properties
-        :rtype: dict
-        """
-        return {f.property.prop_id: f.value
-                for f in self._fields if f.level == 'E'}
-
-    def get_language_level_property_values(self):
-        """Allows the controller to access the information inserted in the form
-        by the user for language-level properties.
-
-        :returns: a dictionary whose keys are (locale, property-ID) 2-tuples,
-        containing the values specified for language-level properties
-        :rtype: dict
+        :returns: the changes to be applied to the entry
+        :rtype: EntryChanges
         """
-        return {(locale, f.property.prop_id): f.value
-                for locale in mdl.get_main_model().open_termbase.languages
-                for f in self._fields if f.level == 'L' and f.locale == locale}
-
-    def get_term_level_property_values(self):
-        """ Allows the controller to access the information specified by the
-        user for term-level properties.
-
-        :returns: a dictionary whose keys are (locale, lemma, property-ID)
-        3-tuples containing the values specified for term-level properties.
-        :rtype: dict
-        """
-        # dictcomp with triple nested for loops, because READABILITY COUNTS...
-        return {(locale, lemma, f.property.prop_id): f.value
-                for locale in mdl.get_main_model().open_termbase.languages
-                for lemma in self.get_terms()[locale]
-                for f in self._fields
-                if f.level == 'T' and f.locale == locale and f.lemma == lemma}
+        changes = mdl.EntryChanges()
+        for field in self._fields:
+            if field.level == 'E':
+                changes.set_property(field.property.prop_id,
+                                     field.loaded_value, field.value)
+            elif field.level == 'L':
+                changes.set_language_property(
+                    field.locale, field.property.prop_id, field.loaded_value,
+                    field.value)
+        kept_terms = set()
+        for (locale, term_widgets) in self._term_widgets.items():
+            for term_widget in term_widgets:
+                if not term_widget.lemma:
+                    continue
+                term_id = term_widget.term_id
+                if term_id is None:
+                    term_id = changes.add_term(locale, term_widget.lemma,
+                                               term_widget.vedette)
+                elif term_widget.lemma != term_widget.loaded_lemma:
+                    changes.rename_term(term_id, locale, term_widget.lemma)
+                kept_terms.add(term_id)
+                # fields of deleted terms are excluded along with their term
+                for field in term_widget.fields:
+                    changes.set_term_property(
+                        term_id, locale, field.property.prop_id,
+                        field.loaded_value, field.value)
+        for (term_id, locale, vedette) in self._loaded_terms:
+            if term_id not in kept_terms:
+                # assuring no vedette term is **ever** deleted
+                assert not vedette
+                changes.delete_term(term_id, locale)
+        return changes
 
     def get_terms(self):
         """Allows to access the terms that have been inserted in the form for
@@ -109,8 +116,8 @@ class AbstractEntryForm(QtGui.QWidget):
         the list of terms that the entry contains.
         :rtype: dict
         """
-        return {locale: [w.lemma for w in self._term_widgets[locale] if w.lemma]
-                for locale in mdl.get_main_model().open_termbase.languages}
+        return {locale: [w.lemma for w in term_widgets if w.lemma]
+                for (locale, term_widgets) in self._term_widgets.items()}
 
     def _fill_field(self, prop, field):
         """Fills a given form field with the information that is currently
@@ -155,8 +162,10 @@ class AbstractEntryForm(QtGui.QWidget):
         :type child_layout: QtGui.QFormLayout
         :param locale: locale of the language (if any) the property refers to
         :type locale: str
-        :rtype: None
+        :returns: the fields which have been created
+        :rtype: list
         """
+        created_fields = []
         for prop in mdl.get_main_model().open_termbase.schema.get_properties(
                 level):
             if prop.property_type == 'T':  # text property
@@ -166,6 +175,7 @@ class AbstractEntryForm(QtGui.QWidget):
             else:  # picklist
                 field = fields.PicklistField(prop, level, self, locale, lemma)
             self._fields.append(field)
+            created_fields.append(field)
             # signal-slot connection
             field.changed.connect(self._handle_entry_changed)
             # fills-in the widget
@@ -174,6 +184,7 @@ class AbstractEntryForm(QtGui.QWidget):
             label = QtGui.QLabel(prop.name, self)
             label.setWordWrap(True)
             child_layout.addRow(label, field.widget)
+        return created_fields
 
     @property
     def is_new(self):
@@ -250,11 +261,10 @@ class CreateEntryForm(AbstractEntryForm):
             # needed to keep consistency
             term_input.textChanged.connect(term_widget.update_lemma)
             term_widget.layout().addRow(term_label, term_input)
-            self._populate_fields('T', term_widget.layout(), locale)
+            term_widget.fields = self._populate_fields(
+                'T', term_widget.layout(), locale)
             # needed to keep fields bound to the term in the input field
-            for field in [f for f in self._fields if
-                          f.level == 'T' and f.locale == locale
-                          and f.lemma is None]:
+            for field in term_widget.fields:
                 term_input.textChanged.connect(field.update_lemma)
             language_widget.add_term_widget(term_widget)
             self.layout().addWidget(language_widget)
@@ -282,17 +292,21 @@ class UpdateEntryForm(AbstractEntryForm):
     the values stored in the termbase.
     """
 
-    def __init__(self, entry, parent):
+    def __init__(self, entry, parent, snapshot=None):
         """Constructor method.
 
         :param parent: reference to the parent widget
         :type parent: QtCore.QWidget
         :param entry: terminological Entry that is being edited
         :type entry: Entry
+        :param snapshot: up-to-date snapshot of the entry, which the fields
+        are filled from (it is read from the termbase if not given)
+        :type snapshot: EntrySnapshot
         :rtype: UpdateEntryForm
         """
         super(UpdateEntryForm, self).__init__(parent)
         self.entry = entry
+        self._snapshot = snapshot or entry.get_snapshot()
         entry_property_layout = QtGui.QFormLayout()
         self._populate_fields('E', entry_property_layout)
         self.layout().addLayout(entry_property_layout)
@@ -304,9 +318,12 @@ class UpdateEntryForm(AbstractEntryForm):
             self._populate_fields('L', language_property_layout, locale)
             language_widget.layout().addLayout(language_property_layout)
             # create term widgets and inserts term-level fields
-            for term in self.entry.get_terms(locale):
+            for term in self._snapshot.get_terms(locale):
                 term_widget = CustomMenuTermWidget(locale, term.lemma,
-                                                   term.vedette, self)
+                                                   term.vedette, self,
+                                                   term.term_id)
+                self._loaded_terms.append((term.term_id, locale,
+                                           term.vedette))
                 self._term_widgets[locale].append(term_widget)
                 term_label = QtGui.QLabel(self.tr('<strong>Term</strong>'),
                                           self)
@@ -318,12 +335,10 @@ class UpdateEntryForm(AbstractEntryForm):
                 # needed to keep consistency
                 term_input.textChanged.connect(term_widget.update_lemma)
                 term_widget.layout().addRow(term_label, term_input)
-                self._populate_fields('T', term_widget.layout(), locale,
-                                      term.lemma)
+                term_widget.fields = self._populate_fields(
+                    'T', term_widget.layout(), locale, term.lemma)
                 # needed to keep fields bound to the term in the input field
-                for field in [f for f in self._fields if
-                              f.level == 'T' and f.locale == locale
-                              and f.lemma == term.lemma]:
+                for field in term_widget.fields:
                     term_input.textChanged.connect(field.update_lemma)
                 language_widget.add_term_widget(term_widget)
             self.layout().addWidget(language_widget)
@@ -331,8 +346,9 @@ class UpdateEntryForm(AbstractEntryForm):
 
     def _fill_field(self, prop, field):
         """Fills the field of the form with the value that is stored in the
-        currently opened termbase, getting the value from the data access layer
-        and calling the setter on the field.
+        currently opened termbase, getting the value from the snapshot of the
+        entry and calling the setter on the field. The value is remembered in
+        order to determine later whether it has been changed.
 
         :param prop: property that is being accessed
         :type prop: Property
@@ -342,14 +358,15 @@ class UpdateEntryForm(AbstractEntryForm):
         """
         value = None
         if field.level == 'E':  # entry-level field
-            value = self.entry.get_property(prop.prop_id)
+            value = self._snapshot.get_property(prop.prop_id)
         elif field.level == 'L':  # language-level field
-            value = self.entry.get_language_property(field.locale,
-                                                     prop.prop_id)
+            value = self._snapshot.get_language_property(field.locale,
+                                                         prop.prop_id)
         else:  # term-level field
-            term = self.entry.get_term(field.locale, field.lemma)
+            term = self._snapshot.get_term(field.locale, field.lemma)
             if term:
                 value = term.get_property(prop.prop_id)
+        field.loaded_value = value
         if value:
             field.value = value
 
@@ -382,11 +399,10 @@ class UpdateEntryForm(AbstractEntryForm):
         term_widget.layout().addRow(term_label, term_input)
         # keeps the link between the term widget and the input field
         term_input.textChanged.connect(term_widget.update_lemma)
-        self._populate_fields('T', term_widget.layout(), locale)
+        term_widget.fields = self._populate_fields('T', term_widget.layout(),
+                                                   locale)
         # needed to keep field bound to the term in the input field
-        for field in [f for f in self._fields if
-                      f.level == 'T' and f.locale == locale
-                      and f.lemma is None]:
+        for field in term_widget.fields:
             term_input.textChanged.connect(field.update_lemma)
         term_input.setText('')
         # registers the field internally and displays the widget visually
@@ -404,9 +420,8 @@ class UpdateEntryForm(AbstractEntryForm):
         reference to the widgets.
 
         *Note:* no field removal from the self._fields list is actually needed,
-        since those fields will automatically be excluded when extracting
-        term-level properties with ``get_term_level_property_values`` having no
-        correspondence in the ``get_terms`` output.
+        since the fields of terms are extracted from their term widgets by
+        ``get_changes``.
 
         :param locale: ID of the language of the term being deleted
         :type locale: str
@@ -460,7 +475,7 @@ class CustomMenuLanguageWidget(QtGui.QLabel):
         """
         flag = QtGui.QLabel(self)
         flag.setPixmap(
-            QtGui.QPixmap(':/flags/{0}.png'.format(locale)).scaledToHeight(
+            QtGui.QPixmap(res.flag_path(locale)).scaledToHeight(
                 15))
         label_text = '<strong>{0}</strong>'.format(
             DefaultLanguages(self)[locale])
@@ -514,7 +529,7 @@ class CustomMenuTermWidget(QtGui.QWidget):
     responsibility at a later moment to reflect the change in the termbase.
     """
 
-    def __init__(self, locale, lemma, is_vedette, parent):
+    def __init__(self, locale, lemma, is_vedette, parent, term_id=None):
         """Constructor method.
 
         :param locale: locale of the term language
@@ -526,9 +541,16 @@ class CustomMenuTermWidget(QtGui.QWidget):
         :type is_vedette: bool
         :param parent: reference to the *container form*
         :type parent: QtGui.QWidget
+        :param term_id: ID of the term, None if it is not stored yet
+        :type term_id: str
         """
         super(CustomMenuTermWidget, self).__init__(parent)
         self.lemma = lemma
+        self.loaded_lemma = lemma
+        self.vedette = is_vedette
+        self.term_id = term_id
+        # fields of term-level properties
+        self.fields = []
         self._delete_term_action = QtGui.QAction(self.tr('Delete term'), self)
         if is_vedette:
             self._delete_term_action.setEnabled(False)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+
+"""
+.. currentmodule:: src.view.entry.thumbnails
+
+This module contains the cache of the thumbnails of image property values,
+which are decoded and scaled once and then reused every time the same image is
+displayed, either in the entry screen or in the entry document.
+"""
+
+import collections
+import hashlib
+
+from PyQt4 import QtCore, QtGui
+
+THUMBNAIL_HEIGHT = 150
+"""Height of the thumbnails of pictures.
+"""
+
+_THUMBNAIL_CACHE = None
+"""Reference to the single instance of the thumbnail cache.
+"""
+
+
+def get_thumbnail_cache():
+    """Returns a reference to the thumbnail cache of the application, creating
+    it if accessed for the first time (lazy initialization).
+
+    :returns: reference to the thumbnail cache
+    :rtype: ThumbnailCache
+    """
+    global _THUMBNAIL_CACHE
+    if not _THUMBNAIL_CACHE:
+        _THUMBNAIL_CACHE = ThumbnailCache()
+    return _THUMBNAIL_CACHE
+
+
+class ThumbnailCache(object):
+    """Bounded cache of scaled images keyed by a digest of their (encoded)
+    content, the least recently used thumbnails being discarded first.
+    """
+
+    _CAPACITY = 256
+    """Maximum number of thumbnails kept in memory.
+    """
+
+    def __init__(self, height=THUMBNAIL_HEIGHT):
+        """Constructor method. This should *never* be called from outside this
+        module, use the ``get_thumbnail_cache()`` top-level function instead.
+
+        :param height: height of the thumbnails
+        :type height: int
+        :rtype: ThumbnailCache
+        """
+        self._height = height
+        self._images = collections.OrderedDict()
+
+    @staticmethod
+    def get_key(data):
+        """Returns the key of an encoded image.
+
+        :param data: content of an image file
+        :type data: bytes
+        :rtype: str
+        """
+        return hashlib.sha1(data).hexdigest()
+
+    def get(self, data):
+        """Returns the thumbnail of an encoded image, decoding and scaling it
+        unless it is cached.
+
+        :param data: content of an image file
+        :type data: bytes
+        :returns: a (key, thumbnail) 2-tuple
+        :rtype: tuple
+        """
+        key = self.get_key(data)
+        image = self._images.get(key)
+        if image is None:
+            image = QtGui.QImage()
+            image.loadFromData(QtCore.QByteArray(data))
+            if not image.isNull():
+                image = image.scaledToHeight(self._height,
+                                             QtCore.Qt.SmoothTransformation)
+            self._images[key] = image
+            if len(self._images) > self._CAPACITY:
+                self._images.popitem(last=False)
+        else:
+            self._images.move_to_end(key)
+        return key, image
@@ -25,11 +25,15 @@ This module contains the definition of the classes that are used to display
 and manipulate entries in the application main window.
 """
 
+import html
+
 from PyQt4 import QtCore, QtGui
 
 from src import model as mdl
 from src.view.entry.forms import CreateEntryForm, UpdateEntryForm
+from src.view.entry.thumbnails import get_thumbnail_cache
 from src.view.enum import DefaultLanguages
+from src.view import res
 
 
 class EntryWidget(QtGui.QSplitter):
@@ -98,7 +102,7 @@ class EntryList(QtGui.QWidget):
         """
         super(EntryList, self).__init__(parent)
         self._model = QtGui.QSortFilterProxyModel(self)
-        self._model.setSortCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self._model.setSortRole(mdl.EntryModel.SORT_KEY_ROLE)
         self._view = QtGui.QListView(self)
         self._view.setModel(self._model)
         self._selector = LanguageSelector(self)
@@ -108,22 +112,49 @@ class EntryList(QtGui.QWidget):
         self.layout().addWidget(self._view)
         # signal-slot connection
         self._selector.fire_event.connect(self.fire_event)
-        self._view.clicked.connect(self._handle_view_clicked)
-
-    @QtCore.pyqtSlot(int)
-    def _handle_view_clicked(self, unused_index):
-        """When the view is clicked this slot it activated to convert the
-        selected index from the proxy model to an original model index, passing
-        the control to the controller to handle the index and display the entry.
-
-        :param unused_index:
-        :return:
+        self._view.selectionModel().currentChanged.connect(
+            self._handle_current_changed)
+
+    @QtCore.pyqtSlot(QtCore.QModelIndex, QtCore.QModelIndex)
+    def _handle_current_changed(self, current, unused_previous):
+        """When the current item of the view is changed, either by clicking
+        on it or by moving with the keyboard, this slot is activated to convert
+        its index from the proxy model to an original model index, passing the
+        control to the controller to handle the index and display the entry.
+
+        :param current: index of the new current item in the proxy model
+        :type current: QtCore.QModelIndex
+        :param unused_previous: index of the previous current item
+        :type unused_previous: QtCore.QModelIndex
+        :rtype: None
         """
-        target_index = self._view.selectedIndexes().pop()
-        source_index = self._model.mapToSource(target_index)
+        if not current.isValid():
+            return
+        source_index = self._model.mapToSource(current)
         self.fire_event.emit('entry_index_changed',
                              {'index': source_index})
 
+    def get_neighbours(self, index, distance):
+        """Returns the indexes of the entries which are displayed around the
+        one with the given index, i.e. at most ``distance`` rows before or
+        after it in the sorted list, the nearest ones coming first.
+
+        :param index: index of an entry in the entry model
+        :type index: QtCore.QModelIndex
+        :param distance: maximum number of rows between entries
+        :type distance: int
+        :returns: a list of indexes of the entry model
+        :rtype: list
+        """
+        row = self._model.mapFromSource(index).row()
+        neighbours = []
+        for offset in range(1, distance + 1):
+            for other_row in [row + offset, row - offset]:
+                if 0 <= other_row < self._model.rowCount():
+                    neighbours.append(self._model.mapToSource(
+                        self._model.index(other_row, 0)))
+        return neighbours
+
     def sort_entries(self):
         """Simple method to allow the controller to sort entries again after
         those operations which alter the entry model. It is provided to better
@@ -222,9 +253,7 @@ class LanguageSelector(QtGui.QWidget):
         """
         language_name = self._language_combo.currentText()
         if language_name:
-            inverted_languages = {value: key for key, value in
-                                  self._default_languages}
-            return inverted_languages[language_name]
+            return self._default_languages.get_locale(language_name)
 
 
 class EntryDisplay(QtGui.QWidget):
@@ -236,6 +265,11 @@ class EntryDisplay(QtGui.QWidget):
     """Signal emitted to notify the controller about events.
     """
 
+    WIDGET_MODE, DOCUMENT_MODE = range(2)
+    """Modes of display of entries, i.e. a widget for each value (the
+    ``EntryScreen``) or a single HTML document (the ``EntryDocument``).
+    """
+
     def __init__(self, parent):
         """Constructor method.
 
@@ -248,11 +282,43 @@ class EntryDisplay(QtGui.QWidget):
         self._scroll_area = QtGui.QScrollArea(self)
         self.layout().addWidget(self._scroll_area)
         self.content = None
+        # recycled for all the entries of the open termbase
+        self._entry_screen = None
+        self._display_mode = self.WIDGET_MODE
         # shows greeting
         self.display_welcome_screen()
         # signal-slot connection
         mdl.get_main_model().termbase_closed.connect(
             self.display_welcome_screen)
+        mdl.get_main_model().termbase_opened.connect(
+            self._discard_entry_screen)
+
+    @property
+    def display_mode(self):
+        """Returns the mode in which entries are displayed.
+
+        :returns: one of ``WIDGET_MODE`` and ``DOCUMENT_MODE``
+        :rtype: int
+        """
+        return self._display_mode
+
+    @display_mode.setter
+    def display_mode(self, value):
+        """Changes the mode in which entries are displayed, displaying the
+        current entry again (unless it is being edited).
+
+        :param value: one of ``WIDGET_MODE`` and ``DOCUMENT_MODE``
+        :type value: int
+        :rtype: None
+        """
+        if value == self._display_mode:
+            return
+        self._display_mode = value
+        entry = self.content.entry if self.content is self._entry_screen \
+            else None
+        self._discard_entry_screen()
+        if entry:
+            self.display_entry(entry)
 
     @property
     def current_entry(self):
@@ -268,12 +334,31 @@ class EntryDisplay(QtGui.QWidget):
         :type content: QtGui.QWidget
         :rtype: None
         """
+        if content is self.content:
+            return
         if self.content:
             old_widget = self._scroll_area.takeWidget()
-            old_widget.deleteLater()
+            if old_widget is self._entry_screen:
+                # kept (hidden) to be displayed again later
+                old_widget.hide()
+                old_widget.setParent(self)
+            else:
+                old_widget.deleteLater()
         self.content = content
         self._scroll_area.setWidget(self.content)
         self._scroll_area.setWidgetResizable(True)
+        self.content.show()
+
+    @QtCore.pyqtSlot()
+    def _discard_entry_screen(self):
+        """Discards the entry screen, since it is built for the schema of the
+        termbase which was open when it was created.
+
+        :rtype: None
+        """
+        if self._entry_screen and self._entry_screen is not self.content:
+            self._entry_screen.deleteLater()
+        self._entry_screen = None
 
     def display_create_entry_form(self):
         """Displays the form for the creation of a new terminological entry in
@@ -286,16 +371,19 @@ class EntryDisplay(QtGui.QWidget):
         form.fire_event.connect(self.fire_event)
         self._display_content(form)
 
-    def display_update_entry_form(self, entry):
+    def display_update_entry_form(self, entry, snapshot=None):
         """Displays a form that can be used to edit the given (data access)
         entry, i.e. a form where all fields are already filled with the data
         stored in the termbase and can be changed by the user.
 
         :param entry: entry to be edited in the form
         :type entry: Entry
+        :param snapshot: up-to-date snapshot of the entry, read from the
+        termbase if not given
+        :type snapshot: EntrySnapshot
         :rtype: None
         """
-        form = UpdateEntryForm(entry, self)
+        form = UpdateEntryForm(entry, self, snapshot)
         form.fire_event.connect(self.fire_event)
         self._display_content(form)
 
@@ -305,124 +393,332 @@ class EntryDisplay(QtGui.QWidget):
 
         :rtype: None
         """
+        self._discard_entry_screen()
         self._display_content(WelcomeScreen(self))
         self.fire_event.emit('ui_reset', {})
 
-    def display_entry(self, entry):
+    def display_entry(self, entry, snapshot=None):
         """Displays the given entry in a suitable widget in the main area of
         the central widget of the application.
 
         :param entry: reference to the entry to be displayed
         :type entry: Entry
+        :param snapshot: if given, the values of the entry are taken from it
+        instead of being read from the termbase
+        :type snapshot: EntrySnapshot
         :rtype: None
         """
-        self._display_content(EntryScreen(entry, self))
+        if not self._entry_screen:
+            if self._display_mode == self.DOCUMENT_MODE:
+                self._entry_screen = EntryDocument(self)
+            else:
+                self._entry_screen = EntryScreen(self)
+        self._entry_screen.display(entry, snapshot)
+        self._display_content(self._entry_screen)
         self.fire_event.emit('entry_displayed', {})
 
 
+class PropertyRows(object):
+    """Rows of a form layout showing the values of the properties of a given
+    level, which are created once and then bound to the values of each entry
+    (or term) that is displayed. Rows whose property has no value are hidden.
+    """
+
+    def __init__(self, properties, layout, parent):
+        """Constructor method.
+
+        :param properties: properties whose values are shown
+        :type properties: list
+        :param layout: form layout where the rows are added
+        :type layout: QtGui.QFormLayout
+        :param parent: reference to the parent widget of the labels
+        :type parent: QtGui.QWidget
+        :rtype: PropertyRows
+        """
+        self._rows = []
+        for prop in properties:
+            prop_label = QtGui.QLabel(
+                '<strong>{0}:</strong>'.format(prop.name), parent)
+            value_label = QtGui.QLabel(parent)
+            value_label.setWordWrap(True)
+            layout.addRow(prop_label, value_label)
+            self._rows.append((prop.prop_id, prop.property_type, prop_label,
+                               value_label))
+
+    def bind(self, get_value):
+        """Shows the values of the properties, as returned by the given
+        function.
+
+        :param get_value: callable returning the value of a property given its
+        ID
+        :type get_value: callable
+        :rtype: None
+        """
+        for (prop_id, prop_type, prop_label, value_label) in self._rows:
+            value = get_value(prop_id)
+            if value:
+                if prop_type == 'I':
+                    value_label.setPixmap(QtGui.QPixmap.fromImage(
+                        get_thumbnail_cache().get(value)[1]))
+                else:
+                    value_label.setText(value)
+            else:
+                value_label.clear()
+            prop_label.setVisible(bool(value))
+            value_label.setVisible(bool(value))
+
+
+class TermBlock(QtGui.QWidget):
+    """Widget showing a term and the values of its properties, which is
+    recycled from an entry to the next.
+    """
+
+    def __init__(self, properties, parent):
+        """Constructor method.
+
+        :param properties: term-level properties of the termbase
+        :type properties: list
+        :param parent: reference to the parent widget
+        :type parent: QtGui.QWidget
+        :rtype: TermBlock
+        """
+        super(TermBlock, self).__init__(parent)
+        self.setLayout(QtGui.QFormLayout(self))
+        self.layout().setContentsMargins(0, 0, 0, 0)
+        self._term_label = QtGui.QLabel(self)
+        self._term_label.setStyleSheet('QLabel { color:blue; }')
+        self.layout().addWidget(self._term_label)
+        self._property_rows = PropertyRows(properties, self.layout(), self)
+
+    def bind(self, term):
+        """Shows the given term.
+
+        :param term: term to be displayed
+        :type term: Term
+        :rtype: None
+        """
+        if term.vedette:
+            # if the term is the vedette, it must be printed in bold
+            self._term_label.setText('<strong>{0}</strong>'.format(term.lemma))
+        else:
+            self._term_label.setText(term.lemma)
+        self._property_rows.bind(term.get_property)
+
+
 class EntryScreen(QtGui.QWidget):
     """Widget that is shown in the central part of the ``EntryDisplay`` to fully
     show a terminological entry without allowing any modification to it.
+
+    The widget tree is built once for the schema of the open termbase and it
+    is recycled for every entry that is displayed, only the values being bound
+    to the entry: property rows are hidden when they have no value and each
+    language has a pool of term blocks, which grows as needed and whose
+    unused blocks are hidden.
     """
 
-    _PICTURE_HEIGHT = 150
-    """Default height of the pictures that will be shown in the entry screen.
+    _TERM_POOL_SIZE = 3
+    """Number of term blocks initially created for each language.
     """
 
-    def __init__(self, entry, parent):
+    def __init__(self, parent):
         """Constructor method.
 
-        :param entry: entry to be displayed
-        :type entry: Entry
         :param parent: reference to the parent widget
         :type parent: QtGui.QWidget
         :rtype: EntryScreen
         """
         super(EntryScreen, self).__init__(parent)
         self.setLayout(QtGui.QVBoxLayout(self))
-        self.entry = entry
-        entry_id_label = QtGui.QLabel(
-            self.tr('<small>Entry ID: {0}</small>').format(self.entry.entry_id))
-        self.layout().addWidget(entry_id_label)
+        self.entry = None
+        self._entry_id_label = QtGui.QLabel(self)
+        self.layout().addWidget(self._entry_id_label)
         self.layout().addStretch(1)
-        schema = mdl.get_main_model().open_termbase.schema
+        termbase = mdl.get_main_model().open_termbase
+        schema = termbase.schema
+        self._term_properties = schema.get_properties('T')
         entry_property_layout = QtGui.QFormLayout()
-        for prop in schema.get_properties('E'):
-            # shows entry-level properties
-            self._show_property(prop.name, prop.property_type,
-                                self.entry.get_property(prop.prop_id),
-                                entry_property_layout)
+        self._entry_rows = PropertyRows(schema.get_properties('E'),
+                                        entry_property_layout, self)
         self.layout().addLayout(entry_property_layout)
         self.layout().addStretch(1)
-        for locale in mdl.get_main_model().open_termbase.languages:
+        language_properties = schema.get_properties('L')
+        languages = DefaultLanguages(self)
+        self._languages = []
+        for locale in termbase.languages:
             language_layout = QtGui.QVBoxLayout()
             # adds flag and language name
             flag = QtGui.QLabel(self)
             flag.setPixmap(
-                QtGui.QPixmap(':/flags/{0}.png'.format(locale)).scaledToHeight(
+                QtGui.QPixmap(res.flag_path(locale)).scaledToHeight(
                     15))
             label = QtGui.QLabel(
-                '<strong>{0}</strong>'.format(DefaultLanguages(self)[locale]),
-                self)
+                '<strong>{0}</strong>'.format(languages[locale]), self)
             language_flag_layout = QtGui.QHBoxLayout()
             language_flag_layout.addWidget(flag)
             language_flag_layout.addWidget(label)
             language_flag_layout.addStretch()
             language_layout.addLayout(language_flag_layout)
             language_property_layout = QtGui.QFormLayout()
-            for prop in schema.get_properties('L'):
-                # shows language-level properties
-                value = self.entry.get_language_property(locale, prop.prop_id)
-                self._show_property(prop.name, prop.property_type, value,
-                                    language_property_layout)
+            rows = PropertyRows(language_properties, language_property_layout,
+                                self)
             language_layout.addLayout(language_property_layout)
-            for term in self.entry.get_terms(locale):
-                term_layout = QtGui.QFormLayout()
-                if term.vedette:
-                    # if the term is the vedette, it must be printed in bold
-                    term_label = QtGui.QLabel(
-                        '<strong>{0}</strong>'.format(term.lemma), self)
-                else:
-                    term_label = QtGui.QLabel(term.lemma, self)
-                term_label.setStyleSheet('QLabel { color:blue; }')
-                term_layout.addWidget(term_label)
-                for prop in schema.get_properties('T'):
-                    # adds term-level properties
-                    self._show_property(prop.name, prop.property_type,
-                                        term.get_property(prop.prop_id),
-                                        term_layout)
-                language_layout.addLayout(term_layout)
+            term_layout = QtGui.QVBoxLayout()
+            language_layout.addLayout(term_layout)
+            blocks = []
+            self._languages.append((locale, rows, term_layout, blocks))
+            self._grow_pool(term_layout, blocks, self._TERM_POOL_SIZE)
             self.layout().addStretch(2)
             self.layout().addLayout(language_layout)
         self.layout().addStretch(100)
 
-    def _show_property(self, name, prop_type, value, child_layout):
-        """Displays a given row in the entry screen, containing the name of the
-        property on the left side and the corresponding value on the right side.
-
-        :param name: name of the property to be displayed
-        :type name: str
-        :param prop_type: type of the property in ``['T', 'I', 'P']``
-        :type prop_type: str
-        :param value: value of the property to be displayed
-        :type value: str
-        :param child_layout: sub-layout where the property must be shown
-        :type child_layout: QtGui.QFormLayout
+    def _grow_pool(self, term_layout, blocks, size):
+        """Adds hidden term blocks to the pool of a language until it has the
+        given size.
+
+        :param term_layout: layout where the term blocks of the language are
+        :type term_layout: QtGui.QVBoxLayout
+        :param blocks: term blocks of the language
+        :type blocks: list
+        :param size: minimum size of the pool
+        :type size: int
         :rtype: None
         """
-        if value:
-            prop_label = QtGui.QLabel('<strong>{0}:</strong>'.format(name),
-                                      self)
-            value_label = QtGui.QLabel(self)
-            value_label.setWordWrap(True)
+        while len(blocks) < size:
+            block = TermBlock(self._term_properties, self)
+            block.hide()
+            term_layout.addWidget(block)
+            blocks.append(block)
+
+    def display(self, entry, snapshot=None):
+        """Binds the widgets to the values of the given entry.
+
+        :param entry: entry to be displayed
+        :type entry: Entry
+        :param snapshot: if given, values are taken from it instead of the
+        termbase
+        :type snapshot: EntrySnapshot
+        :rtype: None
+        """
+        self.entry = entry
+        values = snapshot or entry
+        self._entry_id_label.setText(
+            self.tr('<small>Entry ID: {0}</small>').format(entry.entry_id))
+        self._entry_rows.bind(values.get_property)
+        for (locale, rows, term_layout, blocks) in self._languages:
+            rows.bind(lambda prop_id: values.get_language_property(locale,
+                                                                   prop_id))
+            terms = values.get_terms(locale)
+            self._grow_pool(term_layout, blocks, len(terms))
+            for (index, block) in enumerate(blocks):
+                if index < len(terms):
+                    block.bind(terms[index])
+                block.setVisible(index < len(terms))
+
+
+class EntryDocument(QtGui.QTextBrowser):
+    """Alternative to the ``EntryScreen`` which renders a whole entry as a
+    single HTML document, with the thumbnails of pictures added as resources
+    of the document, so that a single widget is needed whatever the size of
+    the entry. Like the entry screen, it is recycled for every entry.
+    """
+
+    _THUMBNAIL_SCHEME = 'thumbnail'
+    """Scheme of the URLs of the thumbnails in the document.
+    """
+
+    def __init__(self, parent):
+        """Constructor method.
+
+        :param parent: reference to the parent widget
+        :type parent: QtGui.QWidget
+        :rtype: EntryDocument
+        """
+        super(EntryDocument, self).__init__(parent)
+        self.setOpenLinks(False)
+        self.entry = None
+        termbase = mdl.get_main_model().open_termbase
+        schema = termbase.schema
+        self._properties = {level: [(p.prop_id, html.escape(p.name),
+                                     p.property_type)
+                                    for p in schema.get_properties(level)]
+                            for level in ['E', 'L', 'T']}
+        languages = DefaultLanguages(self)
+        # the headers of languages do not depend on the entry
+        self._languages = [
+            (locale, '<p><img src="qrc{0}" height="15"> <strong>{1}</strong>'
+                     '</p>'.format(res.flag_path(locale),
+                                   html.escape(languages[locale])))
+            for locale in termbase.languages]
+
+    def _render_properties(self, level, get_value, document):
+        """Returns the HTML table with the values of the properties of a
+        level, adding the thumbnails of pictures to the document.
+
+        :param level: level of the properties
+        :type level: str
+        :param get_value: callable returning the value of a property given its
+        ID
+        :type get_value: callable
+        :param document: document where the entry is rendered
+        :type document: QtGui.QTextDocument
+        :rtype: str
+        """
+        rows = []
+        for (prop_id, name, prop_type) in self._properties[level]:
+            value = get_value(prop_id)
+            if not value:
+                continue
             if prop_type == 'I':
-                image = QtGui.QPixmap()
-                image.loadFromData(QtCore.QByteArray(value))
-                value_label.setPixmap(
-                    image.scaledToHeight(self._PICTURE_HEIGHT))
+                key, image = get_thumbnail_cache().get(value)
+                url = '{0}:{1}'.format(self._THUMBNAIL_SCHEME, key)
+                document.addResource(QtGui.QTextDocument.ImageResource,
+                                     QtCore.QUrl(url), image)
+                value = '<img src="{0}">'.format(url)
             else:
-                value_label.setText(value)
-            child_layout.addRow(prop_label, value_label)
+                value = html.escape(value).replace('\n', '<br>')
+            rows.append('<tr><td><strong>{0}:</strong></td><td>{1}</td>'
+                        '</tr>'.format(name, value))
+        if rows:
+            return '<table cellspacing="2">{0}</table>'.format(''.join(rows))
+        return ''
+
+    def display(self, entry, snapshot=None):
+        """Renders the given entry.
+
+        :param entry: entry to be displayed
+        :type entry: Entry
+        :param snapshot: if given, values are taken from it instead of the
+        termbase
+        :type snapshot: EntrySnapshot
+        :rtype: None
+        """
+        self.entry = entry
+        values = snapshot or entry
+        # resources of the previous entry are discarded along with it
+        document = QtGui.QTextDocument(self)
+        parts = [self.tr('<p><small>Entry ID: {0}</small></p>').format(
+            entry.entry_id)]
+        parts.append(self._render_properties('E', values.get_property,
+                                             document))
+        for (locale, header) in self._languages:
+            parts.append(header)
+            parts.append(self._render_properties(
+                'L', lambda prop_id: values.get_language_property(locale,
+                                                                  prop_id),
+                document))
+            for term in values.get_terms(locale):
+                lemma = html.escape(term.lemma)
+                if term.vedette:
+                    # if the term is the vedette, it must be printed in bold
+                    lemma = '<strong>{0}</strong>'.format(lemma)
+                parts.append('<p style="color:blue">{0}</p>'.format(lemma))
+                parts.append(self._render_properties('T', term.get_property,
+                                                     document))
+        document.setHtml(''.join(parts))
+        old_document = self.document()
+        self.setDocument(document)
+        if old_document.parent() is self:
+            old_document.deleteLater()
 
 
 class WelcomeScreen(QtGui.QWidget):
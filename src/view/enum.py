@@ -26,10 +26,74 @@ in the UI. Altough being fixed values, these values must be accessed
 via QObject instances if a localized version of its value is needed,
 in order to ensure that the tr() method be called properly so that
 localization is handled at runtime.
+
+Since language names are looked up very often (and in both directions) while
+entries are displayed, they are translated once for each UI locale and then
+kept in a ``LanguageNames`` instance.
 """
 
 from PyQt4 import QtCore
 
+_LANGUAGE_NAMES = {}
+"""Names of the default languages keyed by the UI locale they are translated
+to.
+"""
+
+
+def get_language_names():
+    """Returns the names of the default languages translated to the current UI
+    locale, translating them if accessed for the first time (lazy
+    initialization).
+
+    :returns: reference to the language names
+    :rtype: LanguageNames
+    """
+    ui_locale = QtCore.QLocale().name()
+    if ui_locale not in _LANGUAGE_NAMES:
+        _LANGUAGE_NAMES[ui_locale] = LanguageNames(DefaultLanguages(None))
+    return _LANGUAGE_NAMES[ui_locale]
+
+
+class LanguageNames(object):
+    """Forward and reverse maps between the locales of the default languages
+    and their localized names.
+    """
+
+    def __init__(self, default_languages):
+        """Constructor method. This should *never* be called from outside this
+        module, use the ``get_language_names()`` top-level function instead.
+
+        :param default_languages: object used to translate language names
+        :type default_languages: DefaultLanguages
+        :rtype: LanguageNames
+        """
+        self._names = {locale: default_languages.translate(locale) for locale
+                       in DefaultLanguages._DEFAULT_LANGUAGES}
+        self._locales = {name: locale for (locale, name) in
+                         self._names.items()}
+        # sorted according to localized name
+        self.items = sorted(self._names.items(), key=lambda t: t[1])
+
+    def get_name(self, locale):
+        """Returns the localized name of a language.
+
+        :param locale: locale of the language
+        :type locale: str
+        :returns: the name of the language, None if it is not a default one
+        :rtype: str
+        """
+        return self._names.get(locale)
+
+    def get_locale(self, name):
+        """Returns the locale of a language given its localized name.
+
+        :param name: localized name of the language
+        :type name: str
+        :returns: the locale of the language, None if there is no such name
+        :rtype: str
+        """
+        return self._locales.get(name)
+
 
 class DefaultLanguages(QtCore.QObject):
     """Class used to mimick a dictionary of available languages, having locale
@@ -59,9 +123,27 @@ class DefaultLanguages(QtCore.QObject):
         :return: localized version of the language with the given locale
         :rtype: str
         """
-        if item not in self._DEFAULT_LANGUAGES:
-            # prevents an error but possibly creates new ones
-            return None
+        return get_language_names().get_name(item)
+
+    def get_locale(self, name):
+        """Does the reverse lookup of language names.
+
+        :param name: localized name of the language
+        :type name: str
+        :returns: the locale of the language with the given name
+        :rtype: str
+        """
+        return get_language_names().get_locale(name)
+
+    def translate(self, item):
+        """Translates the name of a language, which is done only once for each
+        UI locale by ``get_language_names()``.
+
+        :param item: locale of the language
+        :type item: str
+        :return: localized version of the language with the given locale
+        :rtype: str
+        """
         if item == 'en_US':
             return self.tr('English (Unites States)')
         if item == 'en_GB':
@@ -85,8 +167,5 @@ class DefaultLanguages(QtCore.QObject):
         language and a localized version of its name
         :rtype: tuple
         """
-        items = [(locale, self[locale]) for locale in self._DEFAULT_LANGUAGES]
-        # sort according to localized name
-        items.sort(key=lambda t: t[1])
-        for item in items:
+        for item in get_language_names().items:
             yield item
\ No newline at end of file
@@ -26,9 +26,13 @@ toolbar and status bar, plus the main actions and the slot which are activated
 when the latter are triggered.
 """
 
+import os
+
 from PyQt4 import QtGui, QtCore
 
-from src.view.dialogs import SelectTermbaseDialog, TermbasePropertyDialog
+from src.view.dialogs import (SelectTermbaseDialog, TermbasePropertyDialog,
+                              QueryStatisticsDialog, RestoreSnapshotDialog,
+                              LookupDialog)
 from src.view.entry import EntryWidget
 from src import model as mdl
 
@@ -56,6 +60,7 @@ class MainWindow(QtGui.QMainWindow):
         # initializes actions
         self.new_tb_action = None
         self.open_tb_action = None
+        self.open_reference_tb_action = None
         self.close_tb_action = None
         self.delete_tb_action = None
         self.export_tb_action = None
@@ -66,6 +71,15 @@ class MainWindow(QtGui.QMainWindow):
         self.cancel_edit_action = None
         self.delete_entry_action = None
         self.quit_action = None
+        self.query_statistics_action = None
+        self.take_snapshot_action = None
+        self.restore_snapshot_action = None
+        self.merge_tb_action = None
+        self.find_duplicates_action = None
+        self.add_reference_tb_action = None
+        self.close_reference_tbs_action = None
+        self.lookup_action = None
+        self.document_mode_action = None
         self.about_qt_action = None
         self._initialize_actions()
         # creates menus
@@ -88,6 +102,8 @@ class MainWindow(QtGui.QMainWindow):
             self._handle_termbase_opened)
         mdl.get_main_model().termbase_closed.connect(
             self._handle_termbase_closed)
+        mdl.get_main_model().reference_termbases_changed.connect(
+            self._handle_reference_termbases_changed)
 
     def display_message(self, message):
         """Displays a message in the application status bar.
@@ -98,6 +114,34 @@ class MainWindow(QtGui.QMainWindow):
         """
         self.statusBar().showMessage(message)
 
+    def display_merge_report(self, report):
+        """Shows the outcome of a merge, allowing to save the conflicts to a
+        file if there are any.
+
+        :param report: the outcome of the merge
+        :type report: MergeReport
+        :returns: the path where the conflicts must be saved, an empty string
+        if they must not be saved
+        :rtype: str
+        """
+        message = QtGui.QMessageBox(self)
+        message.setWindowTitle(self.tr('Merge termbase'))
+        message.setText(
+            self.tr('{0} entries merged, {1} entries added, {2} terms and {3} '
+                    'property values added.').format(
+                report.merged_entries, report.added_entries,
+                report.added_terms, report.added_values))
+        message.setInformativeText(
+            self.tr('{0} conflicts found.').format(len(report.conflicts)))
+        message.setStandardButtons(QtGui.QMessageBox.Ok)
+        if report.conflicts:
+            message.addButton(QtGui.QMessageBox.Save)
+        if message.exec() != QtGui.QMessageBox.Save:
+            return ''
+        return QtGui.QFileDialog.getSaveFileName(
+            self, self.tr('Save conflicts'), os.path.expanduser('~'),
+            self.tr('Comma-separated values (*.csv)'))
+
     def _create_main_toolbar(self):
         """Creates the application main menu bar which is displayed in the
         top area of the main window.
@@ -129,6 +173,7 @@ class MainWindow(QtGui.QMainWindow):
         termbase_menu = QtGui.QMenu(self.tr('Termbase'), self)
         termbase_menu.addAction(self.new_tb_action)
         termbase_menu.addAction(self.open_tb_action)
+        termbase_menu.addAction(self.open_reference_tb_action)
         termbase_menu.addAction(self.close_tb_action)
         termbase_menu.addAction(self.delete_tb_action)
         termbase_menu.addSeparator()
@@ -144,7 +189,23 @@ class MainWindow(QtGui.QMainWindow):
         entry_menu.addAction(self.edit_entry_action)
         entry_menu.addAction(self.cancel_edit_action)
         entry_menu.addAction(self.delete_entry_action)
+        entry_menu.addSeparator()
+        entry_menu.addAction(self.document_mode_action)
         self.menuBar().addMenu(entry_menu)
+        # tools menu
+        tools_menu = QtGui.QMenu(self.tr('Tools'), self)
+        tools_menu.addAction(self.take_snapshot_action)
+        tools_menu.addAction(self.restore_snapshot_action)
+        tools_menu.addSeparator()
+        tools_menu.addAction(self.merge_tb_action)
+        tools_menu.addAction(self.find_duplicates_action)
+        tools_menu.addSeparator()
+        tools_menu.addAction(self.add_reference_tb_action)
+        tools_menu.addAction(self.close_reference_tbs_action)
+        tools_menu.addAction(self.lookup_action)
+        tools_menu.addSeparator()
+        tools_menu.addAction(self.query_statistics_action)
+        self.menuBar().addMenu(tools_menu)
         # help menu
         help_menu = QtGui.QMenu(self.tr('?'), self)
         help_menu.addAction(self.about_qt_action)
@@ -187,17 +248,62 @@ class MainWindow(QtGui.QMainWindow):
         self.fire_event.emit('edit_entry', {})
 
     @QtCore.pyqtSlot()
-    def _handle_open_termbase(self):
+    def _handle_open_termbase(self, read_only=False):
         """Asks the user to select a termbase from the available ones and, if
         some is actually selected, informs the controller about the event
         (passing in the termbase name).
 
+        :param read_only: whether the termbase must be opened read-only
+        :type read_only: bool
         :rtype: None
         """
         dialog = SelectTermbaseDialog(self)
         ret = dialog.exec()
         if ret:  # informs the controller
             self.fire_event.emit('open_termbase', {
+                'name': dialog.selected_termbase_name,
+                'read_only': read_only})
+
+    @QtCore.pyqtSlot(bool)
+    def _handle_document_mode_toggled(self, checked):
+        """Switches between displaying entries with a widget for each value
+        and displaying them as a single document.
+
+        :param checked: whether entries must be displayed as documents
+        :type checked: bool
+        :rtype: None
+        """
+        entry_display = self.centralWidget().entry_display
+        if checked:
+            entry_display.display_mode = entry_display.DOCUMENT_MODE
+        else:
+            entry_display.display_mode = entry_display.WIDGET_MODE
+
+    @QtCore.pyqtSlot()
+    def _handle_find_duplicates(self):
+        """Asks the user where the report of duplicate terms must be saved
+        and, if some file is actually selected, informs the controller about
+        the event.
+
+        :rtype: None
+        """
+        path = QtGui.QFileDialog.getSaveFileName(
+            self, self.tr('Save duplicates'), os.path.expanduser('~'),
+            self.tr('Comma-separated values (*.csv)'))
+        if path:
+            self.fire_event.emit('find_duplicates', {'path': path})
+
+    @QtCore.pyqtSlot()
+    def _handle_merge_termbase(self):
+        """Asks the user to select a termbase to be merged into the currently
+        open termbase and, if some is actually selected, informs the
+        controller about the event.
+
+        :rtype: None
+        """
+        dialog = SelectTermbaseDialog(self)
+        if dialog.exec():
+            self.fire_event.emit('merge_termbase', {
                 'name': dialog.selected_termbase_name})
 
     @QtCore.pyqtSlot()
@@ -221,6 +327,20 @@ class MainWindow(QtGui.QMainWindow):
         self.save_entry_action.setEnabled(False)
         self.fire_event.emit('save_entry', {})
 
+    @QtCore.pyqtSlot()
+    def _handle_restore_snapshot(self):
+        """Asks the user to select a snapshot and the name of the termbase it
+        must be restored as and, if the dialog is confirmed, informs the
+        controller about the event.
+
+        :rtype: None
+        """
+        dialog = RestoreSnapshotDialog(self)
+        if dialog.exec():
+            self.fire_event.emit('restore_snapshot', {
+                'file_name': dialog.selected_snapshot.file_name,
+                'name': dialog.termbase_name})
+
     @QtCore.pyqtSlot()
     def _handle_show_termbase_properties(self):
         """Displays a dialog window with some termbase properties.
@@ -230,6 +350,53 @@ class MainWindow(QtGui.QMainWindow):
         dialog = TermbasePropertyDialog(self)
         dialog.exec()
 
+    @QtCore.pyqtSlot()
+    def _handle_add_reference_termbase(self):
+        """Asks the user to select a termbase to be opened for reference and,
+        if some is actually selected, informs the controller about the event.
+
+        :rtype: None
+        """
+        dialog = SelectTermbaseDialog(self)
+        if dialog.exec():
+            self.fire_event.emit('add_reference_termbase', {
+                'name': dialog.selected_termbase_name})
+
+    @QtCore.pyqtSlot()
+    def _handle_reference_termbases_changed(self):
+        """Enables closing the reference termbases only if there are any, and
+        looking up lemmata only if some termbase is open.
+
+        :rtype: None
+        """
+        main_model = mdl.get_main_model()
+        self.close_reference_tbs_action.setEnabled(
+            bool(main_model.reference_termbases))
+        self.lookup_action.setEnabled(
+            bool(main_model.open_termbase or main_model.reference_termbases))
+
+    @QtCore.pyqtSlot()
+    def _handle_lookup(self):
+        """Displays a (non modal) dialog where lemmata are looked up in all the
+        open termbases.
+
+        :rtype: None
+        """
+        dialog = LookupDialog(self)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        dialog.show()
+
+    @QtCore.pyqtSlot()
+    def _handle_show_query_statistics(self):
+        """Displays a (non modal) dialog with the statistics about the SQL
+        statements that have been executed so far.
+
+        :rtype: None
+        """
+        dialog = QueryStatisticsDialog(self)
+        dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        dialog.show()
+
     @QtCore.pyqtSlot()
     def _handle_termbase_closed(self):
         """Resets the main UI when the current termbase is closed, this slot is
@@ -241,19 +408,29 @@ class MainWindow(QtGui.QMainWindow):
         self.export_tb_action.setEnabled(False)
         self.close_tb_action.setEnabled(False)
         self.create_entry_action.setEnabled(False)
+        self.take_snapshot_action.setEnabled(False)
+        self.merge_tb_action.setEnabled(False)
+        self.find_duplicates_action.setEnabled(False)
+        self._handle_reference_termbases_changed()
 
     @QtCore.pyqtSlot()
     def _handle_termbase_opened(self):
         """This slot is activated when the view detects that in the model a
         new termbase has been opened. In this case the correct reaction is to
-        enable the property action.
+        enable the property action. Actions which would change the termbase
+        are only enabled if it has not been opened read-only.
 
         :rtype: None
         """
+        writable = not mdl.get_main_model().open_termbase.read_only
         self.show_tb_properties_action.setEnabled(True)
         self.export_tb_action.setEnabled(True)
         self.close_tb_action.setEnabled(True)
-        self.create_entry_action.setEnabled(True)
+        self.create_entry_action.setEnabled(writable)
+        self.take_snapshot_action.setEnabled(True)
+        self.merge_tb_action.setEnabled(writable)
+        self.find_duplicates_action.setEnabled(True)
+        self._handle_reference_termbases_changed()
 
     def _initialize_actions(self):
         """Initializes the name, icons and actions that will be associated to
@@ -268,8 +445,13 @@ class MainWindow(QtGui.QMainWindow):
         self.new_tb_action.setShortcut(QtGui.QKeySequence.New)
         self.open_tb_action = QtGui.QAction(QtGui.QIcon(':/document-open.png'),
                                             self.tr('Open termbase...'), self)
-        self.open_tb_action.triggered.connect(self._handle_open_termbase)
+        self.open_tb_action.triggered.connect(
+            lambda: self._handle_open_termbase())
         self.open_tb_action.setShortcut(QtGui.QKeySequence.Open)
+        self.open_reference_tb_action = QtGui.QAction(
+            self.tr('Open reference termbase...'), self)
+        self.open_reference_tb_action.triggered.connect(
+            lambda: self._handle_open_termbase(read_only=True))
         self.close_tb_action = QtGui.QAction(
             QtGui.QIcon(':/document-close.png'), self.tr('Close termbase...'), self)
         self.close_tb_action.triggered.connect(
@@ -321,6 +503,46 @@ class MainWindow(QtGui.QMainWindow):
         self.quit_action = QtGui.QAction(QtGui.QIcon(':/application-exit.png'),
                                          self.tr('Quit'), self)
         self.quit_action.triggered.connect(lambda: QtGui.qApp.quit())
+        self.query_statistics_action = QtGui.QAction(
+            self.tr('Query statistics...'), self)
+        self.query_statistics_action.triggered.connect(
+            self._handle_show_query_statistics)
+        self.take_snapshot_action = QtGui.QAction(self.tr('Take snapshot'),
+                                                  self)
+        self.take_snapshot_action.setEnabled(False)
+        self.take_snapshot_action.triggered.connect(
+            lambda: self.fire_event.emit('take_snapshot', {}))
+        self.restore_snapshot_action = QtGui.QAction(
+            self.tr('Restore snapshot...'), self)
+        self.restore_snapshot_action.triggered.connect(
+            self._handle_restore_snapshot)
+        self.merge_tb_action = QtGui.QAction(self.tr('Merge termbase...'),
+                                             self)
+        self.merge_tb_action.setEnabled(False)
+        self.merge_tb_action.triggered.connect(self._handle_merge_termbase)
+        self.find_duplicates_action = QtGui.QAction(
+            self.tr('Find duplicates...'), self)
+        self.find_duplicates_action.setEnabled(False)
+        self.find_duplicates_action.triggered.connect(
+            self._handle_find_duplicates)
+        self.add_reference_tb_action = QtGui.QAction(
+            self.tr('Add reference termbase...'), self)
+        self.add_reference_tb_action.triggered.connect(
+            self._handle_add_reference_termbase)
+        self.close_reference_tbs_action = QtGui.QAction(
+            self.tr('Close reference termbases'), self)
+        self.close_reference_tbs_action.setEnabled(False)
+        self.close_reference_tbs_action.triggered.connect(
+            lambda: self.fire_event.emit('close_reference_termbases', {}))
+        self.lookup_action = QtGui.QAction(self.tr('Look up...'), self)
+        self.lookup_action.setEnabled(False)
+        self.lookup_action.setShortcut(QtGui.QKeySequence('Ctrl+l'))
+        self.lookup_action.triggered.connect(self._handle_lookup)
+        self.document_mode_action = QtGui.QAction(
+            self.tr('Display entries as documents'), self)
+        self.document_mode_action.setCheckable(True)
+        self.document_mode_action.toggled.connect(
+            self._handle_document_mode_toggled)
         self.about_qt_action = QtGui.QAction(QtGui.QIcon(':/help-about.png'),
                                              self.tr('About Qt'), self)
         self.about_qt_action.triggered.connect(
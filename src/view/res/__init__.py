@@ -21,7 +21,30 @@
 """
 .. currentmodule:: src.view.res
 
-This package is only used to import resource files.
+This package is only used to import resource files. The resources which are
+needed to draw the main window are registered as soon as the package is
+imported, whereas national flags are registered the first time they are used.
 """
 
+import importlib
+
 from src.view.res import resources
+
+_FLAGS = None
+"""Reference to the module registering national flags, once it is imported.
+"""
+
+
+def flag_path(locale):
+    """Returns the resource path of the national flag of the language with the
+    given locale, registering flag resources if needed.
+
+    :param locale: locale of the language
+    :type locale: str
+    :returns: the path of the flag image in the resource system
+    :rtype: str
+    """
+    global _FLAGS
+    if not _FLAGS:
+        _FLAGS = importlib.import_module('src.view.res.flags')
+    return ':/flags/{0}.png'.format(locale)
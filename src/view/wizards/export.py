@@ -30,6 +30,8 @@ import os
 from PyQt4 import QtCore, QtGui
 from src.view.enum import DefaultLanguages
 from src import model as mdl
+from src.model import export
+from src.view import res
 
 
 class ExportWizard(QtGui.QWizard):
@@ -116,6 +118,24 @@ class ExportWizard(QtGui.QWizard):
         """
         return self.page(ExportWizard.FINAL_PAGE).output_file_path
 
+    @property
+    def changes_since(self):
+        """Sequence number of the change journal after which changed entries
+        should be exported, if the user has chosen an incremental export.
+
+        :return: the sequence number or None for a full export
+        :rtype: int
+        """
+        return self.page(ExportWizard.FINAL_PAGE).changes_since
+
+    @property
+    def parallel_export(self):
+        """Whether the export should be carried out by a pool of processes.
+
+        :rtype: bool
+        """
+        return self.page(ExportWizard.FINAL_PAGE).parallel_export
+
 
 class ExportTypePage(QtGui.QWizardPage):
     """Page of the wizard where users can choose in which for to export
@@ -223,7 +243,7 @@ class LanguagePage(QtGui.QWizardPage):
         """
         termbase_locales = mdl.get_main_model().open_termbase.languages
         for locale in termbase_locales:
-            flag = QtGui.QIcon(':/flags/{0}'.format(locale))
+            flag = QtGui.QIcon(res.flag_path(locale))
             name = self._languages[locale]
             item = QtGui.QListWidgetItem(flag, name,
                                          self._available_languages_view)
@@ -279,8 +299,7 @@ class LanguagePage(QtGui.QWizardPage):
         """
         names = [self._chosen_languages.item(index).data(QtCore.Qt.DisplayRole)
                  for index in range(self._chosen_languages.count())]
-        inverted_languages = {value: key for key, value in self._languages}
-        return [inverted_languages[name] for name in names]
+        return [self._languages.get_locale(name) for name in names]
 
     def nextId(self):
         """Overridden in order to return the id of the next page.
@@ -421,8 +440,30 @@ class FinalPage(QtGui.QWizardPage):
         select_file_widget.setLayout(QtGui.QHBoxLayout(select_file_widget))
         select_file_widget.layout().addWidget(self._path_input)
         select_file_widget.layout().addWidget(browse_button)
+        # incremental export
+        self._changes_check = QtGui.QCheckBox(
+            self.tr('Export only entries changed after change number'), self)
+        self._since_input = QtGui.QSpinBox(self)
+        last_change = mdl.get_main_model().open_termbase.last_change
+        self._since_input.setRange(0, last_change)
+        self._since_input.setValue(last_change)
+        self._since_input.setEnabled(False)
+        self._changes_check.toggled.connect(self._since_input.setEnabled)
+        changes_widget = QtGui.QWidget(self)
+        changes_widget.setLayout(QtGui.QHBoxLayout(changes_widget))
+        changes_widget.layout().addWidget(self._changes_check)
+        changes_widget.layout().addWidget(self._since_input)
+        changes_widget.layout().addStretch()
+        # parallel export, worth its start-up time for large termbases only
+        self._parallel_check = QtGui.QCheckBox(
+            self.tr('Export in parallel using several processes'), self)
+        self._parallel_check.setChecked(
+            mdl.get_main_model().open_termbase.entry_number >
+            export.EXPORT_RANGE_SIZE)
         self.setLayout(QtGui.QVBoxLayout(self))
         self.layout().addWidget(select_file_widget)
+        self.layout().addWidget(changes_widget)
+        self.layout().addWidget(self._parallel_check)
 
     @QtCore.pyqtSlot()
     def _handle_browse_button_pressed(self):
@@ -465,6 +506,24 @@ class FinalPage(QtGui.QWizardPage):
         """
         return self._path_input.text()
 
+    @property
+    def changes_since(self):
+        """Sequence number after which changed entries should be exported.
+        :return: the sequence number or None if a full export was chosen
+        :rtype: int
+        """
+        if self._changes_check.isChecked():
+            return self._since_input.value()
+        return None
+
+    @property
+    def parallel_export(self):
+        """Whether the export should be carried out by a pool of processes.
+        :return: True if parallel export was chosen, False otherwise
+        :rtype: bool
+        """
+        return self._parallel_check.isChecked()
+
     def isComplete(self):
         """Overridden in order to state whether the page is complete based on
         the user having selected an output file or not.
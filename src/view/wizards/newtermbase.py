@@ -29,6 +29,7 @@ from PyQt4 import QtGui, QtCore
 
 from src import model as mdl
 from src.view.enum import DefaultLanguages
+from src.view import res
 
 
 PROP_TYPES = ['Text', 'Image', 'Picklist']
@@ -96,6 +97,23 @@ class NewTermbaseWizard(QtGui.QWizard):
         language_page = self._pages[1]
         return language_page.selected_locales
 
+    def get_template_name(self):
+        """Returns the name of the existing termbase chosen as a template for
+        the new termbase, if any.
+
+        :returns: the name of the template termbase or None
+        :rtype: str
+        """
+        return self._pages[0].template_name
+
+    def get_copy_entries(self):
+        """Returns whether the entries of the template termbase must be copied
+        into the new termbase as well.
+
+        :rtype: bool
+        """
+        return self.field('copy_entries')
+
 
 class NamePage(QtGui.QWizardPage):
     """This page allows the user to select the name of the new termbase that is
@@ -119,8 +137,40 @@ class NamePage(QtGui.QWizardPage):
         name_label = QtGui.QLabel('Name', self)
         name_input = QtGui.QLineEdit(self)
         self.layout().addRow(name_label, name_input)
+        # an existing termbase can be used as a template
+        self._template_names = [None] + sorted(
+            name[:-len('.sqlite')] for name in mdl.get_termbase_names())
+        self._template_input = QtGui.QComboBox(self)
+        self._template_input.addItems(['None'] + self._template_names[1:])
+        copy_input = QtGui.QCheckBox('Copy entries as well', self)
+        copy_input.setEnabled(False)
+        self._template_input.currentIndexChanged.connect(
+            lambda index: copy_input.setEnabled(index > 0))
+        self.layout().addRow(QtGui.QLabel('Template', self),
+                             self._template_input)
+        self.layout().addRow(None, copy_input)
         # field registration
         self.registerField('termbase_name*', name_input)
+        self.registerField('copy_entries', copy_input)
+
+    @property
+    def template_name(self):
+        """Returns the name of the termbase chosen as a template, if any.
+
+        :rtype: str
+        """
+        return self._template_names[self._template_input.currentIndex()]
+
+    def nextId(self):
+        """Skips the language and definition pages when the new termbase is
+        created from a template, since its structure is copied.
+
+        :returns: the ID of the next page
+        :rtype: int
+        """
+        if self.template_name:
+            return self.wizard().pageIds()[-1]
+        return super(NamePage, self).nextId()
 
     def validatePage(self):
         """Overridden in order to avoid name conflicts in the termbases, it
@@ -192,7 +242,7 @@ class LanguagePage(QtGui.QWizardPage):
         :rtype: None
         """
         for locale, language_name in self._default_languages:
-            flag = QtGui.QIcon(':/flags/{0}.png'.format(locale))
+            flag = QtGui.QIcon(res.flag_path(locale))
             item = QtGui.QListWidgetItem(flag, language_name,
                                          self._available_languages)
             self._available_languages.addItem(item)
@@ -244,8 +294,7 @@ class LanguagePage(QtGui.QWizardPage):
         """
         names = [self._chosen_languages.item(index).data(0)
                  for index in range(self._chosen_languages.count())]
-        inverted_languages = {value: key for key, value in self._languages}
-        return [inverted_languages[name] for name in names]
+        return [self._default_languages.get_locale(name) for name in names]
 
 
 class DefinitionModelPage(QtGui.QWizardPage):
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# MetaTerm - A terminology management application written in Python
+# Copyright (C) 2014 Diego Beraldin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further information, contact the authors at <diego.beraldin@gmail.com>.
+
+"""
+.. currentmodule:: tests.test_merge
+
+Tests of the merge of a termbase into another one.
+"""
+
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from src.model.dataaccess import Termbase, merge, orm
+
+
+class MergeTest(unittest.TestCase):
+    """Merges a termbase into another one in a temporary folder.
+    """
+
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        for module in [orm, orm.sql]:
+            patcher = mock.patch.object(module, 'DB_DIR', folder)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.target = Termbase.create('target', ['en_US', 'it_IT'])
+        self.addCleanup(self.target.dispose)
+        entry = self.target.create_entry()
+        entry.add_term('cat', 'en_US', True)
+        source = Termbase.create('source', ['en_US', 'it_IT'])
+        for number in range(50):
+            entry = source.create_entry()
+            entry.add_term('word {0}'.format(number), 'en_US', True)
+            entry.add_term('parola {0}'.format(number), 'it_IT', True)
+        source.dispose()
+
+    def _get_content(self):
+        """Returns the vedettes and the counters of the target termbase.
+        """
+        return ([v[1] for v in self.target.get_sorted_vedettes('en_US')],
+                self.target.statistics.counters)
+
+    def test_aborted_merge(self):
+        """Aborting the merge at any point raises the interruption error and
+        leaves the target termbase unchanged.
+        """
+        content = self._get_content()
+        with mock.patch.object(merge, '_PROGRESS_STEPS', 10):
+            for steps in [1, 10, 100, 1000]:
+                with self.assertRaises(sqlite3.OperationalError) as context:
+                    self.target.merge('source',
+                                      lambda done: done >= steps)
+                self.assertEqual(str(context.exception), 'interrupted')
+                self.assertEqual(self._get_content(), content)
+
+    def test_merge(self):
+        """The entries of the source termbase are added to the target one.
+        """
+        report = self.target.merge('source')
+        self.assertEqual(report.added_entries, 50)
+        self.assertEqual(self.target.statistics.entry_number, 51)
+
+
+if __name__ == '__main__':
+    unittest.main()